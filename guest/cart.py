@@ -0,0 +1,69 @@
+# Cart state service — everything the cart UI needs from ONE query, plus the
+# denormalized Cart.item_count / Cart.total kept in step with CartItem writes.
+#
+# Callers adjust the counters inside the same transaction as the CartItem
+# change, so the badge on the room page (read straight off the Cart row) never
+# disagrees with the cart contents.
+
+from decimal import Decimal
+
+from django.db.models import F
+
+from hotelportal.models import Cart, CartItem
+
+
+def cart_state(cart_id):
+    """
+    {"cart_id", "count", "total", "lines": [...]} from a single CartItem ⨝ Item query.
+    """
+    rows = (
+        CartItem.objects
+        .filter(cart_id=cart_id)
+        .order_by("id")
+        .values_list("item_id", "item__name", "qty", "price_snapshot")
+    )
+    lines, count, total = [], 0, Decimal("0.00")
+    for item_id, name, qty, price in rows:
+        line_total = price * qty
+        lines.append({
+            "item_id": item_id,
+            "name": name,
+            "qty": qty,
+            "price_snapshot": price,
+            "line_total": line_total,
+        })
+        count += qty
+        total += line_total
+    return {"cart_id": cart_id, "count": count, "total": total, "lines": lines}
+
+
+def cart_document(state):
+    """Compact JSON form of cart_state() for the client-side renderer."""
+    return {
+        "count": state["count"],
+        "total": f"{state['total']:.2f}",
+        "lines": [
+            {"item_id": ln["item_id"], "name": ln["name"], "qty": ln["qty"],
+             "price": f"{ln['price_snapshot']:.2f}"}
+            for ln in state["lines"]
+        ],
+    }
+
+
+def adjust_totals(cart_id, qty_delta, amount_delta):
+    """
+    Apply a CartItem change to the denormalized counters (single UPDATE).
+    False when the cart is no longer a DRAFT (submitted from another device);
+    the caller then rolls its CartItem change back.
+    """
+    return bool(Cart.objects.filter(id=cart_id, status="DRAFT").update(
+        item_count=F("item_count") + qty_delta,
+        total=F("total") + amount_delta,
+    ))
+
+
+def reset_totals(cart_id, **extra):
+    """Zero the counters of a DRAFT cart; False when it is no longer a DRAFT."""
+    return bool(Cart.objects.filter(id=cart_id, status="DRAFT").update(
+        item_count=0, total=Decimal("0.00"), **extra
+    ))
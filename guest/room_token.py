@@ -0,0 +1,160 @@
+# Signed room session token — lets cart/request endpoints skip the
+# Hotel / Room / Cart lookups on every click.
+#
+# room_view (or the first fallback) sets a short-lived, path-scoped cookie holding
+# a signed (hotel_id, room_id, cart_id, state version). The state version lives
+# in the cache and is dropped whenever the Hotel or Room is saved/deleted
+# (guest/signals.py), so a paused hotel or deactivated room invalidates every
+# outstanding token and the next click goes back to the database. Submitting an
+# order drops the room's version too: every device's token points at the cart
+# that was just submitted.
+#
+# The token's cart is only trusted until a write finds it is no longer a DRAFT
+# (a submit raced the version check): the view raises StaleCart, its
+# transaction rolls back, and room_session re-runs it on the room's current
+# DRAFT cart with a fresh token.
+
+import uuid
+from dataclasses import dataclass, field
+from functools import wraps
+
+from django.core import signing
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from hotelportal.models import Hotel, Room, Cart
+
+ROOM_TOKEN_COOKIE = "s2s_room"
+ROOM_TOKEN_MAX_AGE = 60 * 60 * 4  # seconds; a stay's evening, not the whole stay
+ROOM_TOKEN_SALT = "guest.room_token"
+
+
+def _hotel_key(hotel_id):
+    return f"guestgate:h:{hotel_id}"
+
+
+def _room_key(room_id):
+    return f"guestgate:r:{room_id}"
+
+
+def _state_version(hotel_id, room_id, create=False):
+    """Current "hotel.room" state version, or None if it was invalidated."""
+    keys = (_hotel_key(hotel_id), _room_key(room_id))
+    if create:
+        for key in keys:
+            cache.add(key, uuid.uuid4().hex[:8], None)
+    got = cache.get_many(keys)
+    if len(got) != len(keys):
+        return None
+    return ".".join(got[k] for k in keys)
+
+
+def invalidate_room_state(hotel_id=None, room_id=None):
+    if hotel_id is not None:
+        cache.delete(_hotel_key(hotel_id))
+    if room_id is not None:
+        cache.delete(_room_key(room_id))
+
+
+class StaleCart(Exception):
+    """The token's cart was submitted; raised by a write inside its transaction."""
+
+
+@dataclass
+class RoomGate:
+    """What a guest endpoint needs to know about its room; objects are loaded lazily."""
+    hotel_id: int
+    room_id: int
+    cart_id: int
+    reissue: bool = False
+    _hotel: Hotel = field(default=None, repr=False)
+    _room: Room = field(default=None, repr=False)
+
+    @property
+    def hotel(self):
+        if self._hotel is None:
+            self._hotel = Hotel.objects.get(id=self.hotel_id)
+        return self._hotel
+
+    @property
+    def room(self):
+        if self._room is None:
+            self._room = Room.objects.get(id=self.room_id)
+        return self._room
+
+    @property
+    def cart(self):
+        # unsaved-style handle: enough for cart.items / FK assignment, no query
+        return Cart(id=self.cart_id, hotel_id=self.hotel_id, room_id=self.room_id, status="DRAFT")
+
+
+def issue_token(gate):
+    version = _state_version(gate.hotel_id, gate.room_id, create=True)
+    return signing.dumps(
+        {"h": gate.hotel_id, "r": gate.room_id, "c": gate.cart_id, "v": version},
+        salt=ROOM_TOKEN_SALT, compress=True,
+    )
+
+
+def _read_token(request, hotel_id, room_id):
+    raw = request.COOKIES.get(ROOM_TOKEN_COOKIE)
+    if not raw:
+        return None
+    try:
+        data = signing.loads(raw, salt=ROOM_TOKEN_SALT, max_age=ROOM_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get("h") != hotel_id or data.get("r") != room_id:
+        return None
+    version = _state_version(hotel_id, room_id)
+    if version is None or data.get("v") != version:
+        return None  # hotel/room changed since issue (or cache was flushed)
+    return RoomGate(hotel_id=hotel_id, room_id=room_id, cart_id=data["c"])
+
+
+def gate_from_db(hotel_id, room_id):
+    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
+    room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
+    cart, _ = Cart.objects.get_or_create(hotel=hotel, room=room, stay=None, status="DRAFT")
+    return RoomGate(hotel_id=hotel.id, room_id=room.id, cart_id=cart.id,
+                    reissue=True, _hotel=hotel, _room=room)
+
+
+def set_token_cookie(response, request, gate):
+    response.set_cookie(
+        ROOM_TOKEN_COOKIE,
+        issue_token(gate),
+        max_age=ROOM_TOKEN_MAX_AGE,
+        path=reverse("guest_room", args=[gate.hotel_id, gate.room_id]),
+        secure=request.is_secure(),
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def clear_token_cookie(response, gate):
+    response.delete_cookie(
+        ROOM_TOKEN_COOKIE, path=reverse("guest_room", args=[gate.hotel_id, gate.room_id]),
+    )
+
+
+def room_session(view):
+    """
+    Resolve (hotel_id, room_id) from the URL into a RoomGate — from the signed
+    cookie when it is still valid, otherwise from the database (404s as before) —
+    and call view(request, gate, ...). Re-issues the cookie after a fallback,
+    including one forced by the view raising StaleCart.
+    """
+    @wraps(view)
+    def wrapper(request, hotel_id, room_id, *args, **kwargs):
+        gate = _read_token(request, hotel_id, room_id) or gate_from_db(hotel_id, room_id)
+        try:
+            response = view(request, gate, *args, **kwargs)
+        except StaleCart:
+            gate = gate_from_db(hotel_id, room_id)
+            response = view(request, gate, *args, **kwargs)
+        if gate.reissue:
+            set_token_cookie(response, request, gate)
+        return response
+    return wrapper
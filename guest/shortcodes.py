@@ -0,0 +1,101 @@
+# /q/<code> → guest_room routing table, kept in process memory.
+#
+# Printed QR codes carry only Room.short_code. Resolving it is the first hit
+# of every scan, so code → (hotel_id, room_id) of *active* rooms lives in a
+# bounded LRU: the first lookup after start-up loads every active room in one
+# query (up to the capacity; AppConfig.ready() must not touch the database)
+# and later scans resolve without touching the database.
+#
+# Only active rooms are cached. Unknown codes and inactive rooms/hotels go to
+# the database every time (one unique-index lookup), so a room that is
+# created or reactivated resolves at once in every worker, and junk scans
+# can't push real rooms out of the LRU.
+#
+# Room/Hotel saves drop the affected entries (guest/signals.py). That only
+# reaches the process that did the save; another worker may still redirect a
+# since-deactivated room, which guest_room answers with a 404 — the same
+# answer the fresh lookup would give.
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from hotelportal.models import Room
+
+ROUTE_CACHE_SIZE = 50_000  # entries; ~100 bytes each
+
+
+class RoomRoutes:
+    """
+    Thread-safe bounded LRU of short_code → (hotel_id, room_id, True) for active
+    rooms; resolve() answers the rest from the database without caching them.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._warm = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _put(self, code, entry):
+        self._entries[code] = entry
+        self._entries.move_to_end(code)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def warm(self):
+        """Load every active room (up to capacity) in one query."""
+        rows = (
+            Room.objects
+            .filter(is_active=True, hotel__status="ACTIVE")
+            .order_by("-id")[:self.capacity]
+            .values_list("short_code", "hotel_id", "id")
+        )
+        with self._lock:
+            for code, hotel_id, room_id in rows:
+                self._put(code, (hotel_id, room_id, True))
+            self._warm = True
+
+    def resolve(self, code):
+        if not self._warm:
+            self.warm()
+        with self._lock:
+            if code in self._entries:
+                self._entries.move_to_end(code)
+                return self._entries[code]
+        row = (
+            Room.objects
+            .filter(short_code=code)
+            .values_list("hotel_id", "id", "is_active", "hotel__status")
+            .first()
+        )
+        if row is None:
+            return None
+        hotel_id, room_id, is_active, hotel_status = row
+        entry = (hotel_id, room_id, is_active and hotel_status == "ACTIVE")
+        if entry[2]:
+            with self._lock:
+                self._put(code, entry)
+        return entry
+
+    def discard(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
+
+    def discard_hotel(self, hotel_id):
+        # hotel saves are rare; a scan over the table is fine
+        with self._lock:
+            for code in [c for c, e in self._entries.items() if e and e[0] == hotel_id]:
+                del self._entries[code]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._warm = False
+
+
+routes = RoomRoutes(getattr(settings, "ROOM_ROUTE_CACHE_SIZE", ROUTE_CACHE_SIZE))
@@ -0,0 +1,24 @@
+# Model signal hooks (wired in apps.GuestConfig.ready)
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from hotelportal.models import Room
+from website.models import Hotel
+from .room_token import invalidate_room_state
+from .shortcodes import routes
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def hotel_changed(sender, instance, **kwargs):
+    # status may have changed (paused/disabled) → every room token of this hotel is stale
+    invalidate_room_state(hotel_id=instance.id)
+    routes.discard_hotel(instance.id)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, instance, **kwargs):
+    invalidate_room_state(room_id=instance.id)
+    routes.discard(instance.short_code)
@@ -1,3 +1,404 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from hotelportal.models import Room, Category, Item, Cart, OpenRequestStats, Request, RequestLine
+from website.models import Hotel
+from .cart import adjust_totals
+from .room_token import ROOM_TOKEN_COOKIE, ROOM_TOKEN_MAX_AGE, RoomGate, issue_token
+from .shortcodes import routes
+
+
+class GuestTestMixin:
+    def setUp(self):
+        self.hotel = Hotel.objects.create(name="Test Hotel")
+        self.room = Room.objects.create(hotel=self.hotel, number="101")
+        self.food = Category.objects.create(hotel=self.hotel, name="Mains", kind="FOOD")
+        self.svc = Category.objects.create(hotel=self.hotel, name="Housekeeping", kind="SERVICE")
+        self.burger = Item.objects.create(hotel=self.hotel, category=self.food, name="Burger", price=100)
+        self.towels = Item.objects.create(hotel=self.hotel, category=self.svc, name="Extra towels", price=0)
+
+    def url(self, name):
+        return reverse(name, args=[self.hotel.id, self.room.id])
+
+
+class CatalogCacheTests(GuestTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def catalog_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.url("guest_room"))
+        self.assertEqual(resp.status_code, 200)
+        return resp, [q["sql"] for q in ctx if "hotelportal_category" in q["sql"] or "hotelportal_item" in q["sql"]]
+
+    def test_warm_render_runs_no_catalog_queries(self):
+        _, cold = self.catalog_queries()
+        self.assertTrue(cold)
+        _, warm = self.catalog_queries()
+        self.assertEqual(warm, [])
+
+    def test_item_and_category_edits_invalidate_the_cached_menu(self):
+        self.catalog_queries()
+
+        self.burger.name = "Cheese burger"
+        self.burger.save()
+        resp, queries = self.catalog_queries()
+        self.assertTrue(queries)  # rebuilt for the new catalog_version
+        self.assertContains(resp, "Cheese burger")
+
+        self.food.name = "Grill"
+        self.food.save()
+        resp, _ = self.catalog_queries()
+        self.assertContains(resp, "Grill")
+        self.assertEqual(self.catalog_queries()[1], [])
+
+
+class CartStateTests(GuestTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.fries = Item.objects.create(hotel=self.hotel, category=self.food, name="Fries", price=Decimal("45.50"))
+
+    def assert_cart(self, resp, lines):
+        """lines: [(item, qty)] expected in the cart, in the order added."""
+        self.assertEqual(resp.status_code, 200)
+        count = sum(qty for _, qty in lines)
+        total = sum((item.price * qty for item, qty in lines), Decimal("0.00"))
+
+        cart = Cart.objects.get(status="DRAFT")
+        self.assertEqual((cart.item_count, cart.total), (count, total))  # denormalized counters
+        self.assertEqual(self.client.get(self.url("guest_room")).context["cart_count"], count)
+
+        doc = self.client.get(self.url("cart_view"), HTTP_ACCEPT="application/json").json()
+        self.assertEqual(doc, {
+            "count": count,
+            "total": f"{total:.2f}",
+            "lines": [{"item_id": item.id, "name": item.name, "qty": qty, "price": f"{item.price:.2f}"}
+                      for item, qty in lines],
+        })
+
+        html = self.client.get(self.url("cart_view"))
+        self.assertEqual(html["X-Cart-Count"], str(doc["count"]))
+        self.assertEqual(html["Vary"], "Accept")
+        if lines:
+            self.assertContains(html, f"₹ {doc['total']}</strong>")
+            for line in doc["lines"]:
+                self.assertContains(html, f"<div>{line['name']}</div>")
+                self.assertContains(html, f'data-id="{line["item_id"]}"', count=2)
+        else:
+            self.assertContains(html, "Your cart is empty.")
+
+    def test_counters_and_json_follow_add_update_and_clear(self):
+        self.assert_cart(self.client.get(self.url("cart_view")), [])
+
+        resp = self.client.post(self.url("cart_add"), {"item_id": self.burger.id, "qty": 2})
+        self.assert_cart(resp, [(self.burger, 2)])
+        resp = self.client.post(self.url("cart_add"), {"item_id": self.fries.id})
+        self.assert_cart(resp, [(self.burger, 2), (self.fries, 1)])
+        resp = self.client.post(self.url("cart_add"), {"item_id": self.fries.id, "qty": 2})
+        self.assert_cart(resp, [(self.burger, 2), (self.fries, 3)])
+
+        resp = self.client.post(self.url("cart_update"), {"item_id": self.burger.id, "qty": 1})
+        self.assert_cart(resp, [(self.burger, 1), (self.fries, 3)])
+        resp = self.client.post(self.url("cart_update"), {"item_id": self.fries.id, "qty": 3})  # no-op
+        self.assert_cart(resp, [(self.burger, 1), (self.fries, 3)])
+        resp = self.client.post(self.url("cart_update"), {"item_id": self.burger.id, "qty": 0})
+        self.assert_cart(resp, [(self.fries, 3)])
+
+        resp = self.client.post(self.url("cart_clear"))
+        self.assert_cart(resp, [])
+
+    def test_json_response_for_writes(self):
+        resp = self.client.post(self.url("cart_add"), {"item_id": self.fries.id, "qty": 2},
+                                HTTP_ACCEPT="application/json")
+        self.assertEqual(resp.json(), {
+            "count": 2, "total": "91.00",
+            "lines": [{"item_id": self.fries.id, "name": "Fries", "qty": 2, "price": "45.50"}],
+        })
+        self.assertEqual(resp["X-Cart-Count"], "2")
+
+
+class OrderSubmitTests(GuestTestMixin, TestCase):
+    def test_replay_with_same_key_returns_original_request(self):
+        self.client.post(self.url("cart_add"), {"item_id": self.burger.id, "qty": 2})
+
+        first = self.client.post(self.url("order_submit_stub"), HTTP_IDEMPOTENCY_KEY="k-1").json()
+        replay = self.client.post(self.url("order_submit_stub"), HTTP_IDEMPOTENCY_KEY="k-1").json()
+
+        self.assertTrue(first["ok"])
+        self.assertEqual(replay["request_id"], first["request_id"])
+        self.assertTrue(replay["replayed"])
+        self.assertEqual(Request.objects.count(), 1)
+        self.assertEqual(RequestLine.objects.get().qty, 2)
+        self.assertEqual(Cart.objects.get(status="SUBMITTED").item_count, 0)
+
+    def test_double_submit_without_key_creates_one_ticket(self):
+        self.client.post(self.url("cart_add"), {"item_id": self.burger.id})
+
+        self.assertTrue(self.client.post(self.url("order_submit_stub")).json()["ok"])
+        second = self.client.post(self.url("order_submit_stub"))
+
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(Request.objects.count(), 1)
+
+
+class SummaryTests(GuestTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.post(self.url("cart_add"), {"item_id": self.burger.id, "qty": 2})
+        self.client.post(self.url("order_submit_stub"))
+        self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+        self.order, self.service = Request.objects.order_by("id")
+
+    def test_unchanged_summary_is_304(self):
+        full = self.client.get(self.url("guest_summary"))
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual([f["name"] for f in full.json()["food"]], ["Burger"])
+        self.assertEqual([s["request_id"] for s in full.json()["services"]], [self.service.id])
+
+        again = self.client.get(self.url("guest_summary"), HTTP_IF_NONE_MATCH=full["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], full["ETag"])
+
+    def test_status_change_gives_a_new_etag(self):
+        etag = self.client.get(self.url("guest_summary"))["ETag"]
+        self.order.mark_accepted()
+        self.order.save()
+
+        resp = self.client.get(self.url("guest_summary"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(resp.json()["food"][0]["status"], "ACCEPTED")
+
+    def test_since_returns_only_requests_changed_after_the_cursor(self):
+        cursor = self.client.get(self.url("guest_summary")).json()["cursor"]
+        unchanged = self.client.get(self.url("guest_summary"), {"since": cursor}).json()
+        self.assertEqual((unchanged["changed"], unchanged["food"], unchanged["services"]), ([], [], []))
+        self.assertEqual(unchanged["cursor"], cursor)
+
+        self.service.mark_completed()
+        self.service.save()
+        delta = self.client.get(self.url("guest_summary"), {"since": cursor}).json()
+        self.assertEqual(delta["changed"], [self.service.id])
+        self.assertEqual(delta["food"], [])
+        self.assertEqual([s["status"] for s in delta["services"]], ["COMPLETED"])
+        self.assertNotEqual(delta["cursor"], cursor)
+
+
+class ServiceRequestTests(GuestTestMixin, TestCase):
+    def test_second_request_for_open_service_is_409(self):
+        ok = self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+        dup = self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(dup.status_code, 409)
+        self.assertEqual(dup.json()["error"], "already_requested")
+
+    def test_can_request_again_once_completed(self):
+        self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+        Request.objects.update(status="COMPLETED")
+
+        again = self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+        self.assertEqual(again.status_code, 200)
+
+    def test_other_integrity_errors_are_not_reported_as_duplicates(self):
+        with mock.patch.object(Request.objects, "create", side_effect=IntegrityError("NOT NULL constraint failed")):
+            with self.assertRaises(IntegrityError):
+                self.client.post(self.url("service_request"), {"item_id": self.towels.id})
+
+
+class ServiceRequestConcurrencyTests(GuestTestMixin, TransactionTestCase):
+    THREADS = 8
+
+    def test_simultaneous_taps_create_one_ticket(self):
+        # warm the room token once so every thread goes straight to the INSERT
+        self.client.get(self.url("guest_room"))
+        cookies = self.client.cookies
+        barrier = threading.Barrier(self.THREADS)
+        responses = []
+
+        def tap():
+            client = Client()
+            client.cookies = cookies
+            try:
+                barrier.wait()
+                responses.append(client.post(self.url("service_request"), {"item_id": self.towels.id}))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=tap) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        statuses = sorted(r.status_code for r in responses)
+        self.assertEqual(statuses, [200] + [409] * (self.THREADS - 1))
+        self.assertTrue(all(r.json()["error"] == "already_requested" for r in responses if r.status_code == 409))
+        self.assertEqual(Request.objects.filter(service_item=self.towels).count(), 1)
+        self.assertEqual(OpenRequestStats.objects.get(hotel=self.hotel).new_count, 1)
+
+
+class RoomTokenTests(GuestTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def add_burger(self, client=None, room=None):
+        url = reverse("cart_add", args=[self.hotel.id, (room or self.room).id])
+        return (client or self.client).post(url, {"item_id": self.burger.id})
+
+    def assert_fell_back(self, resp, room=None):
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(ROOM_TOKEN_COOKIE, resp.cookies)  # re-issued from the database
+        draft = Cart.objects.get(room=room or self.room, status="DRAFT")
+        self.assertEqual(draft.item_count, 1)
+
+    def test_valid_token_is_used_as_is(self):
+        self.client.get(self.url("guest_room"))
+        resp = self.add_burger()
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn(ROOM_TOKEN_COOKIE, resp.cookies)
+
+    def test_tampered_token_falls_back(self):
+        self.client.get(self.url("guest_room"))
+        raw = self.client.cookies[ROOM_TOKEN_COOKIE].value
+        self.client.cookies[ROOM_TOKEN_COOKIE] = raw[:-4] + ("AAAA" if raw[-4:] != "AAAA" else "BBBB")
+        self.assert_fell_back(self.add_burger())
+
+    def test_expired_token_falls_back(self):
+        cart = Cart.objects.create(hotel=self.hotel, room=self.room)
+        gate = RoomGate(hotel_id=self.hotel.id, room_id=self.room.id, cart_id=cart.id)
+        with mock.patch("time.time", return_value=time.time() - ROOM_TOKEN_MAX_AGE - 60):
+            self.client.cookies[ROOM_TOKEN_COOKIE] = issue_token(gate)
+        self.assert_fell_back(self.add_burger())
+
+    def test_token_for_another_room_falls_back(self):
+        self.client.get(self.url("guest_room"))  # token for room 101
+        other = Room.objects.create(hotel=self.hotel, number="102")
+        self.assert_fell_back(self.add_burger(room=other), room=other)
+        self.assertEqual(Cart.objects.get(room=self.room).item_count, 0)
+
+    def test_token_of_a_submitted_cart_moves_to_a_new_draft(self):
+        phone, tablet = Client(), Client()
+        phone.get(self.url("guest_room"))
+        tablet.get(self.url("guest_room"))
+        self.add_burger(phone)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(phone.post(self.url("order_submit_stub")).json()["ok"])
+        submitted = Cart.objects.get(status="SUBMITTED")
+
+        self.assert_fell_back(self.add_burger(tablet))
+        self.assertEqual(Cart.objects.get(pk=submitted.pk).item_count, 0)
+        self.assertTrue(tablet.post(self.url("order_submit_stub")).json()["ok"])
+        self.assertEqual(Request.objects.count(), 2)
+
+    def test_cart_submitted_after_the_token_check_rolls_back_and_retries(self):
+        self.client.get(self.url("guest_room"))
+        submitted = Cart.objects.get()
+        # submitted behind the token's back: the room's state version still matches
+        Cart.objects.filter(pk=submitted.pk).update(status="SUBMITTED")
+
+        self.assert_fell_back(self.add_burger())
+        self.assertFalse(submitted.items.exists())
+        self.assertEqual(Cart.objects.get(pk=submitted.pk).item_count, 0)
+
+
+class ShortCodeTests(GuestTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        routes.clear()
+        self.addCleanup(routes.clear)
+
+    def test_warm_redirect_needs_no_query(self):
+        self.client.get(reverse("room_short", args=["nosuchcode"]))  # warms the table
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse("room_short", args=[self.room.short_code]))
+        self.assertRedirects(resp, self.url("guest_room"), fetch_redirect_response=False)
+
+    def test_deactivated_room_is_dropped_from_table(self):
+        self.client.get(reverse("room_short", args=[self.room.short_code]))
+
+        self.room.is_active = False
+        self.room.save()
+
+        self.assertEqual(self.client.get(reverse("room_short", args=[self.room.short_code])).status_code, 404)
+
+    def test_reactivation_elsewhere_is_seen_without_a_discard(self):
+        # .update() skips the signals, like a save made in another worker
+        Room.objects.filter(pk=self.room.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse("room_short", args=[self.room.short_code])).status_code, 404)
+        Room.objects.filter(pk=self.room.pk).update(is_active=True)
+        resp = self.client.get(reverse("room_short", args=[self.room.short_code]))
+        self.assertRedirects(resp, self.url("guest_room"), fetch_redirect_response=False)
+
+    def test_unknown_codes_are_not_cached(self):
+        self.client.get(reverse("room_short", args=["later123"]))
+        self.assertEqual(len(routes), 1)  # just the warmed room
+        Room.objects.filter(pk=self.room.pk).update(short_code="later123")
+        resp = self.client.get(reverse("room_short", args=["later123"]))
+        self.assertRedirects(resp, self.url("guest_room"), fetch_redirect_response=False)
+
+
+class MenuSearchTests(GuestTestMixin, TestCase):
+    def search(self, q):
+        return [r["name"] for r in self.client.get(self.url("menu_search"), {"q": q}).json()["results"]]
+
+    def test_prefix_match_ranked_and_scoped_to_hotel(self):
+        Item.objects.create(hotel=self.hotel, category=self.food, name="Fries", description="Goes with a burger", price=60)
+        Item.objects.create(hotel=self.hotel, category=self.food, name="Crème brûlée", price=150)
+        other = Hotel.objects.create(name="Other Hotel")
+        cat = Category.objects.create(hotel=other, name="Mains", kind="FOOD")
+        Item.objects.create(hotel=other, category=cat, name="Burger deluxe", price=300)
+
+        self.assertEqual(self.search("bur"), ["Burger", "Fries"])  # name beats description
+        self.assertEqual(self.search("creme"), ["Crème brûlée"])
+        self.assertEqual(self.search("b"), [])
+        self.assertEqual(self.search('bur" OR hotel:*'), [])  # query syntax is stripped, not parsed
+
+    def test_index_follows_saves_and_deletes(self):
+        self.burger.name = "Cheeseburger"
+        self.burger.save()
+        self.assertEqual(self.search("chee"), ["Cheeseburger"])
+
+        self.burger.is_available = False
+        self.burger.save()
+        self.assertEqual(self.search("chee"), [])
+
+        self.food.name = "Grill"
+        self.food.save()
+        self.assertEqual(self.search("grill"), [])
+        self.towels.delete()
+        self.assertEqual(self.search("tow"), [])
+        self.assertEqual(self.search("housek"), [])
+
+
+class LockRetryTests(GuestTestMixin, TransactionTestCase):
+    # TestCase's wrapping transaction would (rightly) disable the retry
+
+    @mock.patch("scan2service.retry.time.sleep")
+    def test_locked_write_is_retried_from_a_clean_slate(self, _sleep):
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return adjust_totals(*args)
+
+        with mock.patch("guest.views.adjust_totals", side_effect=flaky), self.assertLogs("scan2service.retry"):
+            resp = self.client.post(self.url("cart_add"), {"item_id": self.burger.id, "qty": 2})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        cart = Cart.objects.get()
+        self.assertEqual((cart.item_count, cart.items.get().qty), (2, 2))  # first attempt rolled back
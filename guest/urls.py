@@ -2,9 +2,15 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    # printed QR codes point here (short, opaque) → redirect to guest_room
+    path("q/<str:code>", views.short_code_redirect, name="room_short"),
+
     # main guest page
     path("h/<int:hotel_id>/r/<int:room_id>/", views.room_view, name="guest_room"),
 
+    # menu type-ahead (JSON)
+    path("h/<int:hotel_id>/r/<int:room_id>/search/", views.menu_search, name="menu_search"),
+
     # cart (HTML fragments)
     path("h/<int:hotel_id>/r/<int:room_id>/cart/view/",   views.cart_view,   name="cart_view"),
     path("h/<int:hotel_id>/r/<int:room_id>/cart/add/",    views.cart_add,    name="cart_add"),
@@ -4,12 +4,23 @@ from collections import defaultdict
 from decimal import Decimal
 
 from django.db import transaction, IntegrityError
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.http import require_GET, require_POST
 
-from hotelportal.models import Hotel, Room, Category, Item, Cart, CartItem, Request, RequestLine
+from hotelportal.catalog import get_catalog
+from hotelportal.cursors import after_cursor, decode_cursor, encode_cursor
+from hotelportal.events import publish_request_event
+from hotelportal.models import Hotel, Room, Item, Cart, CartItem, Request, RequestLine
+from hotelportal.search import search_items
+from scan2service.retry import retry_on_locked
+from scan2service.routers import read_replica
+from .cart import adjust_totals, cart_document, cart_state, reset_totals
+from .room_token import RoomGate, StaleCart, clear_token_cookie, invalidate_room_state, room_session, set_token_cookie
+from .shortcodes import routes
 
 
 
@@ -32,22 +43,36 @@ def _get_or_create_cart(hotel, room, stay=None):
     return cart
 
 
-def _badge_count(cart: Cart) -> int:
-    return sum(ci.qty for ci in cart.items.all())
+def _cart_response(request, cart_id) -> HttpResponse:
+    """
+    Cart fragment (HTML) — or the compact cart document when the client sends
+    Accept: application/json and renders it itself. One query either way.
+    """
+    state = cart_state(cart_id)
+    if request.get_preferred_type(["text/html", "application/json"]) == "application/json":
+        resp = JsonResponse(cart_document(state))
+    else:
+        html = render_to_string(
+            "guest/_cart_body.html",
+            {"items": state["lines"], "total": state["total"]},
+        )
+        resp = HttpResponse(html)
+    # send live badge count in header so JS can update the bubble
+    resp["X-Cart-Count"] = str(state["count"])
+    resp["Vary"] = "Accept"
+    return resp
 
 
-def _render_cart_fragment(cart: Cart) -> HttpResponse:
-    items = list(cart.items.select_related("item"))
-    total = sum((ci.price_snapshot * ci.qty for ci in items), Decimal("0.00"))
+# ---------- QR short code ----------
 
-    html = render_to_string(
-        "guest/_cart_body.html",
-        {"cart": cart, "items": items, "total": total},
-    )
-    resp = HttpResponse(html)
-    # send live badge count in header so JS can update the bubble
-    resp["X-Cart-Count"] = str(_badge_count(cart))
-    return resp
+@require_GET
+def short_code_redirect(request, code):
+    """/q/<code> from a printed QR → the room page. No DB hit once the routing table is warm."""
+    entry = routes.resolve(code)
+    if entry is None or not entry[2]:
+        raise Http404("Unknown or inactive room code")
+    hotel_id, room_id, _ = entry
+    return HttpResponseRedirect(reverse("guest_room", args=[hotel_id, room_id]))
 
 
 # ---------- main page ----------
@@ -55,40 +80,18 @@ def _render_cart_fragment(cart: Cart) -> HttpResponse:
 from collections import defaultdict
 from django.shortcuts import render, get_object_or_404
 
+# not @read_replica: it may create the cart, and the open-service check must
+# see the request the guest just made, not a lagging copy
 def room_view(request, hotel_id, room_id):
     hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
     room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
 
-    # Categories and items (active/available)
-    cats = (
-        Category.objects
-        .filter(hotel=hotel, is_active=True)
-        .select_related("parent")
-        .order_by("position", "name")
-    )
-    items = (
-        Item.objects
-        .filter(hotel=hotel, is_available=True)
-        .select_related("category", "image")
-        .order_by("position", "name")
-    )
-
-    # Group items by category id
-    items_by_cat = defaultdict(list)
-    for it in items:
-        items_by_cat[it.category_id].append(it)
-
-    # Build children map and top-level lists
-    children = defaultdict(list)
-    top_food, top_service = [], []
-    for c in cats:
-        if c.parent_id:
-            children[c.parent_id].append(c)
-        else:
-            (top_food if c.kind == "FOOD" else top_service).append(c)
+    # Categories and items (active/available) — prebuilt tree, cached per catalog_version
+    catalog = get_catalog(hotel)
 
     # Cart for this room (Day-4: stay=None)
     cart = _get_or_create_cart(hotel, room, stay=None)
+    gate = RoomGate(hotel_id=hotel.id, room_id=room.id, cart_id=cart.id, _hotel=hotel, _room=room)
 
     # ⬇️ NEW: find service items that already have an open request (NEW/ACCEPTED) for this room
     open_service_ids = set(
@@ -106,29 +109,41 @@ def room_view(request, hotel_id, room_id):
     ctx = dict(
         hotel=hotel,
         room=room,
-        top_food=top_food,
-        top_service=top_service,
-        children=children,
-        items_by_cat=items_by_cat,
-        cart_count=_badge_count(cart),
+        top_food=catalog["top_food"],
+        top_service=catalog["top_service"],
+        children=catalog["children"],
+        items_by_cat=catalog["items_by_cat"],
+        cart_count=cart.item_count,
         open_service_ids=open_service_ids,  # ⬅️ used in template to disable buttons
     )
-    return render(request, "guest/room.html", ctx)
+    resp = render(request, "guest/room.html", ctx)
+    set_token_cookie(resp, request, gate)  # cart/request clicks skip hotel/room/cart lookups
+    return resp
 
 # ---------- cart endpoints (HTML) ----------
+# All of these resolve hotel/room/cart through the signed room token
+# (guest/room_token.py) and only hit the database for them when it is stale.
 
 @require_GET
-def cart_view(request, hotel_id, room_id):
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
-    cart = _get_or_create_cart(hotel, room, stay=None)
-    return _render_cart_fragment(cart)
+@room_session
+def cart_view(request, gate):
+    return _cart_response(request, gate.cart_id)
+
+
+@require_GET
+@room_session
+def menu_search(request, gate):
+    """
+    ?q=<prefix> → {"results": [{id, name, price, category, kind}, ...]}, best
+    match first. One FTS5 query (hotelportal/search.py) when the room token is valid.
+    """
+    return JsonResponse({"results": search_items(gate.hotel_id, request.GET.get("q", "")[:100])})
 
 
 @require_POST
-def cart_add(request, hotel_id, room_id):
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
+@retry_on_locked
+@room_session
+def cart_add(request, gate):
     item_id = request.POST.get("item_id")
     qty = int(request.POST.get("qty", "1") or "1")
     if not item_id:
@@ -136,8 +151,8 @@ def cart_add(request, hotel_id, room_id):
     if qty < 1:
         qty = 1
 
-    item = get_object_or_404(Item, id=item_id, hotel=hotel, is_available=True)
-    cart = _get_or_create_cart(hotel, room, stay=None)
+    item = get_object_or_404(Item, id=item_id, hotel_id=gate.hotel_id, is_available=True)
+    cart = gate.cart
 
     with transaction.atomic():
         ci, created = CartItem.objects.select_for_update().get_or_create(
@@ -148,81 +163,151 @@ def cart_add(request, hotel_id, room_id):
         if not created:
             ci.qty += qty
             ci.save(update_fields=["qty"])
-    return _render_cart_fragment(cart)
+        if not adjust_totals(cart.id, qty, ci.price_snapshot * qty):
+            raise StaleCart
+    return _cart_response(request, cart.id)
 
 
 @require_POST
-def cart_update(request, hotel_id, room_id):
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
+@retry_on_locked
+@room_session
+def cart_update(request, gate):
     item_id = request.POST.get("item_id")
     qty = int(request.POST.get("qty", "1") or "1")
     if not item_id:
         return HttpResponseBadRequest("Missing item_id")
 
-    cart = _get_or_create_cart(hotel, room, stay=None)
-    ci = get_object_or_404(CartItem, cart=cart, item_id=item_id)
-    if qty <= 0:
-        ci.delete()
-    else:
-        ci.qty = qty
-        ci.save(update_fields=["qty"])
-    return _render_cart_fragment(cart)
+    cart = gate.cart
+    with transaction.atomic():
+        ci = get_object_or_404(CartItem.objects.select_for_update(), cart=cart, item_id=item_id)
+        old_qty = ci.qty
+        if qty <= 0:
+            ci.delete()
+            qty = 0
+        else:
+            ci.qty = qty
+            ci.save(update_fields=["qty"])
+        if not adjust_totals(cart.id, qty - old_qty, ci.price_snapshot * (qty - old_qty)):
+            raise StaleCart
+    return _cart_response(request, cart.id)
 
 
 @require_POST
-def cart_clear(request, hotel_id, room_id):
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
-    cart = _get_or_create_cart(hotel, room, stay=None)
-    cart.items.all().delete()
-    return _render_cart_fragment(cart)
+@retry_on_locked
+@room_session
+def cart_clear(request, gate):
+    cart = gate.cart
+    with transaction.atomic():
+        cart.items.all().delete()
+        if not reset_totals(cart.id):
+            raise StaleCart
+    return _cart_response(request, cart.id)
+
+
+IDEMPOTENCY_KEY_MAX = 64
+
+
+class _NothingToSubmit(Exception):
+    pass
+
+
+def _replayed_order(gate, key):
+    if not key:
+        return None
+    return (
+        Request.objects
+        .filter(room_id=gate.room_id, idempotency_key=key)
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def _order_response(gate, request_id, replayed=False):
+    data = {"ok": True, "request_id": request_id}
+    if replayed:
+        data["replayed"] = True
+    resp = JsonResponse(data)
+    # token pointed at the cart we just submitted → next click opens a new DRAFT cart
+    gate.reissue = False
+    clear_token_cookie(resp, gate)
+    return resp
 
 
 @require_POST
-def order_submit_stub(request, hotel_id, room_id):
+@retry_on_locked
+@room_session
+def order_submit_stub(request, gate):
     """
     Day-5: Convert DRAFT cart -> Request(kind=FOOD, status=NEW) + RequestLines,
     clear the cart, mark cart SUBMITTED. Returns JSON {ok: true, request_id}.
-    """
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room  = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
 
-    cart = Cart.objects.filter(hotel=hotel, room=room, status="DRAFT").first()
-    if not cart or not cart.items.exists():
+    Safe to retry: send the same Idempotency-Key header (or `idempotency_key`
+    field) and a replay returns the original request_id. The cart is claimed
+    with a conditional UPDATE (DRAFT → SUBMITTED) before anything is written,
+    so two concurrent submits can never both turn it into a ticket.
+    """
+    key = (request.headers.get("Idempotency-Key") or request.POST.get("idempotency_key") or "").strip() or None
+    if key and len(key) > IDEMPOTENCY_KEY_MAX:
+        return HttpResponseBadRequest("Idempotency key too long")
+
+    existing = _replayed_order(gate, key)
+    if existing:
+        return _order_response(gate, existing, replayed=True)
+
+    try:
+        with transaction.atomic():
+            # claim (and write-lock) the DRAFT cart; 0 rows → someone already submitted
+            # it, so the token is stale: room_session retries on the room's DRAFT cart
+            if not Cart.objects.filter(id=gate.cart_id, status="DRAFT").update(
+                status="SUBMITTED", item_count=0, total=Decimal("0.00"), updated_at=timezone.now()
+            ):
+                raise StaleCart
+            cart_items = list(CartItem.objects.filter(cart_id=gate.cart_id).select_related("item"))
+            if not cart_items:
+                raise _NothingToSubmit  # rolls the claim back
+
+            # one pass: subtotal + line snapshots
+            subtotal = Decimal("0.00")
+            lines = []
+            for ci in cart_items:
+                line_total = ci.price_snapshot * ci.qty
+                subtotal += line_total
+                lines.append(RequestLine(
+                    item=ci.item,
+                    name_snapshot=ci.item.name,
+                    price_snapshot=ci.price_snapshot,
+                    qty=ci.qty,
+                    line_total=line_total,
+                ))
+
+            # create request (stay=None for now)
+            req = Request.objects.create(
+                hotel_id=gate.hotel_id, room_id=gate.room_id, stay=None,
+                kind="FOOD", status="NEW", subtotal=subtotal, idempotency_key=key,
+            )
+            for ln in lines:
+                ln.request = req
+            RequestLine.objects.bulk_create(lines)
+
+            # clear cart; other devices' tokens still name it → drop them
+            CartItem.objects.filter(cart_id=gate.cart_id).delete()
+            transaction.on_commit(lambda: invalidate_room_state(room_id=gate.room_id))
+
+            publish_request_event(req, "created")
+    except _NothingToSubmit:
+        # a concurrent submit with our key may have just committed
+        existing = _replayed_order(gate, key)
+        if existing:
+            return _order_response(gate, existing, replayed=True)
         return JsonResponse({"ok": False, "error": "empty_cart"}, status=400)
+    except IntegrityError:
+        # same key raced us past the first check; theirs won
+        existing = _replayed_order(gate, key)
+        if not existing:
+            raise
+        return _order_response(gate, existing, replayed=True)
 
-    with transaction.atomic():
-        # compute subtotal
-        subtotal = Decimal("0.00")
-        for ci in cart.items.all():
-            subtotal += ci.price_snapshot * ci.qty
-
-        # create request (stay=None for now)
-        req = Request.objects.create(
-            hotel=hotel, room=room, stay=None,
-            kind="FOOD", status="NEW", subtotal=subtotal
-        )
-
-        # lines with snapshots
-        lines = []
-        for ci in cart.items.select_related("item"):
-            lines.append(RequestLine(
-                request=req,
-                item=ci.item,
-                name_snapshot=ci.item.name,
-                price_snapshot=ci.price_snapshot,
-                qty=ci.qty,
-                line_total=ci.price_snapshot * ci.qty,
-            ))
-        RequestLine.objects.bulk_create(lines)
-
-        # clear cart
-        cart.items.all().delete()
-        cart.status = "SUBMITTED"
-        cart.save(update_fields=["status"])
-
-    return JsonResponse({"ok": True, "request_id": req.id})
+    return _order_response(gate, req.id)
 
 
 
@@ -230,32 +315,39 @@ def order_submit_stub(request, hotel_id, room_id):
 
 
 @require_POST
-def service_request(request, hotel_id, room_id):
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room  = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
-
+@retry_on_locked
+@room_session
+def service_request(request, gate):
     item_id = request.POST.get("item_id")
     if not item_id:
         return HttpResponseBadRequest("Missing item_id")
 
-    item = get_object_or_404(Item, id=item_id, hotel=hotel, is_available=True)
+    item = get_object_or_404(
+        Item.objects.select_related("category"), id=item_id, hotel_id=gate.hotel_id, is_available=True
+    )
     if item.category.kind != "SERVICE":
         return JsonResponse({"ok": False, "error": "not_a_service"}, status=400)
 
-    # Block duplicates: same room & service item with open status
-    open_exists = Request.objects.filter(
-        hotel=hotel, room=room, kind="SERVICE",
-        service_item=item, status__in=["NEW", "ACCEPTED"]
-    ).exists()
-    if open_exists:
-        return JsonResponse({"ok": False, "error": "already_requested"}, status=409)
-
+    # Block duplicates: same room & service item with open status. The
+    # uniq_open_service_request_per_room constraint does the check, so this is
+    # one INSERT and stays correct when two taps race.
     price = item.price if item.price is not None else Decimal("0.00")
-    req = Request.objects.create(
-        hotel=hotel, room=room, stay=None,
-        kind="SERVICE", status="NEW", subtotal=price,
-        note=item.name, service_item=item
-    )
+    try:
+        with transaction.atomic():
+            req = Request.objects.create(
+                hotel_id=gate.hotel_id, room_id=gate.room_id, stay=None,
+                kind="SERVICE", status="NEW", subtotal=price,
+                note=item.name, service_item=item
+            )
+    except IntegrityError:
+        # only the open-service constraint means "already requested"; anything else is a bug
+        open_dupe = Request.objects.filter(
+            room_id=gate.room_id, service_item=item, status__in=["NEW", "ACCEPTED"]
+        ).exists()
+        if not open_dupe:
+            raise
+        return JsonResponse({"ok": False, "error": "already_requested"}, status=409)
+    publish_request_event(req, "created")
     return JsonResponse({"ok": True, "request_id": req.id})
 
 
@@ -266,28 +358,73 @@ def service_request(request, hotel_id, room_id):
 
 
 
+SUMMARY_LIMIT = 50
+
+
+def _summary_etag(room_id, reqs):
+    # newest change among the listed requests (+ how many) identifies the whole document
+    if not reqs:
+        return f'"s{room_id}-empty"'
+    head = max(reqs, key=lambda r: (r.updated_at, r.id))
+    return f'"s{room_id}-{encode_cursor(head.updated_at, head.id)}-{len(reqs)}"'
+
+
 @require_GET
-def my_summary(request, hotel_id, room_id):
+@read_replica
+@room_session
+def my_summary(request, gate):
     """
     Return combined FOOD (lines) and SERVICE (notes) for this room.
     JSON shape tailored to the modal we built.
+
+    At most two queries: the requests, then every FOOD line in one batch.
+    Full responses carry an ETag (→ 304 on repeat opens); ?since=<cursor>
+    returns only requests changed after that cursor (`changed` lists their ids).
     """
-    hotel = get_object_or_404(Hotel, id=hotel_id, status="ACTIVE")
-    room  = get_object_or_404(Room, id=room_id, hotel=hotel, is_active=True)
+    since = decode_cursor(request.GET.get("since"))
+    qs = Request.objects.filter(hotel_id=gate.hotel_id, room_id=gate.room_id).only(
+        "id", "kind", "status", "subtotal", "note", "created_at", "updated_at"
+    )
+    if since:
+        qs = qs.filter(after_cursor("updated_at", since)).order_by("updated_at", "id")
+    else:
+        # recent first; you can add date range later
+        qs = qs.order_by("-created_at")
+    reqs = list(qs[:SUMMARY_LIMIT])
+
+    etag = None
+    if not since:
+        etag = _summary_etag(gate.room_id, reqs)
+        if request.headers.get("If-None-Match") == etag:
+            resp = HttpResponse(status=304)
+            resp["ETag"] = etag
+            return resp
+
+    lines_by_req = defaultdict(list)
+    food_ids = [r.id for r in reqs if r.kind == "FOOD"]
+    if food_ids:
+        lines = (
+            RequestLine.objects
+            .filter(request_id__in=food_ids)
+            .order_by("id")
+            .values_list("request_id", "name_snapshot", "qty", "price_snapshot")
+        )
+        for request_id, name, qty, price in lines:
+            lines_by_req[request_id].append((name, qty, price))
 
-    # recent first; you can add date range later
-    reqs = Request.objects.filter(hotel=hotel, room=room).select_related().order_by("-created_at")[:50]
+    if since:
+        reqs.sort(key=lambda r: r.created_at, reverse=True)
 
     food = []
     services = []
     for r in reqs:
         if r.kind == "FOOD":
-            for ln in r.lines.select_related("item"):
+            for name, qty, price in lines_by_req[r.id]:
                 food.append({
                     "request_id": r.id,
-                    "name": ln.name_snapshot,
-                    "qty": ln.qty,
-                    "price": float(ln.price_snapshot),
+                    "name": name,
+                    "qty": qty,
+                    "price": float(price),
                     "status": r.status,
                     "ts": r.created_at.isoformat(),
                 })
@@ -302,5 +439,17 @@ def my_summary(request, hotel_id, room_id):
                 "ts": r.created_at.isoformat(),
             })
 
-    return JsonResponse({"food": food, "services": services})
-
+    if reqs:
+        head = max(reqs, key=lambda r: (r.updated_at, r.id))
+        cursor = encode_cursor(head.updated_at, head.id)
+    else:
+        cursor = request.GET.get("since") if since else None
+
+    data = {"food": food, "services": services, "cursor": cursor}
+    if since:
+        data["changed"] = [r.id for r in reqs]
+    resp = JsonResponse(data)
+    if etag:
+        resp["ETag"] = etag
+        resp["Cache-Control"] = "private, no-cache"  # browser revalidates → 304
+    return resp
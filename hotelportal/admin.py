@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Room, Stay, Request, RequestLine, Category, ImageAsset, Item   
+from .models import Room, Stay, Request, RequestLine, Category, ImageAsset, Item, DailyRequestCounter, OpenRequestStats
 
 
 
@@ -71,3 +71,27 @@ class RequestLineAdmin(admin.ModelAdmin):
     list_filter  = ("item__hotel",)
     search_fields = ("name_snapshot", "request__id")
     autocomplete_fields = ("request", "item")
+
+@admin.register(DailyRequestCounter)
+class DailyRequestCounterAdmin(admin.ModelAdmin):
+    list_display = ("hotel", "day", "kind", "status", "count")
+    list_filter  = ("hotel", "kind", "status")
+    date_hierarchy = "day"
+    readonly_fields = ("hotel", "day", "kind", "status", "count")
+    actions = ("recount",)
+
+    @admin.action(description="Recount the selected hotels from requests")
+    def recount(self, request, queryset):
+        for hotel_id in set(queryset.values_list("hotel_id", flat=True)):
+            DailyRequestCounter.recount(hotel_id)
+
+@admin.register(OpenRequestStats)
+class OpenRequestStatsAdmin(admin.ModelAdmin):
+    list_display = ("hotel", "new_count", "accepted_count", "oldest_open_at")
+    readonly_fields = ("hotel", "new_count", "accepted_count", "oldest_open_at")
+    actions = ("recount",)
+
+    @admin.action(description="Recount from requests")
+    def recount(self, request, queryset):
+        for stats in queryset:
+            OpenRequestStats.refresh(stats.hotel_id)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HotelportalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hotelportal'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects model signal receivers)
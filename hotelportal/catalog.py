@@ -0,0 +1,81 @@
+# Guest menu catalog — prebuilt per-hotel tree, cached by Hotel.catalog_version.
+#
+# The room page is read on every QR scan but the menu only changes a few times
+# a day, so we build the category/item tree once and keep it in the cache.
+# Any save/delete of Category, Item or ImageAsset bumps hotel.catalog_version
+# (see signals.py), which changes the cache key → next read rebuilds.
+
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import F
+
+from website.models import Hotel
+from .models import Category, Item
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24  # old versions simply age out
+
+
+def _catalog_key(hotel_id, version):
+    return f"catalog:{hotel_id}:v{version}"
+
+
+def bump_catalog_version(hotel_id):
+    """
+    Invalidate the guest menu for one hotel (single UPDATE, no read).
+    Call this after bulk writes that bypass model signals.
+    """
+    Hotel.objects.filter(pk=hotel_id).update(catalog_version=F("catalog_version") + 1)
+
+
+def build_catalog(hotel):
+    """
+    Query active categories + available items and group them the way
+    guest/room.html walks them.
+    """
+    cats = (
+        Category.objects
+        .filter(hotel=hotel, is_active=True)
+        .select_related("parent")
+        .order_by("position", "name")
+    )
+    items = (
+        Item.objects
+        .filter(hotel=hotel, is_available=True)
+        .select_related("category", "image")
+        .order_by("position", "name")
+    )
+
+    # Group items by category id
+    items_by_cat = defaultdict(list)
+    for it in items:
+        items_by_cat[it.category_id].append(it)
+
+    # Build children map and top-level lists
+    children = defaultdict(list)
+    top_food, top_service = [], []
+    for c in cats:
+        if c.parent_id:
+            children[c.parent_id].append(c)
+        else:
+            (top_food if c.kind == "FOOD" else top_service).append(c)
+
+    return {
+        "top_food": top_food,
+        "top_service": top_service,
+        "children": dict(children),
+        "items_by_cat": dict(items_by_cat),
+    }
+
+
+def get_catalog(hotel):
+    """
+    Return the prebuilt catalog for `hotel`; zero queries when warm.
+    `hotel` must be freshly loaded so its catalog_version is current.
+    """
+    key = _catalog_key(hotel.id, hotel.catalog_version)
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_catalog(hotel)
+        cache.set(key, catalog, CATALOG_CACHE_TIMEOUT)
+    return catalog
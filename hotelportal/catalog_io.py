@@ -0,0 +1,351 @@
+# Catalog import/export — a whole hotel menu (categories + items) as JSON or CSV.
+#
+# Categories are addressed by kind and path (FOOD, "Food / Mains / Burgers"),
+# items by (kind, category path, name), so a menu exported from one property
+# imports into another without ids, and a FOOD and a SERVICE category may share
+# a name. A row without a kind matches by path alone if that is unambiguous.
+# Import is an upsert: names are resolved with in-memory maps built from two
+# queries, new rows go in with bulk_create (one statement per category depth),
+# changed rows with bulk_update, all in one transaction.
+# Nothing is deleted. Any invalid row aborts the import before it writes.
+# Bulk writes skip model signals, so the catalog version is bumped and the
+# search index rebuilt for the hotel once at the end.
+#
+# JSON: {"categories": [{"path", "kind", "position", "is_active"}],
+#        "items": [{"category", "kind", "name", "price", "unit", "description",
+#                   "is_available", "position", "image"}]}
+# CSV:  one file, one row per category or item:
+#       type, category, name, kind, price, unit, description, position, active, image
+#       (type=category: `category` is the parent path, blank for top level)
+
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Category, ImageAsset, Item
+from .search import index_hotel
+
+PATH_SEP = " / "
+PATH_SPLIT = re.compile(r"\s+/\s+")
+CSV_FIELDS = ["type", "category", "name", "kind", "price", "unit", "description", "position", "active", "image"]
+CATEGORY_FIELDS = ["position", "is_active"]
+ITEM_FIELDS = ["price", "unit", "description", "is_available", "position", "image_id"]
+KINDS = {k for k, _ in Category.KIND_CHOICES}
+MAX_ROWS = 20000
+BULK_BATCH = 500
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def _join(path):
+    return PATH_SEP.join(path)
+
+
+def _split(text):
+    # only a spaced " / " (PATH_SEP) separates levels, so "Tea/Coffee" stays one name
+    return tuple(p.strip() for p in PATH_SPLIT.split(text or "") if p.strip())
+
+
+def _category_paths(cats):
+    """{category id: (name, …, name)} from rows carrying id/name/parent_id."""
+    by_id = {c.id: c for c in cats}
+    paths = {}
+
+    def path_of(c):
+        if c.id not in paths:
+            paths[c.id] = (path_of(by_id[c.parent_id]) if c.parent_id else ()) + (c.name,)
+        return paths[c.id]
+
+    for c in cats:
+        path_of(c)
+    return paths
+
+
+def _resolve(by_path, kind, path):
+    """(kind, category or None) for `path`; with no kind the path must not exist under two kinds."""
+    if kind:
+        return kind, by_path.get((kind, path))
+    found = [(k, by_path[(k, path)]) for k in sorted(KINDS) if (k, path) in by_path]
+    if len(found) > 1:
+        raise ValueError(f"{_join(path)} exists as {' and '.join(k for k, _ in found)}; give a kind")
+    return found[0] if found else (None, None)
+
+
+# ---- export ------------------------------------------------------------------
+
+def export_catalog(hotel):
+    """The hotel's menu as a JSON-able dict (three queries)."""
+    cats = list(Category.objects.filter(hotel=hotel).order_by("kind", "position", "name"))
+    paths = _category_paths(cats)
+    kinds = {c.id: c.kind for c in cats}
+    items = (
+        Item.objects.filter(hotel=hotel)
+        .values_list("category_id", "name", "price", "unit", "description", "is_available", "position", "image__name")
+    )
+    # by kind and path rather than category id, so two hotels with the same menu export the same file
+    items = sorted(items, key=lambda r: (kinds[r[0]], paths[r[0]], r[6], r[1]))
+    return {
+        "categories": [
+            {"path": _join(paths[c.id]), "kind": c.kind, "position": c.position, "is_active": c.is_active}
+            for c in sorted(cats, key=lambda c: (len(paths[c.id]), c.kind, c.position, c.name))
+        ],
+        "items": [
+            {"category": _join(paths[cat_id]), "kind": kinds[cat_id], "name": name, "price": f"{price:.2f}",
+             "unit": unit, "description": description, "is_available": available, "position": position,
+             "image": image or ""}
+            for cat_id, name, price, unit, description, available, position, image in items
+        ],
+    }
+
+
+def catalog_to_csv(doc):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for c in doc["categories"]:
+        path = _split(c["path"])
+        writer.writerow({"type": "category", "category": _join(path[:-1]), "name": path[-1], "kind": c["kind"],
+                         "position": c["position"], "active": "yes" if c["is_active"] else "no"})
+    for it in doc["items"]:
+        writer.writerow({"type": "item", "category": it["category"], "name": it["name"], "kind": it["kind"],
+                         "price": it["price"], "unit": it["unit"], "description": it["description"],
+                         "position": it["position"], "active": "yes" if it["is_available"] else "no",
+                         "image": it["image"]})
+    return buf.getvalue()
+
+
+# ---- parsing -------------------------------------------------------------------
+
+def _bool(value, default=True):
+    if isinstance(value, bool):
+        return value
+    value = str(value or "").strip().lower()
+    if not value:
+        return default
+    if value in ("1", "true", "yes", "y", "active", "available"):
+        return True
+    if value in ("0", "false", "no", "n", "inactive", "unavailable"):
+        return False
+    raise ValueError(f"{value!r} is not yes/no")
+
+
+def parse_catalog(text, fmt):
+    """JSON or CSV text → the export_catalog() dict shape."""
+    if fmt == "json":
+        try:
+            doc = json.loads(text)
+        except ValueError as exc:
+            raise CatalogFormatError(f"Not valid JSON: {exc}")
+        if not isinstance(doc, dict):
+            raise CatalogFormatError("JSON must be an object with 'categories' and 'items'.")
+        doc = {"categories": doc.get("categories") or [], "items": doc.get("items") or []}
+        if not all(isinstance(row, dict) for rows in doc.values() for row in rows):
+            raise CatalogFormatError("Every category and item must be a JSON object.")
+    else:
+        reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+        missing = {"type", "category", "name"} - {(h or "").strip().lower() for h in reader.fieldnames or []}
+        if missing:
+            raise CatalogFormatError(f"CSV header is missing: {', '.join(sorted(missing))}.")
+        doc = {"categories": [], "items": []}
+        for row in reader:
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            kind = row.get("type", "").lower()
+            if kind == "category":
+                doc["categories"].append({
+                    "path": _join(_split(row["category"]) + (row["name"],)), "kind": row.get("kind", ""),
+                    "position": row.get("position", ""), "is_active": row.get("active", ""),
+                    "_line": reader.line_num,
+                })
+            elif kind == "item":
+                doc["items"].append({
+                    "category": row["category"], "kind": row.get("kind", ""), "name": row["name"],
+                    "price": row.get("price", ""), "unit": row.get("unit", ""),
+                    "description": row.get("description", ""),
+                    "is_available": row.get("active", ""), "position": row.get("position", ""),
+                    "image": row.get("image", ""), "_line": reader.line_num,
+                })
+            elif any(row.values()):
+                raise CatalogFormatError(f"Line {reader.line_num}: type must be 'category' or 'item'.")
+    if len(doc["categories"]) + len(doc["items"]) > MAX_ROWS:
+        raise CatalogFormatError(f"More than {MAX_ROWS} rows in one import.")
+    return doc
+
+
+# ---- import --------------------------------------------------------------------
+
+@dataclass
+class CatalogDiff:
+    categories_created: list = field(default_factory=list)  # path strings
+    categories_updated: list = field(default_factory=list)
+    categories_unchanged: int = 0
+    items_created: list = field(default_factory=list)       # "path / name"
+    items_updated: list = field(default_factory=list)
+    items_unchanged: int = 0
+    errors: list = field(default_factory=list)
+    applied: bool = False
+
+    def summary(self):
+        return (
+            f"categories: {len(self.categories_created)} new, {len(self.categories_updated)} changed, "
+            f"{self.categories_unchanged} unchanged; items: {len(self.items_created)} new, "
+            f"{len(self.items_updated)} changed, {self.items_unchanged} unchanged"
+            + (f"; {len(self.errors)} error(s)" if self.errors else "")
+        )
+
+
+def _where(row, n, what):
+    return f"line {row['_line']}" if row.get("_line") else f"{what} #{n + 1}"
+
+
+def import_catalog(hotel, doc, dry_run=False):
+    """
+    Upsert `doc` (parse_catalog/export_catalog shape) into `hotel`'s menu.
+    Returns a CatalogDiff; writes nothing if dry_run or if any row is invalid.
+    """
+    diff = CatalogDiff()
+    cats = list(Category.objects.filter(hotel=hotel))
+    paths = _category_paths(cats)
+    by_path = {(c.kind, paths[c.id]): c for c in cats}
+
+    # -- categories, parents first
+    wanted = []
+    for n, row in enumerate(doc["categories"]):
+        path = _split(row.get("path"))
+        try:
+            if not path:
+                raise ValueError("empty path")
+            if any(len(p) > Category._meta.get_field("name").max_length for p in path):
+                raise ValueError("name too long")
+            kind = str(row.get("kind") or "").upper() or None
+            if kind is not None and kind not in KINDS:
+                raise ValueError(f"kind must be one of {', '.join(sorted(KINDS))}")
+            position = int(row.get("position") or 0)
+            if position < 0:
+                raise ValueError("position must be ≥ 0")
+            wanted.append((path, kind, position, _bool(row.get("is_active"))))
+        except (TypeError, ValueError) as exc:
+            diff.errors.append(f"{_where(row, n, 'category')}: {exc}")
+
+    new_by_level = {}
+    to_update = []
+    for path, kind, position, is_active in sorted(wanted, key=lambda w: len(w[0])):
+        if kind is None:
+            # no kind given → keep the current one, else inherit the parent's
+            try:
+                kind = _resolve(by_path, None, path)[0]
+                if kind is None and len(path) > 1:
+                    kind = _resolve(by_path, None, path[:-1])[0]
+            except ValueError as exc:
+                diff.errors.append(f"category {_join(path)}: {exc}")
+                continue
+            kind = kind or "FOOD"
+        # a category's kind is its parent's, so the parent is looked up under the same kind
+        parent = by_path.get((kind, path[:-1])) if len(path) > 1 else None
+        if len(path) > 1 and parent is None:
+            diff.errors.append(f"category {_join(path)}: parent {_join(path[:-1])} ({kind}) not found")
+            continue
+        cat = by_path.get((kind, path))
+        if cat is None:
+            cat = Category(hotel=hotel, name=path[-1], kind=kind, parent=parent, position=position, is_active=is_active)
+            by_path[(kind, path)] = cat
+            new_by_level.setdefault(len(path), []).append(cat)
+            diff.categories_created.append(_join(path))
+        elif (cat.position, cat.is_active) != (position, is_active):
+            cat.position, cat.is_active = position, is_active
+            if cat.pk:
+                to_update.append(cat)
+                diff.categories_updated.append(_join(path))
+        else:
+            diff.categories_unchanged += 1
+
+    # -- items
+    images = dict(ImageAsset.objects.filter(hotel=hotel).values_list("name", "id"))
+    existing_items = {(i.category_id, i.name): i for i in Item.objects.filter(hotel=hotel)}
+    item_rows = []
+    seen = set()
+    name_max = Item._meta.get_field("name").max_length
+    unit_max = Item._meta.get_field("unit").max_length
+    for n, row in enumerate(doc["items"]):
+        where = _where(row, n, "item")
+        path, name = _split(row.get("category")), str(row.get("name") or "").strip()
+        try:
+            cat = _resolve(by_path, str(row.get("kind") or "").upper() or None, path)[1]
+            if cat is None:
+                raise ValueError(f"category {_join(path) or '(blank)'} not found")
+            if not name or len(name) > name_max:
+                raise ValueError("name missing or too long")
+            if (cat.kind, path, name) in seen:
+                raise ValueError(f"{name} listed twice in {_join(path)}")
+            seen.add((cat.kind, path, name))
+            try:
+                price = Decimal(str(row.get("price") or "0")).quantize(Decimal("0.01"))
+            except InvalidOperation:
+                raise ValueError(f"price {row.get('price')!r} is not a number")
+            if price < 0:
+                raise ValueError("price cannot be negative")
+            unit = str(row.get("unit") or "")
+            if len(unit) > unit_max:
+                raise ValueError("unit too long")
+            image = str(row.get("image") or "").strip()
+            if image and image not in images:
+                raise ValueError(f"photo {image!r} not in this hotel's library")
+            values = {
+                "price": price, "unit": unit, "description": str(row.get("description") or ""),
+                "is_available": _bool(row.get("is_available")), "position": int(row.get("position") or 0),
+                "image_id": images.get(image),
+            }
+            if values["position"] < 0:
+                raise ValueError("position must be ≥ 0")
+        except (TypeError, ValueError) as exc:
+            diff.errors.append(f"{where}: {exc}")
+            continue
+        item_rows.append((path, cat, name, values))
+
+    if diff.errors:
+        return diff
+
+    new_items, changed_items = [], []
+    for path, cat, name, values in item_rows:
+        item = existing_items.get((cat.pk, name)) if cat.pk else None
+        label = _join(path + (name,))
+        if item is None:
+            new_items.append((cat, name, values))
+            diff.items_created.append(label)
+        elif any(getattr(item, f) != v for f, v in values.items()):
+            for f, v in values.items():
+                setattr(item, f, v)
+            changed_items.append(item)
+            diff.items_updated.append(label)
+        else:
+            diff.items_unchanged += 1
+
+    if dry_run:
+        return diff
+
+    with transaction.atomic():
+        for level in sorted(new_by_level):
+            for cat in new_by_level[level]:
+                cat.parent_id = cat.parent.pk if cat.parent else None  # parent saved by the previous level
+            Category.objects.bulk_create(new_by_level[level], batch_size=BULK_BATCH)
+        if to_update:
+            Category.objects.bulk_update(to_update, CATEGORY_FIELDS, batch_size=BULK_BATCH)
+        if new_items:
+            Item.objects.bulk_create(
+                [Item(hotel=hotel, category_id=cat.pk, name=name, **values) for cat, name, values in new_items],
+                batch_size=BULK_BATCH,
+            )
+        if changed_items:
+            Item.objects.bulk_update(changed_items, ITEM_FIELDS, batch_size=BULK_BATCH)
+        if diff.categories_created or diff.categories_updated or new_items or changed_items:
+            bump_catalog_version(hotel.id)
+            index_hotel(hotel.id)
+    diff.applied = True
+    return diff
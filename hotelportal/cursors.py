@@ -0,0 +1,38 @@
+# Keyset cursors — "<timestamp as epoch µs>-<id>".
+#
+# (timestamp, id) is a total order, so "rows after this cursor" is a plain
+# range scan on a (…, timestamp) index. Used by the Live Board delta sync,
+# request history paging and the guest summary.
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(ts, pk):
+    delta = ts - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{pk}"
+
+
+def decode_cursor(raw):
+    """(aware datetime, id) or None for a missing/garbled cursor."""
+    try:
+        micros, pk = raw.split("-", 1)
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def after_cursor(field, cursor):
+    """Q for rows strictly after `cursor` in (field, id) order."""
+    ts, pk = cursor
+    return Q(**{f"{field}__gt": ts}) | Q(**{field: ts, "id__gt": pk})
+
+
+def before_cursor(field, cursor):
+    """Q for rows strictly before `cursor` in (field, id) order."""
+    ts, pk = cursor
+    return Q(**{f"{field}__lt": ts}) | Q(**{field: ts, "id__lt": pk})
@@ -0,0 +1,95 @@
+# Live Board push — in-process pub/sub of request events, per hotel.
+#
+# Sync views publish (after commit); the async SSE view in views_live
+# subscribes. Everything lives in this process's memory: run the portal as a
+# single ASGI worker (or put a real broker behind the same interface later).
+#
+# Tests can use EventBroker directly: subscribe() outside an event loop gives
+# a Subscription whose queue is filled synchronously (get_nowait()).
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+QUEUE_SIZE = 200  # per open tab; a slow tab past this gets a "resync" instead
+
+
+class Subscription:
+    def __init__(self, hotel_id, loop=None, maxsize=QUEUE_SIZE):
+        self.hotel_id = hotel_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # don't block publishers on a stuck tab; it will re-sync via poll
+            self.overflowed = True
+
+    def deliver(self, event):
+        if self.loop is None:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+
+class EventBroker:
+    """Fan-out of board events keyed by hotel_id; a subscriber only sees its own hotel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = defaultdict(set)
+
+    def subscribe(self, hotel_id):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        sub = Subscription(hotel_id, loop=loop)
+        with self._lock:
+            self._subs[hotel_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.hotel_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.hotel_id]
+
+    def publish(self, hotel_id, event):
+        with self._lock:
+            targets = list(self._subs.get(hotel_id, ()))
+        for sub in targets:
+            sub.deliver(event)
+
+    def subscriber_count(self, hotel_id=None):
+        with self._lock:
+            return len(self._subs.get(hotel_id, ()))
+
+
+broker = EventBroker()
+
+
+def publish_request_event(req, event_type):
+    """
+    Push one board card to the hotel's open tabs once the transaction commits.
+    event_type: "created" | "status"
+    """
+    def _send():
+        from .views_live import _serialize_requests  # avoid import cycle
+        card = _serialize_requests([req])[0]
+        broker.publish(req.hotel_id, {"type": event_type, "request": card})
+
+    transaction.on_commit(_send)
@@ -4,6 +4,8 @@ from .models import Room
 
 from django.core.exceptions import ValidationError  # 4.2A — Catalog forms
 from .models import Category, Item, ImageAsset       # 4.2A — Catalog forms
+from .uploads import asset_for_upload
+from .models import Request
 
 class RoomForm(forms.ModelForm):
     class Meta:
@@ -11,6 +13,31 @@ class RoomForm(forms.ModelForm):
         fields = ["number", "floor", "is_active"]
 
 
+class RoomBulkForm(forms.Form):
+    # either a floor × room pattern or a CSV upload
+    floors = forms.CharField(required=False, max_length=200, help_text="e.g. 1-12 or 1-3,5,G")
+    rooms = forms.CharField(required=False, max_length=200, help_text="e.g. 01-40")
+    number_format = forms.CharField(
+        max_length=40, initial="{floor}{room}", help_text="{floor} and {room} are filled in"
+    )
+    is_active = forms.BooleanField(required=False, initial=True)
+    csv_file = forms.FileField(required=False, label="Or upload CSV",
+                               help_text="Header row: number, floor, is_active")
+    csv_text = forms.CharField(required=False, widget=forms.HiddenInput)  # carries the CSV from preview to apply
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get("csv_file")
+        if upload:
+            try:
+                cleaned["csv_text"] = upload.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise ValidationError("CSV must be UTF-8 text.")
+        if not cleaned.get("csv_text") and not cleaned.get("rooms"):
+            raise ValidationError("Enter a room range or upload a CSV.")
+        return cleaned
+
+
 
 
 
@@ -99,10 +126,10 @@ class ItemForm(forms.ModelForm):
         img = self.cleaned_data.get("image_existing")
         upload = self.cleaned_data.get("image_upload")
         if upload:
-            # Create an ImageAsset from upload
+            # Reuse this hotel's asset for identical bytes, else create one
             name = self.cleaned_data.get("name") or "Item Photo"
-            ia = ImageAsset.objects.create(hotel=self.request.user.hotel, name=name, file=upload)
-            obj.image = ia
+            digest = getattr(self.request, "upload_digests", {}).get(self.add_prefix("image_upload"))
+            obj.image = asset_for_upload(self.request.user.hotel, name, upload, digest=digest)
         elif img:
             obj.image = img
 
@@ -111,3 +138,37 @@ class ItemForm(forms.ModelForm):
         return obj
 
 
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(required=False, label="Menu file", help_text="JSON or CSV, as produced by Export")
+    text = forms.CharField(required=False, widget=forms.HiddenInput)  # carries the file from preview to apply
+    fmt = forms.ChoiceField(choices=(("json", "JSON"), ("csv", "CSV")), required=False, widget=forms.HiddenInput)
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get("file")
+        if upload:
+            try:
+                cleaned["text"] = upload.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise ValidationError("File must be UTF-8 text.")
+            cleaned["fmt"] = "csv" if upload.name.lower().endswith(".csv") else "json"
+        if not cleaned.get("text"):
+            raise ValidationError("Choose a menu file.")
+        cleaned["fmt"] = cleaned.get("fmt") or "json"
+        return cleaned
+
+
+# 6.x — Request history filters (GET form, all optional)
+class HistoryFilterForm(forms.Form):
+    kind = forms.ChoiceField(choices=(("", "All kinds"),) + Request.KIND_CHOICES, required=False)
+    status = forms.ChoiceField(choices=(("", "All statuses"),) + Request.STATUS_CHOICES, required=False)
+    room = forms.CharField(max_length=20, required=False, label="Room #")
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+
+    def clean(self):
+        cleaned = super().clean()
+        d1, d2 = cleaned.get("date_from"), cleaned.get("date_to")
+        if d1 and d2 and d1 > d2:
+            self.add_error("date_to", "End date is before start date.")
+        return cleaned
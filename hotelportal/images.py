@@ -0,0 +1,136 @@
+# Responsive variants for ImageAsset — resized WebP + JPEG copies at a few widths.
+#
+# Guest cards show photos ~140px tall, but uploads are often multi-MB camera
+# JPEGs. Each asset gets smaller copies under item_photos/variants/ and a
+# `variants` manifest on the row; templates build a srcset from the manifest
+# (hotelportal/templatetags/image_tags.py) and fall back to the original until
+# the variants exist.
+#
+# New uploads are rendered off the request thread in a small thread pool
+# (schedule_variants, fired from signals.py after commit). Pillow releases the
+# GIL while decoding/resizing/encoding, so threads are enough here. Existing
+# assets are backfilled by `manage.py build_image_variants`.
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+from .catalog import bump_catalog_version
+from .models import ImageAsset
+
+log = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_FORMATS = {
+    # manifest key → (Pillow format, extension, save options)
+    "webp": ("WEBP", "webp", {"quality": 78, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+VARIANT_DIR = "item_photos/variants"
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGE_VARIANT_WORKERS", 2),
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def _variant_name(src_name, width, ext):
+    # upload names are unique within item_photos/; keep the source extension so
+    # burger.png and burger.jpg don't share variants
+    stem, src_ext = os.path.splitext(os.path.basename(src_name))
+    return f"{VARIANT_DIR}/{stem}-{src_ext.lstrip('.')}-{width}w.{ext}"
+
+
+def render_variants(src_name, widths=VARIANT_WIDTHS):
+    """
+    Read `src_name` from storage and write its variants back to storage.
+    Returns the manifest {"src", "width", "webp": {"320": name, ...}, "jpeg": {...}}.
+    Touches no database rows, so it is safe in any worker thread.
+    """
+    with default_storage.open(src_name, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        # flatten transparency onto white; JPEG has no alpha and the cards are opaque
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", img.size, "white")
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    # never upscale: widths up to the original, plus the original itself if smaller
+    targets = [w for w in widths if w <= img.width]
+    if img.width < max(widths) and img.width not in targets:
+        targets.append(img.width)
+
+    manifest = {"src": src_name, "width": img.width}
+    for key, (fmt, ext, opts) in VARIANT_FORMATS.items():
+        manifest[key] = {}
+        for width in targets:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            buf = BytesIO()
+            resized.save(buf, fmt, **opts)
+            name = _variant_name(src_name, width, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            manifest[key][str(width)] = default_storage.save(name, ContentFile(buf.getvalue()))
+    return manifest
+
+
+def needs_variants(asset):
+    return bool(asset.file) and asset.variants.get("src") != asset.file.name
+
+
+def store_manifest(asset_id, hotel_id, manifest):
+    # .update() → no post_save, so no re-render loop; bump the catalog ourselves
+    # so the cached guest menu picks up the new srcset.
+    ImageAsset.objects.filter(id=asset_id).update(variants=manifest)
+    bump_catalog_version(hotel_id)
+
+
+def build_variants(asset):
+    """Render and record variants for one asset, in the calling thread."""
+    manifest = render_variants(asset.file.name)
+    store_manifest(asset.id, asset.hotel_id, manifest)
+    asset.variants = manifest
+    return manifest
+
+
+def delete_variants(manifest):
+    for key in VARIANT_FORMATS:
+        for name in (manifest.get(key) or {}).values():
+            default_storage.delete(name)
+
+
+def _build_in_worker(asset_id):
+    close_old_connections()
+    try:
+        asset = ImageAsset.objects.filter(id=asset_id).first()
+        if asset is not None and needs_variants(asset):
+            build_variants(asset)
+    except Exception:
+        log.exception("image variants failed for ImageAsset %s", asset_id)
+    finally:
+        connection.close()
+
+
+def schedule_variants(asset):
+    """Queue variant rendering for `asset` once the current transaction commits."""
+    asset_id = asset.id
+    transaction.on_commit(lambda: _pool().submit(_build_in_worker, asset_id))
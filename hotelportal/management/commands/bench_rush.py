@@ -0,0 +1,291 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from hotelportal import search
+from hotelportal.models import Category, Item, Room
+from website.models import Hotel, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    # nearest-rank; sorted_values is non-empty
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    """Per-thread timings: endpoint → [(seconds, status, queries)]. Merged after the run."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.queries = 0
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def call(self, endpoint, method, *args, **kwargs):
+        self.queries = 0
+        started = time.perf_counter()
+        resp = method(*args, **kwargs)
+        self.samples[endpoint].append((time.perf_counter() - started, resp.status_code, self.queries))
+        return resp
+
+
+class Command(BaseCommand):
+    help = (
+        "Load benchmark of a hotel rush on a scratch file-backed SQLite DB: guest threads "
+        "run room_view → cart_add → order_submit_stub / service_request → my_summary while "
+        "staff threads run live_poll → live_action. Prints throughput, p50/p95/p99 latency "
+        "and queries per endpoint and saves them as JSON for comparing commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--guests", type=int, default=16, help="Concurrent guest threads")
+        parser.add_argument("--staff", type=int, default=2, help="Concurrent staff board tabs")
+        parser.add_argument("--seconds", type=float, default=15.0)
+        parser.add_argument("--rooms", type=int, default=200)
+        parser.add_argument("--items", type=int, default=120, help="Food items on the menu")
+        parser.add_argument("--services", type=int, default=12, help="Service items on the menu")
+        parser.add_argument("--service-share", type=float, default=0.3,
+                            help="Fraction of guest rounds that also request a service")
+        parser.add_argument("--staff-think", type=float, default=0.2, help="Seconds between staff polls")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--db", help="SQLite file to use (default: a temp file)")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark DB afterwards")
+        parser.add_argument("--out", help="JSON results path (default: rush-<commit>-<time>.json)")
+        parser.add_argument("--compare", help="Earlier results JSON to diff against")
+
+    def handle(self, *args, **opts):
+        previous = None
+        if opts["compare"]:
+            try:
+                with open(opts["compare"], encoding="utf-8") as fh:
+                    previous = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read {opts['compare']}: {exc}")
+
+        # production-like request handling: no query log, test client host allowed
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+
+        path = opts["db"] or os.path.join(tempfile.mkdtemp(prefix="bench-rush-"), "rush.sqlite3")
+        db = connections["default"]
+        old_name = db.settings_dict["NAME"]
+        test_settings = db.settings_dict.setdefault("TEST", {})
+        old_test_name, test_settings["NAME"] = test_settings.get("NAME"), path
+        replica = getattr(settings, "READ_REPLICA_ALIAS", None)
+        replica = connections[replica] if replica in connections.settings else None
+        if replica:
+            replica_settings, replica_name = replica.settings_dict, replica.settings_dict["NAME"]
+        self.stdout.write(f"Migrating scratch database {path} …")
+        db.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        if replica:
+            replica.creation.set_as_test_mirror(db.settings_dict)  # no replica lag in the run
+        try:
+            world = self.seed(opts)
+            elapsed, samples = self.run(world, opts)
+        finally:
+            db.creation.destroy_test_db(old_name, verbosity=0, keepdb=opts["keep"])
+            # put both aliases back as they were, e.g. when run from the test suite
+            test_settings["NAME"] = old_test_name
+            if replica:
+                replica.close()
+                replica.settings_dict = replica_settings
+                replica_settings["NAME"] = replica_name  # a test mirror shares the primary's dict
+            if not opts["db"] and not opts["keep"]:
+                os.rmdir(os.path.dirname(path))
+
+        result = self.summarize(samples, elapsed, opts)
+        self.report(result, previous)
+        out = opts["out"] or f"rush-{result['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+        self.stdout.write(f"Saved {out}")
+
+    # ---- setup -----------------------------------------------------------
+
+    def seed(self, opts):
+        rnd = random.Random(opts["seed"])
+        hotel = Hotel.objects.create(name="Rush Hotel")
+        Room.objects.bulk_create(
+            [Room(hotel=hotel, number=f"{100 + n}", floor=str(1 + n // 40)) for n in range(opts["rooms"])]
+        )
+        mains = Category.objects.create(hotel=hotel, name="Mains", kind="FOOD")
+        food_cats = [mains] + [
+            Category.objects.create(hotel=hotel, name=f"Section {n}", kind="FOOD", parent=mains, position=n)
+            for n in range(max(1, opts["items"] // 20))
+        ]
+        svc = Category.objects.create(hotel=hotel, name="Housekeeping", kind="SERVICE")
+        Item.objects.bulk_create(
+            [Item(hotel=hotel, category=rnd.choice(food_cats[1:]), name=f"Dish {n}", price=rnd.randint(50, 600),
+                  description="House special", position=n) for n in range(opts["items"])]
+            + [Item(hotel=hotel, category=svc, name=f"Service {n}", price=0, position=n)
+               for n in range(opts["services"])]
+        )
+        search.index_hotel(hotel.id)  # bulk_create skips the signals
+        staff = [
+            User.objects.create_user(f"bench-staff-{n}", password=uuid.uuid4().hex, role="STAFF", hotel=hotel)
+            for n in range(opts["staff"])
+        ]
+        return {
+            "hotel": hotel.id,
+            "rooms": list(Room.objects.filter(hotel=hotel).values_list("id", flat=True)),
+            "food": list(Item.objects.filter(category__kind="FOOD").values_list("id", flat=True)),
+            "services": list(Item.objects.filter(category=svc).values_list("id", flat=True)),
+            "staff": staff,
+        }
+
+    # ---- run -------------------------------------------------------------
+
+    def run(self, world, opts):
+        stop = threading.Event()
+        recorders = []
+        workers = [(self.guest, n) for n in range(opts["guests"])] + [(self.staff, u) for u in world["staff"]]
+        barrier = threading.Barrier(len(workers) + 1)
+
+        def thread(target, arg):
+            rec = Recorder()
+            recorders.append(rec)
+            try:
+                with connection.execute_wrapper(rec.count_query):
+                    target(rec, arg, world, opts, barrier, stop)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=thread, args=w, daemon=True) for w in workers]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        self.stdout.write(f"Running {opts['guests']} guests + {opts['staff']} staff for {opts['seconds']:.0f}s …")
+        started = time.perf_counter()
+        time.sleep(opts["seconds"])
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        samples = defaultdict(list)
+        for rec in recorders:
+            for endpoint, values in rec.samples.items():
+                samples[endpoint].extend(values)
+        return elapsed, samples
+
+    @staticmethod
+    def guest(rec, n, world, opts, barrier, stop):
+        rnd = random.Random(opts["seed"] * 1000 + n)
+        client = Client(raise_request_exception=False)
+        barrier.wait()
+        while not stop.is_set():
+            args = [world["hotel"], rnd.choice(world["rooms"])]
+            rec.call("room_view", client.get, reverse("guest_room", args=args))
+            for _ in range(rnd.randint(1, 3)):
+                rec.call("cart_add", client.post, reverse("cart_add", args=args),
+                         {"item_id": rnd.choice(world["food"]), "qty": rnd.randint(1, 2)})
+            rec.call("order_submit_stub", client.post, reverse("order_submit_stub", args=args),
+                     HTTP_IDEMPOTENCY_KEY=uuid.uuid4().hex)
+            if world["services"] and rnd.random() < opts["service_share"]:
+                rec.call("service_request", client.post, reverse("service_request", args=args),
+                         {"item_id": rnd.choice(world["services"])})
+            rec.call("my_summary", client.get, reverse("guest_summary", args=args))
+
+    @staticmethod
+    def staff(rec, user, world, opts, barrier, stop):
+        rnd = random.Random(user.id)
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        cursor, new, accepted = None, set(), set()
+        barrier.wait()
+        while not stop.is_set():
+            resp = rec.call("live_poll", client.get, reverse("live_poll"), {"since": cursor} if cursor else {})
+            if resp.status_code == 200:
+                data = resp.json()
+                if data["mode"] == "full":
+                    new = {r["id"] for r in data["new"]}
+                    accepted = {r["id"] for r in data["accepted"]}
+                else:
+                    for r in data["changed"]:
+                        (new if r["status"] == "NEW" else accepted).add(r["id"])
+                        (accepted if r["status"] == "NEW" else new).discard(r["id"])
+                    new.difference_update(data["removed"])
+                    accepted.difference_update(data["removed"])
+                cursor = data["cursor"]
+
+            if accepted and (not new or rnd.random() < 0.5):
+                request_id, action = accepted.pop(), "complete"
+            elif new:
+                request_id, action = new.pop(), "accept"
+            else:
+                request_id = None
+            if request_id:
+                rec.call("live_action", client.post, reverse("live_action", args=[request_id]), {"action": action})
+            stop.wait(opts["staff_think"])
+
+    # ---- results ---------------------------------------------------------
+
+    @staticmethod
+    def commit():
+        try:
+            out = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            )
+            return out.stdout.strip() or "unknown"
+        except (OSError, subprocess.SubprocessError):
+            return "unknown"
+
+    def summarize(self, samples, elapsed, opts):
+        endpoints = {}
+        for endpoint, values in sorted(samples.items()):
+            latencies = sorted(v[0] for v in values)
+            statuses = [v[1] for v in values]
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 2) for p in PERCENTILES},
+                "queries_mean": round(sum(v[2] for v in values) / len(values), 2),
+                "client_errors": sum(1 for s in statuses if 400 <= s < 500),
+                "server_errors": sum(1 for s in statuses if s >= 500),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "commit": self.commit(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": round(elapsed, 2),
+            "config": {k: opts[k] for k in ("guests", "staff", "rooms", "items", "services",
+                                            "service_share", "staff_think", "seed")},
+            "total_rps": round(total / elapsed, 1),
+            "endpoints": endpoints,
+        }
+
+    def report(self, result, previous=None):
+        before = (previous or {}).get("endpoints", {})
+        header = f"{'endpoint':20} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'4xx':>6} {'5xx':>5}"
+        self.stdout.write(header)
+        for endpoint, e in result["endpoints"].items():
+            line = (
+                f"{endpoint:20} {e['requests']:7d} {e['rps']:8.1f} {e['p50_ms']:8.2f} {e['p95_ms']:8.2f} "
+                f"{e['p99_ms']:8.2f} {e['queries_mean']:8.2f} {e['client_errors']:6d} {e['server_errors']:5d}"
+            )
+            if endpoint in before:
+                old = before[endpoint]
+                line += f"   vs {previous.get('commit', '?')}: req/s {old['rps']:.1f}, p95 {old['p95_ms']:.2f} ms"
+            self.stdout.write(line)
+        self.stdout.write(f"total {result['total_rps']:.1f} req/s over {result['seconds']:.1f}s (commit {result['commit']})")
+        if any(e["server_errors"] for e in result["endpoints"].values()):
+            self.stdout.write(self.style.WARNING("Some requests failed with 5xx; see the log above."))
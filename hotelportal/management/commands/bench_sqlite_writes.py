@@ -0,0 +1,109 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Django's stock SQLite connection: rollback journal, deferred BEGIN, 5 s busy timeout
+DEFAULT_OPTIONS = {"init_command": "", "transaction_mode": "DEFERRED", "timeout": 5}
+
+SCHEMA = """
+CREATE TABLE cart (id INTEGER PRIMARY KEY, item_count INTEGER NOT NULL, total REAL NOT NULL);
+CREATE TABLE cart_item (cart_id INTEGER, item_id INTEGER, qty INTEGER NOT NULL, PRIMARY KEY (cart_id, item_id));
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent write benchmark on a scratch SQLite file: cart_add-shaped transactions "
+        "(read line, upsert line, bump cart totals) from N threads, with Django's default "
+        "connection settings vs settings.SQLITE_OPTIONS. Prints commits/s and failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--carts", type=int, default=50, help="Carts to spread writes over")
+
+    def handle(self, *args, **opts):
+        for label, options in (("default", DEFAULT_OPTIONS), ("tuned", settings.SQLITE_OPTIONS)):
+            commits, failures, p99 = self.run(options, opts["threads"], opts["seconds"], opts["carts"])
+            self.stdout.write(
+                f"{label:8} {commits / opts['seconds']:8.0f} commits/s  "
+                f"{failures:6d} locked failures  p99 {p99 * 1000:6.1f} ms"
+            )
+
+    @staticmethod
+    def connect(path, options):
+        conn = sqlite3.connect(path, timeout=options.get("timeout", 5), isolation_level=None, check_same_thread=False)
+        for command in (options.get("init_command") or "").split(";"):
+            if command.strip():
+                conn.execute(command)
+        return conn
+
+    def run(self, options, threads, seconds, carts):
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        try:
+            setup = self.connect(path, options)
+            setup.executescript(SCHEMA)
+            setup.executemany("INSERT INTO cart VALUES (?, 0, 0)", [(i,) for i in range(carts)])
+            setup.close()
+
+            begin = f"BEGIN {options.get('transaction_mode') or 'DEFERRED'}"
+            deadline = time.monotonic() + seconds
+            lock = threading.Lock()
+            totals = {"commits": 0, "failures": 0, "latencies": []}
+            barrier = threading.Barrier(threads)
+
+            def worker():
+                conn = self.connect(path, options)
+                rnd = random.Random()
+                commits = failures = 0
+                latencies = []
+                barrier.wait()
+                while time.monotonic() < deadline:
+                    cart, item = rnd.randrange(carts), rnd.randrange(200)
+                    started = time.monotonic()
+                    try:
+                        conn.execute(begin)
+                        row = conn.execute(
+                            "SELECT qty FROM cart_item WHERE cart_id = ? AND item_id = ?", (cart, item)
+                        ).fetchone()
+                        if row:
+                            conn.execute(
+                                "UPDATE cart_item SET qty = qty + 1 WHERE cart_id = ? AND item_id = ?", (cart, item)
+                            )
+                        else:
+                            conn.execute("INSERT INTO cart_item VALUES (?, ?, 1)", (cart, item))
+                        conn.execute(
+                            "UPDATE cart SET item_count = item_count + 1, total = total + 120 WHERE id = ?", (cart,)
+                        )
+                        conn.execute("COMMIT")
+                        commits += 1
+                        latencies.append(time.monotonic() - started)
+                    except sqlite3.OperationalError:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        failures += 1
+                conn.close()
+                with lock:
+                    totals["commits"] += commits
+                    totals["failures"] += failures
+                    totals["latencies"].extend(latencies)
+
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            latencies = sorted(totals["latencies"]) or [0.0]
+            return totals["commits"], totals["failures"], latencies[int(len(latencies) * 0.99) - 1]
+        finally:
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
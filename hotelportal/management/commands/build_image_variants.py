@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from hotelportal.images import needs_variants, render_variants, store_manifest
+from hotelportal.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = "Render responsive WebP/JPEG variants for ImageAssets that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hotel", type=int, help="Only assets of this hotel id")
+        parser.add_argument("--force", action="store_true", help="Re-render assets that already have variants")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 2,
+            help="Parallel image workers (default: CPU count)",
+        )
+
+    def handle(self, *args, **opts):
+        qs = ImageAsset.objects.exclude(file="").only("id", "hotel_id", "file", "variants").order_by("id")
+        if opts["hotel"]:
+            qs = qs.filter(hotel_id=opts["hotel"])
+        todo = [a for a in qs if opts["force"] or needs_variants(a)]
+        if not todo:
+            self.stdout.write("Nothing to do.")
+            return
+
+        done = failed = 0
+        # workers only decode/resize/encode + write files; rows are updated here,
+        # on the command's own connection
+        with ThreadPoolExecutor(max_workers=max(1, opts["workers"])) as pool:
+            futures = {pool.submit(render_variants, a.file.name): a for a in todo}
+            for fut in as_completed(futures):
+                asset = futures[fut]
+                try:
+                    manifest = fut.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"#{asset.id} {asset.file.name}: {exc}")
+                    continue
+                store_manifest(asset.id, asset.hotel_id, manifest)
+                done += 1
+                if opts["verbosity"] > 1:
+                    self.stdout.write(f"#{asset.id} {asset.file.name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered variants for {done} image(s), {failed} failed."))
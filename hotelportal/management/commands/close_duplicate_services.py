@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from hotelportal.models import DailyRequestCounter, OpenRequestStats, Request
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel duplicate open service requests — all but the oldest NEW/ACCEPTED request "
+        "per room and service item — and recount the request rollups of the affected hotels. "
+        "Migration 0011 (uniq_open_service_request_per_room) refuses to run while any exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List the duplicates, change nothing")
+
+    def handle(self, *args, **opts):
+        # only columns that predate migration 0011, so this runs on a database stuck before it
+        open_reqs = (
+            Request.objects
+            .filter(status__in=["NEW", "ACCEPTED"], service_item__isnull=False)
+            .order_by("created_at", "id")
+            .values_list("id", "hotel_id", "room_id", "service_item_id")
+        )
+        seen, dupes, hotels = set(), [], set()
+        for pk, hotel_id, room_id, item_id in open_reqs:
+            if (room_id, item_id) in seen:
+                dupes.append(pk)
+                hotels.add(hotel_id)
+            else:
+                seen.add((room_id, item_id))
+
+        if not dupes:
+            self.stdout.write("No duplicate open service requests.")
+            return
+        self.stdout.write(f"{len(dupes)} duplicate open service request(s): {', '.join(map(str, dupes))}")
+        if opts["dry_run"]:
+            return
+
+        with transaction.atomic():
+            now = timezone.now()
+            Request.objects.filter(id__in=dupes).update(status="CANCELLED", cancelled_at=now, updated_at=now)
+            # .update() bypasses Request.save(), so rebuild the rollups it would have kept
+            has_open_stats = OpenRequestStats._meta.db_table in connection.introspection.table_names()
+            for hotel_id in sorted(hotels):
+                DailyRequestCounter.recount(hotel_id)
+                if has_open_stats:  # created by a later migration
+                    OpenRequestStats.refresh(hotel_id)
+        self.stdout.write(self.style.SUCCESS(f"Cancelled {len(dupes)} request(s) in {len(hotels)} hotel(s)."))
@@ -0,0 +1,117 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from hotelportal.catalog import bump_catalog_version
+from hotelportal.models import ImageAsset, Item
+from hotelportal.uploads import sha256_of
+
+
+def _hash_stored(name):
+    with default_storage.open(name, "rb") as fh:
+        return sha256_of(fh)
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge ImageAssets with identical file contents within each hotel: "
+        "repoint items to the oldest asset, delete the rest and their now-unused files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hotel", type=int, help="Only assets of this hotel id")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be merged, change nothing")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 2,
+            help="Parallel hashing workers for assets stored before content hashing (default: CPU count)",
+        )
+
+    def handle(self, *args, **opts):
+        qs = ImageAsset.objects.exclude(file="")
+        if opts["hotel"]:
+            qs = qs.filter(hotel_id=opts["hotel"])
+
+        self._backfill_hashes(qs, opts)
+
+        groups = (
+            qs.exclude(content_hash="")
+            .values("hotel_id", "content_hash")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+        )
+        dupes_by_keeper = defaultdict(list)
+        for g in groups:
+            ids = list(
+                qs.filter(hotel_id=g["hotel_id"], content_hash=g["content_hash"])
+                .order_by("id").values_list("id", flat=True)
+            )
+            dupes_by_keeper[(g["hotel_id"], ids[0])] = ids[1:]
+
+        if not dupes_by_keeper:
+            self.stdout.write("No duplicate assets.")
+            return
+
+        all_dupes = [i for ids in dupes_by_keeper.values() for i in ids]
+        dupe_files = set(ImageAsset.objects.filter(id__in=all_dupes).values_list("file", flat=True))
+        if opts["dry_run"]:
+            reclaim = sum(self._size(n) for n in dupe_files - self._still_used(dupe_files, exclude=all_dupes))
+            self.stdout.write(
+                f"Would merge {len(all_dupes)} duplicate asset(s) into {len(dupes_by_keeper)}, "
+                f"reclaiming {reclaim} bytes."
+            )
+            return
+
+        with transaction.atomic():
+            repointed = 0
+            for (hotel_id, keeper), dupes in dupes_by_keeper.items():
+                repointed += Item.objects.filter(image_id__in=dupes).update(image_id=keeper)
+            ImageAsset.objects.filter(id__in=all_dupes).delete()
+            for hotel_id in {h for h, _ in dupes_by_keeper}:
+                bump_catalog_version(hotel_id)  # Item .update() skipped the signals
+
+        reclaimed = 0
+        for name in dupe_files - self._still_used(dupe_files):
+            reclaimed += self._size(name)
+            default_storage.delete(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {len(all_dupes)} duplicate asset(s) into {len(dupes_by_keeper)}, "
+            f"repointed {repointed} item(s), reclaimed {reclaimed} bytes."
+        ))
+
+    def _backfill_hashes(self, qs, opts):
+        # assets stored before content hashing; recording the hash is metadata
+        # only, so this runs even with --dry-run
+        missing = list(qs.filter(content_hash="").values_list("id", "file"))
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, opts["workers"])) as pool:
+            digests = pool.map(lambda row: self._try_hash(row[1]), missing)
+            for (asset_id, _), digest in zip(missing, digests):
+                if digest:
+                    ImageAsset.objects.filter(id=asset_id).update(content_hash=digest)
+
+    def _try_hash(self, name):
+        try:
+            return _hash_stored(name)
+        except OSError as exc:
+            self.stderr.write(f"{name}: {exc}")
+            return None
+
+    @staticmethod
+    def _still_used(names, exclude=()):
+        return set(
+            ImageAsset.objects.filter(file__in=names).exclude(id__in=exclude).values_list("file", flat=True)
+        )
+
+    @staticmethod
+    def _size(name):
+        try:
+            return default_storage.size(name)
+        except OSError:
+            return 0
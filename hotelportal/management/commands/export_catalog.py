@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hotelportal.catalog_io import catalog_to_csv, export_catalog
+from website.models import Hotel
+
+
+class Command(BaseCommand):
+    help = "Write a hotel's categories and items as JSON or CSV (see hotelportal/catalog_io.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("hotel", type=int, help="Hotel id")
+        parser.add_argument("--format", choices=("json", "csv"), default="json")
+        parser.add_argument("-o", "--output", help="File to write (default: stdout)")
+
+    def handle(self, *args, **opts):
+        try:
+            hotel = Hotel.objects.get(pk=opts["hotel"])
+        except Hotel.DoesNotExist:
+            raise CommandError(f"Hotel {opts['hotel']} does not exist.")
+        doc = export_catalog(hotel)
+        text = catalog_to_csv(doc) if opts["format"] == "csv" else json.dumps(doc, indent=2, ensure_ascii=False)
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8", newline="") as fh:
+                fh.write(text)
+            self.stderr.write(f"{len(doc['categories'])} categories, {len(doc['items'])} items → {opts['output']}")
+        else:
+            self.stdout.write(text)
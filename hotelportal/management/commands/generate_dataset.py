@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hotelportal.synthetic import CHUNK, generate_catalog, generate_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic hotels for scale testing: rooms, a multi-level category tree, "
+        "items and photo references, plus a request/line history with realistic hours. "
+        "Writes into the configured database; point DATABASES at a scratch copy first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hotels", type=int, default=1)
+        parser.add_argument("--rooms", type=int, default=150, help="Rooms per hotel")
+        parser.add_argument("--depth", type=int, default=3, help="Food category tree depth")
+        parser.add_argument("--fanout", type=int, default=3, help="Child categories per category")
+        parser.add_argument("--items", type=int, default=2000, help="Food items per hotel")
+        parser.add_argument("--services", type=int, default=20, help="Service items per hotel")
+        parser.add_argument("--images", type=int, default=200, help="ImageAsset rows per hotel")
+        parser.add_argument("--requests", type=int, default=100_000, help="Historical requests per hotel")
+        parser.add_argument("--days", type=int, default=365, help="Spread history over this many past days")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Requests per transaction")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        if min(opts["hotels"], opts["rooms"], opts["depth"], opts["fanout"], opts["chunk"]) < 1:
+            raise CommandError("--hotels, --rooms, --depth, --fanout and --chunk must be at least 1.")
+        rnd = random.Random(opts["seed"])
+        self.stdout.write(f"Writing to {settings.DATABASES['default']['NAME']}")
+        started = time.perf_counter()
+        total_requests = total_lines = 0
+
+        for n in range(opts["hotels"]):
+            catalog = generate_catalog(
+                f"Synthetic Hotel {opts['seed']}-{n + 1}", rnd,
+                rooms=opts["rooms"], depth=opts["depth"], fanout=opts["fanout"],
+                items=opts["items"], services=opts["services"], images=opts["images"],
+            )
+            c = catalog.counts
+            self.stdout.write(
+                f"{catalog.hotel} (#{catalog.hotel.id}): {c['rooms']} rooms, {c['categories']} categories, "
+                f"{c['items']} items, {c['images']} images"
+            )
+            hotel_started = time.perf_counter()
+            requests = lines = 0
+            for i, (requests, lines) in enumerate(
+                generate_history(catalog, opts["requests"], days_back=opts["days"], rnd=rnd, chunk=opts["chunk"]), 1
+            ):
+                if i % 25 == 0:
+                    rate = requests / (time.perf_counter() - hotel_started)
+                    self.stdout.write(f"  {requests:,} requests, {lines:,} lines ({rate:,.0f} requests/s)")
+            total_requests += requests
+            total_lines += lines
+            self.stdout.write(f"  {requests:,} requests, {lines:,} lines")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {opts['hotels']} hotel(s), {total_requests:,} requests, {total_lines:,} lines "
+            f"in {elapsed:.1f}s ({(total_requests + total_lines) / max(elapsed, 1e-9):,.0f} rows/s)."
+        ))
@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hotelportal.catalog_io import CatalogFormatError, import_catalog, parse_catalog
+from website.models import Hotel
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert categories and items from a JSON or CSV menu file in one transaction "
+        "(nothing is deleted; any invalid row aborts the import)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hotel", type=int, help="Hotel id")
+        parser.add_argument("path", help="Menu file (.json or .csv)")
+        parser.add_argument("--format", choices=("json", "csv"), help="Default: from the file extension")
+        parser.add_argument("--dry-run", action="store_true", help="Show the changes, write nothing")
+
+    def handle(self, *args, **opts):
+        try:
+            hotel = Hotel.objects.get(pk=opts["hotel"])
+        except Hotel.DoesNotExist:
+            raise CommandError(f"Hotel {opts['hotel']} does not exist.")
+        fmt = opts["format"] or ("csv" if os.path.splitext(opts["path"])[1].lower() == ".csv" else "json")
+        try:
+            with open(opts["path"], encoding="utf-8-sig", newline="") as fh:
+                doc = parse_catalog(fh.read(), fmt)
+        except OSError as exc:
+            raise CommandError(f"Can't read {opts['path']}: {exc}")
+        except CatalogFormatError as exc:
+            raise CommandError(str(exc))
+
+        diff = import_catalog(hotel, doc, dry_run=opts["dry_run"])
+        for path in diff.categories_created:
+            self.stdout.write(f"+ category {path}")
+        for path in diff.categories_updated:
+            self.stdout.write(f"~ category {path}")
+        for label in diff.items_created:
+            self.stdout.write(f"+ item {label}")
+        for label in diff.items_updated:
+            self.stdout.write(f"~ item {label}")
+        for err in diff.errors:
+            self.stdout.write(self.style.ERROR(f"! {err}"))
+        if diff.errors:
+            raise CommandError(f"Nothing imported: {diff.summary()}")
+        self.stdout.write(self.style.SUCCESS(("Imported: " if diff.applied else "Dry run: ") + diff.summary()))
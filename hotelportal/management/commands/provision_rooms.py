@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from hotelportal.provisioning import PatternError, expand_pattern, parse_csv, provision_rooms
+from website.models import Hotel
+
+
+class Command(BaseCommand):
+    help = (
+        "Create rooms for a hotel in one transaction from a floor × room pattern "
+        "(--floors 1-12 --rooms 01-40) or a CSV (number, floor, is_active); prints the diff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hotel", type=int, help="Hotel id")
+        parser.add_argument("--floors", default="", help="Floor list/ranges, e.g. 1-12 or 1-3,5,G")
+        parser.add_argument("--rooms", default="", help="Room list/ranges per floor, e.g. 01-40")
+        parser.add_argument("--format", dest="number_format", default="{floor}{room}",
+                            help="Room number format (default: {floor}{room})")
+        parser.add_argument("--inactive", action="store_true", help="Create the rooms inactive")
+        parser.add_argument("--csv", dest="csv_path", help="CSV file instead of a pattern")
+        parser.add_argument("--dry-run", action="store_true", help="Show the diff, write nothing")
+
+    def handle(self, *args, **opts):
+        try:
+            hotel = Hotel.objects.get(pk=opts["hotel"])
+        except Hotel.DoesNotExist:
+            raise CommandError(f"Hotel {opts['hotel']} does not exist.")
+
+        try:
+            if opts["csv_path"]:
+                with open(opts["csv_path"], encoding="utf-8-sig", newline="") as fh:
+                    specs, bad = parse_csv(fh.read())
+            elif opts["rooms"]:
+                specs, bad = expand_pattern(
+                    opts["floors"], opts["rooms"], opts["number_format"], not opts["inactive"]
+                ), []
+            else:
+                raise CommandError("Give --rooms (and usually --floors) or --csv.")
+            result = provision_rooms(hotel, specs, dry_run=opts["dry_run"], extra_conflicts=bad)
+        except PatternError as exc:
+            raise CommandError(str(exc))
+        except OSError as exc:
+            raise CommandError(f"Can't read CSV: {exc}")
+        except IntegrityError:
+            raise CommandError("Rooms changed while importing; nothing was saved. Run it again.")
+
+        for spec in result.created:
+            self.stdout.write(f"+ {spec.number}" + (f"  floor {spec.floor}" if spec.floor else ""))
+        for spec, why in result.skipped:
+            self.stdout.write(f"= {spec.number}  {why}")
+        for spec, why in result.conflicts:
+            where = f"line {spec.line}: " if spec.line else ""
+            self.stdout.write(self.style.WARNING(f"! {where}{spec.number or '(blank)'}  {why}"))
+        self.stdout.write(self.style.SUCCESS(result.summary()))
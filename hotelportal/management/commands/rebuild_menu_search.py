@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hotelportal import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the guest menu search index (FTS5) from the items table, e.g. after raw SQL edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hotel", type=int, help="Only this hotel id")
+
+    def handle(self, *args, **opts):
+        if not search.enabled():
+            raise CommandError("Menu search index needs SQLite; other databases use the icontains fallback.")
+        with transaction.atomic():
+            if opts["hotel"]:
+                search.index_hotel(opts["hotel"])
+            else:
+                search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Menu search index rebuilt."))
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the read replica file (online backup "
+        "into a temp file, then an atomic rename). Stand-in for real replication."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Repeat every N seconds until interrupted")
+
+    def handle(self, *args, **opts):
+        alias = getattr(settings, "READ_REPLICA_ALIAS", None)
+        if alias not in connections.settings:
+            raise CommandError("No read replica configured (READ_REPLICA_ALIAS).")
+        primary = str(connections["default"].settings_dict["NAME"])
+        replica = str(connections[alias].settings_dict["NAME"])
+        if os.path.abspath(primary) == os.path.abspath(replica):
+            raise CommandError("The replica points at the primary file; set DB_REPLICA_PATH.")
+
+        while True:
+            started = time.monotonic()
+            self.copy(primary, replica)
+            self.stdout.write(f"Synced {replica} in {(time.monotonic() - started) * 1000:.0f} ms")
+            if not opts["every"]:
+                return
+            time.sleep(max(0.0, opts["every"] - (time.monotonic() - started)))
+
+    @staticmethod
+    def copy(primary, replica):
+        # readers keep the old file until they reconnect; they never see a half copy
+        tmp = f"{replica}.sync"
+        src = sqlite3.connect(primary)
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, replica)
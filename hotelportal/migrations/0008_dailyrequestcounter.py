@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:29
+
+from collections import Counter
+from zoneinfo import ZoneInfo
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_counters(apps, schema_editor):
+    # Roll up existing transitions so today's board counters are right from the start.
+    Hotel = apps.get_model("website", "Hotel")
+    Request = apps.get_model("hotelportal", "Request")
+    DailyRequestCounter = apps.get_model("hotelportal", "DailyRequestCounter")
+
+    tz_by_hotel = {
+        h.id: ZoneInfo(h.timezone or settings.TIME_ZONE)
+        for h in Hotel.objects.only("id", "timezone")
+    }
+    stamps = (("ACCEPTED", "accepted_at"), ("COMPLETED", "completed_at"), ("CANCELLED", "cancelled_at"))
+    cells = Counter()
+    rows = Request.objects.values_list("hotel_id", "kind", "accepted_at", "completed_at", "cancelled_at")
+    for hotel_id, kind, *times in rows.iterator(chunk_size=2000):
+        for (status, _), ts in zip(stamps, times):
+            if ts:
+                day = timezone.localdate(ts, timezone=tz_by_hotel[hotel_id])
+                cells[(hotel_id, day, kind, status)] += 1
+
+    DailyRequestCounter.objects.bulk_create(
+        (DailyRequestCounter(hotel_id=h, day=d, kind=k, status=s, count=n)
+         for (h, d, k, s), n in cells.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0007_request_service_item'),
+        ('website', '0004_hotel_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRequestCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('FOOD', 'Food'), ('SERVICE', 'Service')], max_length=10)),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('ACCEPTED', 'Accepted'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=12)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='website.hotel')),
+            ],
+            options={
+                'unique_together': {('hotel', 'day', 'kind', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
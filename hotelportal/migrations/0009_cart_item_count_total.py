@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:34
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_cart_totals(apps, schema_editor):
+    CartItem = apps.get_model("hotelportal", "CartItem")
+    Cart = apps.get_model("hotelportal", "Cart")
+    rows = (
+        CartItem.objects.values("cart_id")
+        .annotate(n=Sum("qty"), amount=Sum(F("qty") * F("price_snapshot"),
+                                         output_field=models.DecimalField(max_digits=12, decimal_places=2)))
+    )
+    for row in rows:
+        Cart.objects.filter(id=row["cart_id"]).update(item_count=row["n"], total=row["amount"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0008_dailyrequestcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
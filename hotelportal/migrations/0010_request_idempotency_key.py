@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0009_cart_item_count_total'),
+        ('website', '0004_hotel_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='request',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('room', 'idempotency_key'), name='uniq_request_room_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+def check_duplicate_open_services(apps, schema_editor):
+    # Before the constraint existed a double tap could open the same service
+    # twice. Closing the extra ones changes guests' live requests and the
+    # request rollups, so it is an explicit step rather than a side effect.
+    Request = apps.get_model("hotelportal", "Request")
+    seen = set()
+    dupes = []
+    open_reqs = (
+        Request.objects
+        .filter(status__in=["NEW", "ACCEPTED"], service_item__isnull=False)
+        .order_by("created_at", "id")
+        .values_list("id", "room_id", "service_item_id")
+    )
+    for pk, room_id, item_id in open_reqs:
+        if (room_id, item_id) in seen:
+            dupes.append(pk)
+        else:
+            seen.add((room_id, item_id))
+    if dupes:
+        raise RuntimeError(
+            f"{len(dupes)} duplicate open service request(s) would violate "
+            f"uniq_open_service_request_per_room (request ids: {', '.join(map(str, dupes))}). "
+            "Run `manage.py close_duplicate_services` to cancel all but the oldest per room "
+            "and service item (it recounts the rollups), then migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0010_request_idempotency_key'),
+        ('website', '0004_hotel_timezone'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_open_services, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='request',
+            constraint=models.UniqueConstraint(condition=models.Q(('service_item__isnull', False), ('status__in', ['NEW', 'ACCEPTED'])), fields=('room', 'service_item'), name='uniq_open_service_request_per_room'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0011_request_uniq_open_service'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:45
+
+import hotelportal.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0012_imageasset_variants'),
+        ('website', '0004_hotel_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='imageasset',
+            name='file',
+            field=models.ImageField(upload_to=hotelportal.models.item_photo_upload_to),
+        ),
+        migrations.AddIndex(
+            model_name='imageasset',
+            index=models.Index(fields=['hotel', 'content_hash'], name='hotelportal_hotel_i_d02a70_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+import hotelportal.models
+
+
+def fill_short_codes(apps, schema_editor):
+    # one code per existing room; the callable default only runs for new rows
+    Room = apps.get_model("hotelportal", "Room")
+    taken = set()
+    rooms = list(Room.objects.filter(short_code__isnull=True).only("id"))
+    for room in rooms:
+        code = hotelportal.models.new_room_code()
+        while code in taken:
+            code = hotelportal.models.new_room_code()
+        taken.add(code)
+        room.short_code = code
+    Room.objects.bulk_update(rooms, ["short_code"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0013_imageasset_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='short_code',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(fill_short_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='room',
+            name='short_code',
+            field=models.CharField(default=hotelportal.models.new_room_code, editable=False, max_length=12, unique=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# FTS5 index for guest menu search (hotelportal/search.py). SQLite only; on
+# other databases search falls back to icontains and this is a no-op.
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS hotelportal_item_fts USING fts5("
+        "hotel, name, description, category, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO hotelportal_item_fts (rowid, hotel, name, description, category) "
+        "SELECT i.id, 'h' || i.hotel_id, i.name, i.description, c.name "
+        "FROM hotelportal_item i JOIN hotelportal_category c ON c.id = i.category_id "
+        "WHERE i.is_available"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS hotelportal_item_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hotelportal", "0014_room_short_code"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # one grouped pass over the open requests only
+    Request = apps.get_model("hotelportal", "Request")
+    OpenRequestStats = apps.get_model("hotelportal", "OpenRequestStats")
+    rows = {}
+    open_reqs = (
+        Request.objects
+        .filter(status__in=["NEW", "ACCEPTED"])
+        .values_list("hotel_id", "status")
+        .annotate(n=models.Count("id"), oldest=models.Min("created_at"))
+    )
+    for hotel_id, status, n, oldest in open_reqs:
+        row = rows.setdefault(hotel_id, OpenRequestStats(hotel_id=hotel_id, oldest_open_at=oldest))
+        setattr(row, "new_count" if status == "NEW" else "accepted_count", n)
+        row.oldest_open_at = min(row.oldest_open_at, oldest)
+    OpenRequestStats.objects.bulk_create(rows.values(), batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelportal', '0015_item_search_index'),
+        ('website', '0004_hotel_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenRequestStats',
+            fields=[
+                ('hotel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='open_stats', serialize=False, to='website.hotel')),
+                ('new_count', models.PositiveIntegerField(default=0)),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('oldest_open_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
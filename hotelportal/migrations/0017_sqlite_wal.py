@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is stored in the database file, so it is set once here rather than by
+    # every connection's init_command (which rewrote the file header on each
+    # manage.py run). Readers then never block the one writer.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+
+class Migration(migrations.Migration):
+    atomic = False  # journal_mode can't change inside a transaction
+
+    dependencies = [
+        ('hotelportal', '0016_open_request_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Greatest, TruncDate
 from website.models import Hotel
 
 from django.core.exceptions import ValidationError   # 4.1A — Catalog models
@@ -6,15 +7,28 @@ from django.core.exceptions import ValidationError   # 4.1A — Catalog models
 
 from django.utils import timezone
 from decimal import Decimal
+import secrets
 
+from .uploads import content_path, sha256_of
 
 
 
+
+ROOM_CODE_ALPHABET = "23456789abcdefghjkmnpqrstuvwxyz"  # no 0/o, 1/l/i
+ROOM_CODE_LENGTH = 8
+
+
+def new_room_code():
+    # opaque, short → small QR that scans fast and doesn't leak hotel/room ids
+    return "".join(secrets.choice(ROOM_CODE_ALPHABET) for _ in range(ROOM_CODE_LENGTH))
+
+
 class Room(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE)
     number = models.CharField(max_length=20)       # e.g., "101"
     floor  = models.CharField(max_length=10, blank=True)
     is_active = models.BooleanField(default=True)
+    short_code = models.CharField(max_length=12, unique=True, editable=False, default=new_room_code)  # /q/<code>
     current_stay = models.ForeignKey("Stay", null=True, blank=True, on_delete=models.SET_NULL, related_name="current_room")
 
     class Meta:
@@ -78,21 +92,40 @@ class Category(models.Model):
             raise ValidationError("Parent and child categories must be the same kind.")
 
 
+def item_photo_upload_to(instance, filename):
+    # content-addressed: identical bytes → identical path (see uploads.py)
+    if instance.content_hash:
+        return content_path(instance.content_hash, filename)
+    return f"item_photos/{filename}"
+
+
 class ImageAsset(models.Model):
     # Reusable photo library for items
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, db_index=True)
     name = models.CharField(max_length=120)
-    file = models.ImageField(upload_to="item_photos/")  # MEDIA_ROOT/item_photos/...
+    file = models.ImageField(upload_to=item_photo_upload_to)  # MEDIA_ROOT/item_photos/<aa>/<sha256>.<ext>
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)  # sha256 of file bytes
     tags = models.CharField(max_length=200, blank=True)
+    # resized copies written by hotelportal/images.py:
+    # {"src": file.name, "width": px, "webp": {"320": name, ...}, "jpeg": {...}}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = (("hotel", "name"),)
         ordering = ("name",)
+        indexes = [models.Index(fields=["hotel", "content_hash"])]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # new/replaced file: use the digest streamed in by HashingUploadHandler
+        # when uploads.asset_for_upload attached one, else hash it here (admin)
+        if self.file and not self.file._committed:
+            self.content_hash = getattr(self.file.file, "content_hash", None) or sha256_of(self.file)
+        super().save(*args, **kwargs)
+
 
 class Item(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, db_index=True)
@@ -128,6 +161,9 @@ class Cart(models.Model):
     room  = models.ForeignKey(Room,  on_delete=models.CASCADE, db_index=True)
     stay  = models.ForeignKey("Stay", on_delete=models.CASCADE, null=True, blank=True, db_index=True)
     status = models.CharField(max_length=12, default="DRAFT")  # DRAFT → (Day 5: SUBMITTED→REQUEST)
+    # denormalized from CartItem, kept in step by guest/cart.py in the same transaction
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -200,12 +236,28 @@ class Request(models.Model):
 
     note = models.CharField(max_length=200, blank=True)  # optional small note
 
+    # client-generated key for "Place order" — a replayed submit returns this request
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
     class Meta:
         indexes = [
             models.Index(fields=["hotel", "status", "updated_at"]),
             models.Index(fields=["hotel", "created_at"]),
             models.Index(fields=["hotel", "kind", "status"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="uniq_request_room_idempotency_key",
+            ),
+            # at most one open (NEW/ACCEPTED) request per room & service item
+            models.UniqueConstraint(
+                fields=["room", "service_item"],
+                condition=models.Q(status__in=["NEW", "ACCEPTED"], service_item__isnull=False),
+                name="uniq_open_service_request_per_room",
+            ),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -226,6 +278,48 @@ class Request(models.Model):
         if self.service_item and self.service_item.hotel_id != self.hotel_id:
             raise ValidationError("Request.hotel must match Request.service_item.hotel")
 
+    # status → the timestamp stamped when a request enters it; entering one of
+    # these is counted in DailyRequestCounter
+    STATUS_STAMPS = {"ACCEPTED": "accepted_at", "COMPLETED": "completed_at", "CANCELLED": "cancelled_at"}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # a deferred status can't have been changed by the caller → no rollup update
+        instance._saved_status = dict(zip(field_names, values)).get("status", models.DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Creating a request or changing its status also updates the rollups, in
+        the same transaction — whoever makes the change (guest views,
+        live_action, admin, mark_*() + save()): OpenRequestStats follows open
+        requests, and DailyRequestCounter counts the status entered.
+        """
+        update_fields = kwargs.get("update_fields")
+        adding = self._state.adding
+        old_status = None if adding else getattr(self, "_saved_status", None)
+        changed = (
+            old_status is not models.DEFERRED
+            and self.status != old_status
+            and (update_fields is None or "status" in update_fields)
+        )
+        if not changed:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+                if adding:
+                    OpenRequestStats.opened(self.hotel_id, self.status, self.created_at)
+                else:
+                    OpenRequestStats.moved(self.hotel_id, old_status, self.status, self.created_at)
+                stamp = self.STATUS_STAMPS.get(self.status)
+                if stamp:
+                    DailyRequestCounter.bump(
+                        self.hotel_id, self.hotel.localdate(getattr(self, stamp)), self.kind, self.status
+                    )
+        self._saved_status = self.status
+
     # convenience transitions (called from views)
     def mark_accepted(self):
         self.status = "ACCEPTED"
@@ -256,3 +350,140 @@ class RequestLine(models.Model):
 
     def __str__(self):
         return f"{self.name_snapshot} × {self.qty} (₹{self.price_snapshot})"
+
+
+# Daily rollup of request transitions — keeps board counters O(1) however big Request grows.
+class DailyRequestCounter(models.Model):
+    hotel  = models.ForeignKey(Hotel, on_delete=models.CASCADE)
+    day    = models.DateField()  # hotel-local date (Hotel.localdate)
+    kind   = models.CharField(max_length=10, choices=Request.KIND_CHOICES)
+    status = models.CharField(max_length=12, choices=Request.STATUS_CHOICES)  # status entered
+    count  = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("hotel", "day", "kind", "status"),)
+
+    def __str__(self):
+        return f"{self.hotel_id} {self.day} {self.kind}/{self.status}: {self.count}"
+
+    @classmethod
+    def bump(cls, hotel_id, day, kind, status, by=1):
+        """
+        Atomic +by for one (hotel, day, kind, status) cell; creates it on first use.
+        Call inside the transaction that performs the transition.
+        """
+        key = dict(hotel_id=hotel_id, day=day, kind=kind, status=status)
+        if cls.objects.filter(**key).update(count=models.F("count") + by):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(count=by, **key)
+        except IntegrityError:
+            # someone else created the row between our UPDATE and INSERT
+            cls.objects.filter(**key).update(count=models.F("count") + by)
+
+    @classmethod
+    def recount(cls, hotel_id):
+        """Rebuild one hotel's counters from the Request timestamps (to repair drift)."""
+        tz = Hotel.objects.get(pk=hotel_id).tzinfo()
+        cells = []
+        for status, stamp in Request.STATUS_STAMPS.items():
+            rows = (
+                Request.objects
+                .filter(hotel_id=hotel_id, **{f"{stamp}__isnull": False})
+                .annotate(day=TruncDate(stamp, tzinfo=tz))
+                .values_list("day", "kind")
+                .annotate(n=models.Count("id"))
+                .order_by()
+            )
+            cells += [cls(hotel_id=hotel_id, day=day, kind=kind, status=status, count=n) for day, kind, n in rows]
+        with transaction.atomic():
+            cls.objects.filter(hotel_id=hotel_id).delete()
+            cls.objects.bulk_create(cells, batch_size=500)
+
+
+# Per-hotel open-request rollup — the platform overview reads one row per hotel
+# instead of scanning Request. Request.save() maintains it in the same
+# transaction as every create/status change; writes that bypass save()
+# (queryset .update(), bulk_create, raw SQL) need refresh() afterwards.
+
+OPEN_STATUSES = ("NEW", "ACCEPTED")
+
+
+class OpenRequestStats(models.Model):
+    hotel          = models.OneToOneField(Hotel, on_delete=models.CASCADE, primary_key=True, related_name="open_stats")
+    new_count      = models.PositiveIntegerField(default=0)
+    accepted_count = models.PositiveIntegerField(default=0)
+    oldest_open_at = models.DateTimeField(null=True, blank=True)  # created_at of the oldest NEW/ACCEPTED request
+
+    def __str__(self):
+        return f"{self.hotel_id}: {self.new_count} new, {self.accepted_count} accepted"
+
+    @property
+    def open_count(self):
+        return self.new_count + self.accepted_count
+
+    @staticmethod
+    def _counter(status):
+        return {"NEW": "new_count", "ACCEPTED": "accepted_count"}.get(status)
+
+    @classmethod
+    def _oldest_open(cls, hotel_id):
+        # touches only the hotel's open rows (hotel, status, … index)
+        return (
+            Request.objects
+            .filter(hotel_id=hotel_id, status__in=OPEN_STATUSES)
+            .order_by("created_at")
+            .values("created_at")[:1]
+        )
+
+    @classmethod
+    def refresh(cls, hotel_id):
+        """Recompute one hotel's row from Request (first use, or to repair drift)."""
+        counts = dict(
+            Request.objects
+            .filter(hotel_id=hotel_id, status__in=OPEN_STATUSES)
+            .values_list("status")
+            .annotate(n=models.Count("id"))
+        )
+        values = dict(
+            new_count=counts.get("NEW", 0),
+            accepted_count=counts.get("ACCEPTED", 0),
+            oldest_open_at=cls._oldest_open(hotel_id).values_list("created_at", flat=True).first(),
+        )
+        cls.objects.update_or_create(hotel_id=hotel_id, defaults=values)
+
+    @classmethod
+    def opened(cls, hotel_id, status, created_at):
+        """A request was created with `status`. Call inside the creating transaction."""
+        field = cls._counter(status)
+        if field is None:
+            return  # created closed: nothing open changed
+        updated = cls.objects.filter(hotel_id=hotel_id).update(
+            **{field: models.F(field) + 1},
+            oldest_open_at=Coalesce("oldest_open_at", models.Value(created_at)),
+        )
+        if not updated:
+            cls.refresh(hotel_id)
+
+    @classmethod
+    def moved(cls, hotel_id, old_status, new_status, created_at):
+        """
+        A request went old_status → new_status. Counters move by ±1; the oldest
+        timestamp is only recomputed when the request that closed was the oldest.
+        """
+        changes = {}
+        if cls._counter(old_status):
+            field = cls._counter(old_status)
+            changes[field] = Greatest(models.F(field) - 1, 0)
+        if cls._counter(new_status):
+            changes[cls._counter(new_status)] = models.F(cls._counter(new_status)) + 1
+        if not changes:
+            return
+        if not cls.objects.filter(hotel_id=hotel_id).update(**changes):
+            cls.refresh(hotel_id)  # first use; the recount already reflects this transition
+            return
+        if new_status not in OPEN_STATUSES:
+            cls.objects.filter(hotel_id=hotel_id, oldest_open_at__gte=created_at).update(
+                oldest_open_at=models.Subquery(cls._oldest_open(hotel_id))
+            )
@@ -0,0 +1,73 @@
+# Bulk reorder of menu positions — one ordered id list per sibling group.
+#
+# The client sends the full new order of one group: the categories under a
+# parent (or the top-level categories of a kind), or the items of a category.
+# One query loads that group scoped to the hotel, which both checks ownership
+# and that the list is exactly the current siblings (a stale page fails rather
+# than leaving two rows on the same position). Only rows whose position moved
+# are written, in one bulk_update (a single UPDATE … CASE), and the guest menu
+# catalog version is bumped once since bulk writes skip signals.
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Category, Item
+
+
+class ReorderError(ValueError):
+    pass
+
+
+def _clean_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise ReorderError("ids must be a non-empty list.")
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise ReorderError("ids must be integers.")
+    if len(set(ids)) != len(ids):
+        raise ReorderError("ids contains duplicates.")
+    return ids
+
+
+def _reorder(hotel, siblings, ids):
+    ids = _clean_ids(ids)
+    rows = {obj.id: obj for obj in siblings.order_by().only("id", "position")}
+    if set(rows) != set(ids):
+        unknown = [i for i in ids if i not in rows]
+        if unknown:
+            raise ReorderError(f"Not in this group: {', '.join(map(str, unknown))}.")
+        raise ReorderError("The list is missing entries; reload and try again.")
+
+    changed = []
+    for position, pk in enumerate(ids):
+        obj = rows[pk]
+        if obj.position != position:
+            obj.position = position
+            changed.append(obj)
+    if changed:
+        with transaction.atomic():
+            siblings.model.objects.bulk_update(changed, ["position"])
+            bump_catalog_version(hotel.id)
+    return len(changed)
+
+
+def reorder_categories(hotel, ids, parent_id=None, kind=None):
+    """
+    Set positions 0..n-1 on the categories under `parent_id` in `ids` order;
+    top-level categories (parent_id None) are grouped by `kind`.
+    Returns the number of rows written.
+    """
+    siblings = Category.objects.filter(hotel=hotel)
+    if parent_id is None:
+        if kind not in dict(Category.KIND_CHOICES):
+            raise ReorderError("Top-level reorder needs kind FOOD or SERVICE.")
+        siblings = siblings.filter(parent__isnull=True, kind=kind)
+    else:
+        siblings = siblings.filter(parent_id=parent_id)
+    return _reorder(hotel, siblings, ids)
+
+
+def reorder_items(hotel, category_id, ids):
+    """Set positions 0..n-1 on the items of one category in `ids` order."""
+    return _reorder(hotel, Item.objects.filter(hotel=hotel, category_id=category_id), ids)
@@ -0,0 +1,171 @@
+# Bulk room provisioning — range patterns or CSV → one bulk_create.
+#
+# Onboarding a big property shouldn't take one form post per room. Specs come
+# from expand_pattern() ("floors 1-12, rooms 01-40") or parse_csv(), are
+# checked against the hotel's existing rooms in memory (one query for the
+# ("hotel", "number") unique key) and inserted in a single transaction.
+# The result is a diff: created / skipped (already there, identical) /
+# conflicts (clashes or invalid rows), so a re-run of the same input is a no-op.
+
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import Room
+
+NUMBER_MAX = Room._meta.get_field("number").max_length
+FLOOR_MAX = Room._meta.get_field("floor").max_length
+BULK_BATCH = 500
+MAX_ROOMS = 5000  # per import; a typo like "1-1000" × "1-1000" shouldn't insert a million rows
+TRUE_WORDS = {"1", "true", "yes", "y", "active"}
+FALSE_WORDS = {"0", "false", "no", "n", "inactive"}
+
+
+class PatternError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RoomSpec:
+    number: str
+    floor: str = ""
+    is_active: bool = True
+    line: int = 0  # CSV line, for messages
+
+
+@dataclass
+class ProvisionResult:
+    created: list = field(default_factory=list)    # RoomSpec
+    skipped: list = field(default_factory=list)    # (RoomSpec, reason)
+    conflicts: list = field(default_factory=list)  # (RoomSpec, reason)
+    applied: bool = False
+
+    def summary(self):
+        verb = "created" if self.applied else "to create"
+        return f"{len(self.created)} {verb}, {len(self.skipped)} skipped, {len(self.conflicts)} conflicts"
+
+
+def _expand_tokens(spec):
+    """
+    "1-3,5,B" → ["1", "2", "3", "5", "B"]. Numeric ranges keep the start's
+    zero padding: "01-12" → "01" … "12".
+    """
+    out = []
+    for token in (t.strip() for t in spec.split(",")):
+        if not token:
+            continue
+        lo, sep, hi = token.partition("-")
+        if sep and lo.strip().isdigit() and hi.strip().isdigit():
+            lo, hi = lo.strip(), hi.strip()
+            if int(hi) < int(lo):
+                raise PatternError(f"Range {token!r} runs backwards.")
+            if int(hi) - int(lo) >= MAX_ROOMS:
+                raise PatternError(f"Range {token!r} is too large.")
+            width = len(lo) if lo.startswith("0") else 0
+            out.extend(str(n).zfill(width) for n in range(int(lo), int(hi) + 1))
+        else:
+            out.append(token)
+    return out
+
+
+def expand_pattern(floors, rooms, number_format="{floor}{room}", is_active=True):
+    """
+    Every floor × room combination, e.g. floors="1-12", rooms="01-40" →
+    101 … 140, 201 … 1240. `number_format` may use {floor} and {room}.
+    """
+    floor_list = _expand_tokens(floors) if floors else [""]
+    room_list = _expand_tokens(rooms)
+    if not room_list:
+        raise PatternError("Give at least one room number or range.")
+    if len(floor_list) * len(room_list) > MAX_ROOMS:
+        raise PatternError(f"That pattern makes more than {MAX_ROOMS} rooms.")
+    try:
+        return [
+            RoomSpec(number=number_format.format(floor=f, room=r), floor=f, is_active=is_active)
+            for f in floor_list for r in room_list
+        ]
+    except (KeyError, IndexError, ValueError) as exc:
+        raise PatternError(f"Bad number format {number_format!r}: use {{floor}} and {{room}}.") from exc
+
+
+def _parse_bool(value, default=True):
+    value = (value or "").strip().lower()
+    if not value:
+        return default
+    if value in TRUE_WORDS:
+        return True
+    if value in FALSE_WORDS:
+        return False
+    raise ValueError(value)
+
+
+def parse_csv(text):
+    """
+    CSV with a header row: number (required), floor, is_active (optional).
+    Returns (specs, bad_rows) where bad_rows are (RoomSpec, reason).
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    headers = {(h or "").strip().lower() for h in (reader.fieldnames or [])}
+    if "number" not in headers:
+        raise PatternError("CSV needs a header row with a 'number' column.")
+
+    specs, bad = [], []
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        line = reader.line_num
+        spec = RoomSpec(number=row.get("number", ""), floor=row.get("floor", ""), line=line)
+        try:
+            spec = RoomSpec(spec.number, spec.floor, _parse_bool(row.get("is_active")), line)
+        except ValueError:
+            bad.append((spec, f"is_active {row.get('is_active')!r} is not yes/no"))
+            continue
+        specs.append(spec)
+        if len(specs) > MAX_ROOMS:
+            raise PatternError(f"CSV has more than {MAX_ROOMS} rooms.")
+    return specs, bad
+
+
+def plan_rooms(hotel, specs):
+    """Diff `specs` against the hotel's rooms without writing anything."""
+    existing = {
+        number: (floor, is_active)
+        for number, floor, is_active in Room.objects.filter(hotel=hotel).values_list("number", "floor", "is_active")
+    }
+    result = ProvisionResult()
+    seen = set()
+    for spec in specs:
+        if not spec.number:
+            result.conflicts.append((spec, "missing room number"))
+        elif len(spec.number) > NUMBER_MAX:
+            result.conflicts.append((spec, f"room number longer than {NUMBER_MAX} characters"))
+        elif len(spec.floor) > FLOOR_MAX:
+            result.conflicts.append((spec, f"floor longer than {FLOOR_MAX} characters"))
+        elif spec.number in seen:
+            result.conflicts.append((spec, "listed twice in this import"))
+        elif spec.number in existing:
+            floor, is_active = existing[spec.number]
+            if (floor, is_active) == (spec.floor, spec.is_active):
+                result.skipped.append((spec, "already exists"))
+            else:
+                result.conflicts.append((spec, f"exists with floor {floor or '—'}, active={is_active}"))
+        else:
+            result.created.append(spec)
+        seen.add(spec.number)
+    return result
+
+
+def provision_rooms(hotel, specs, dry_run=False, extra_conflicts=()):
+    """plan_rooms() and, unless dry_run, insert the new rooms in one transaction."""
+    result = plan_rooms(hotel, specs)
+    result.conflicts[:0] = list(extra_conflicts)
+    if dry_run or not result.created:
+        return result
+    with transaction.atomic():
+        Room.objects.bulk_create(
+            [Room(hotel=hotel, number=s.number, floor=s.floor, is_active=s.is_active) for s in result.created],
+            batch_size=BULK_BATCH,
+        )
+    result.applied = True
+    return result
@@ -0,0 +1,241 @@
+# Room QR codes, rendered server-side (SVG for the print sheet, PNG for downloads).
+#
+# A code only depends on the URL it encodes (SITE_URL + /q/<short_code>) and the
+# hotel logo drawn in the middle, so renders are cached under a digest of
+# exactly those inputs: changing SITE_URL or uploading a new logo yields new
+# keys, old ones age out. Bulk renders (the print sheet, ZIP/PDF downloads)
+# fan cache misses out to a process pool — QR encoding is pure Python and
+# CPU-bound. The pool is started on the first bulk render and kept for the
+# life of the process, so later sheets don't pay for spawning workers.
+#
+# The render_* functions are pure (bytes/str in, bytes/str out) so they can
+# run in worker processes without Django set up.
+
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import escape
+from PIL import Image, ImageDraw, ImageFont
+
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+QR_PNG_SIZE = 600         # px; prints sharp at ~5 cm
+QR_BORDER = 2             # modules of quiet zone, as the old client-side render
+QR_LOGO_RATIO = 0.22      # logo box relative to the code, as the old client-side render
+QR_LOGO_PAD = 0.02        # white pad around the logo, relative to the code
+QR_POOL_THRESHOLD = 16    # below this many misses, render inline (pool start-up costs more)
+
+
+def room_url(room):
+    # the short /q/<code> form: fewer modules → faster scans, no ids on the sticker
+    return f"{settings.SITE_URL}{reverse('room_short', args=[room.short_code])}"
+
+
+def _matrix(url):
+    # level H survives the logo covering the centre
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, border=QR_BORDER)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_qr_svg(url, logo_href=None):
+    """
+    Scalable SVG: one path for all dark modules, plus the logo by reference
+    (the sheet shows hundreds of codes; the browser fetches the logo once).
+    """
+    matrix = _matrix(url)
+    n = len(matrix)
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {n} {n}" '
+        f'shape-rendering="crispEdges" role="img">',
+        f'<rect width="{n}" height="{n}" fill="#fff"/>',
+        f'<path d="{"".join(runs)}" fill="#000"/>',
+    ]
+    if logo_href:
+        box, pad = n * QR_LOGO_RATIO, n * QR_LOGO_PAD
+        at = (n - box) / 2
+        parts.append(
+            f'<rect x="{at - pad:.2f}" y="{at - pad:.2f}" width="{box + 2 * pad:.2f}" '
+            f'height="{box + 2 * pad:.2f}" fill="#fff"/>'
+        )
+        parts.append(
+            f'<image x="{at:.2f}" y="{at:.2f}" width="{box:.2f}" height="{box:.2f}" href="{escape(logo_href)}"/>'
+        )
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _qr_image(url, logo_png=None, size=QR_PNG_SIZE):
+    matrix = _matrix(url)
+    n = len(matrix)
+    img = Image.new("1", (n, n), 1)
+    img.putdata([0 if cell else 1 for row in matrix for cell in row])
+    img = img.resize((size, size), Image.NEAREST)  # bilevel unless a logo needs colour
+    if logo_png:
+        img = img.convert("RGB")
+        box, pad = int(size * QR_LOGO_RATIO), int(size * QR_LOGO_PAD)
+        at = (size - box) // 2
+        with Image.open(BytesIO(logo_png)) as logo:
+            logo = logo.convert("RGBA").resize((box, box), Image.LANCZOS)
+        ImageDraw.Draw(img).rectangle((at - pad, at - pad, at + box + pad, at + box + pad), fill="white")
+        img.paste(logo, (at, at), logo)
+    return img
+
+
+def render_qr_png(url, logo_png=None, size=QR_PNG_SIZE):
+    buf = BytesIO()
+    _qr_image(url, logo_png, size).save(buf, "PNG")
+    return buf.getvalue()
+
+
+CONTENT_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+def _render(job):
+    fmt, url, logo = job
+    return render_qr_svg(url, logo) if fmt == "svg" else render_qr_png(url, logo)
+
+
+def hotel_logo_png(hotel):
+    """Hotel logo pre-shrunk to the PNG logo box (workers just paste it), or None."""
+    if not hotel.logo:
+        return None
+    try:
+        with hotel.logo.open("rb") as fh, Image.open(fh) as logo:
+            logo = logo.convert("RGBA")
+            box = int(QR_PNG_SIZE * QR_LOGO_RATIO)
+            logo = logo.resize((box, box), Image.LANCZOS)
+            buf = BytesIO()
+            logo.save(buf, "PNG", optimize=True)
+            return buf.getvalue()
+    except (OSError, ValueError):
+        return None  # missing/broken logo file → plain code, like the old onerror path
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, "QR_POOL_WORKERS", None)  # None → CPU count
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def _render_many(jobs):
+    global _pool
+    if len(jobs) < QR_POOL_THRESHOLD:
+        return [_render(job) for job in jobs]
+    pool = _render_pool()
+    try:
+        return list(pool.map(_render, jobs, chunksize=8))
+    except BrokenProcessPool:
+        # a worker died (OOM kill, …): drop the pool so the next bulk render starts a fresh one
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return [_render(job) for job in jobs]
+
+
+def qr_key(fmt, url, logo_version):
+    digest = hashlib.sha1(f"{url}|{logo_version}".encode()).hexdigest()[:16]
+    return f"qr:{fmt}:{digest}"
+
+
+def room_qrs(hotel, rooms, fmt="svg"):
+    """
+    {room.id: rendered code} for `rooms` of `hotel`: one cache read, misses
+    rendered (in a process pool when there are many) and written back together.
+    """
+    if not rooms:
+        return {}  # also a platform admin without a hotel: nothing to render
+    logo_version = hotel.logo.name if hotel.logo else ""
+    urls = {r.id: room_url(r) for r in rooms}
+    keys = {rid: qr_key(fmt, url, logo_version) for rid, url in urls.items()}
+    hits = cache.get_many(keys.values())
+    out = {rid: hits[k] for rid, k in keys.items() if k in hits}
+
+    missing = [rid for rid in keys if rid not in out]
+    if missing:
+        # SVG links the logo by URL; PNG needs the pixels
+        if fmt == "svg":
+            logo = hotel.logo.url if hotel.logo else None
+        else:
+            logo = hotel_logo_png(hotel)
+        rendered = _render_many([(fmt, urls[rid], logo) for rid in missing])
+        fresh = dict(zip(missing, rendered))
+        cache.set_many({keys[rid]: code for rid, code in fresh.items()}, QR_CACHE_TIMEOUT)
+        out.update(fresh)
+    return out
+
+
+# ---- printable bulk output -------------------------------------------------
+
+PDF_DPI = 150
+PDF_PAGE = (1240, 1754)   # A4 at 150 dpi
+PDF_GRID = (3, 4)         # columns × rows of room cards per page
+PDF_MARGIN = 60
+
+
+def _label_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def qr_sheet_pdf(hotel, rooms, pngs):
+    """
+    A4 PDF, PDF_GRID cards per page: code + "Room N · Floor F" caption.
+    `hotel` may be None (platform admin): one blank page.
+    """
+    has_logo = bool(hotel and hotel.logo)
+    cols, rows = PDF_GRID
+    cell_w = (PDF_PAGE[0] - 2 * PDF_MARGIN) // cols
+    cell_h = (PDF_PAGE[1] - 2 * PDF_MARGIN - 60) // rows
+    code_px = min(cell_w, cell_h - 50) - 20
+    title_font, label_font = _label_font(34), _label_font(26)
+
+    pages = []
+    per_page = cols * rows
+    for start in range(0, max(len(rooms), 1), per_page):
+        # bilevel pages compress ~15x smaller; colour only when there's a logo
+        page = Image.new("RGB" if has_logo else "1", PDF_PAGE, "white")
+        draw = ImageDraw.Draw(page)
+        if hotel:
+            draw.text((PDF_MARGIN, PDF_MARGIN // 2), hotel.name, fill="black", font=title_font)
+        for i, room in enumerate(rooms[start:start + per_page]):
+            cx = PDF_MARGIN + (i % cols) * cell_w
+            cy = PDF_MARGIN + 60 + (i // cols) * cell_h
+            with Image.open(BytesIO(pngs[room.id])) as code:
+                page.paste(code.convert(page.mode).resize((code_px, code_px), Image.NEAREST),
+                           (cx + (cell_w - code_px) // 2, cy))
+            label = f"Room {room.number}" + (f" · Floor {room.floor}" if room.floor else "")
+            width = draw.textlength(label, font=label_font)
+            draw.text((cx + (cell_w - width) / 2, cy + code_px + 10), label, fill="black", font=label_font)
+        pages.append(page)
+
+    buf = BytesIO()
+    pages[0].save(buf, "PDF", save_all=True, append_images=pages[1:], resolution=PDF_DPI)
+    return buf.getvalue()
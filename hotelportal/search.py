@@ -0,0 +1,128 @@
+# Guest menu search — SQLite FTS5 index over available items.
+#
+# hotelportal_item_fts holds one row per available item (rowid = Item.id):
+# a "hotel" column with the token h<hotel_id>, and name, description and
+# category name as searchable text. Every query is pinned to one hotel with a
+# column filter, so the index stays a single table across hotels and a lookup
+# only touches that hotel's postings. prefix='2 3' keeps type-ahead prefixes
+# ("bu"*, "bur"*) as index lookups instead of term scans.
+#
+# signals.py keeps it in sync on Item/Category save and delete; bulk writers
+# (catalog_io.import_catalog) call index_hotel() themselves. On a non-SQLite
+# database there is no index and search_items() falls back to icontains.
+
+import re
+from decimal import Decimal
+
+from django.db import connection
+
+from .models import Item
+
+FTS_TABLE = "hotelportal_item_fts"
+MIN_QUERY = 2
+MAX_RESULTS = 10
+# bm25 column weights: hotel, name, description, category
+RANK = f"bm25({FTS_TABLE}, 0.0, 10.0, 1.0, 3.0)"
+
+_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, hotel, name, description, category) "
+    "SELECT i.id, 'h' || i.hotel_id, i.name, i.description, c.name "
+    "FROM hotelportal_item i JOIN hotelportal_category c ON c.id = i.category_id "
+    "WHERE i.is_available AND {where}"
+)
+_DELETE = f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM hotelportal_item i WHERE {{where}})"
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def enabled():
+    return connection.vendor == "sqlite"
+
+
+def _reindex(where, params):
+    if not enabled():
+        return
+    with connection.cursor() as cur:
+        cur.execute(_DELETE.format(where=where), params)
+        cur.execute(_INSERT.format(where=where), params)
+
+
+def index_item(item_id):
+    """Re-index one item (drops it if it is no longer available)."""
+    _reindex("i.id = %s", [item_id])
+
+
+def unindex_item(item_id):
+    if enabled():
+        with connection.cursor() as cur:
+            cur.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [item_id])
+
+
+def index_category(category_id):
+    """Re-index a category's items, e.g. after a rename."""
+    _reindex("i.category_id = %s", [category_id])
+
+
+def index_hotel(hotel_id):
+    """Re-index a whole hotel; for bulk writes that skip signals."""
+    _reindex("i.hotel_id = %s", [hotel_id])
+
+
+def rebuild():
+    if enabled():
+        with connection.cursor() as cur:
+            cur.execute(f"DELETE FROM {FTS_TABLE}")
+            cur.execute(_INSERT.format(where="1"), [])
+
+
+def match_expression(hotel_id, text):
+    """
+    "chick bur" → hotel:"h12" AND {name description category}: ("chick"* "bur"*)
+    Only word characters reach FTS5, so user input can't inject query syntax.
+    """
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    terms = " ".join(f'"{w}"*' for w in words[:8])
+    return f'hotel:"h{int(hotel_id)}" AND {{name description category}}: ({terms})'
+
+
+def search_items(hotel_id, text, limit=MAX_RESULTS):
+    """
+    Ranked type-ahead over a hotel's available items in active categories.
+    Returns dicts: id, name, price, category, kind.
+    """
+    text = (text or "").strip()
+    if len(text) < MIN_QUERY:
+        return []
+    if not enabled():
+        return _search_orm(hotel_id, text, limit)
+    expr = match_expression(hotel_id, text)
+    if expr is None:
+        return []
+    sql = (
+        f"SELECT i.id, i.name, i.price, c.name, c.kind FROM {FTS_TABLE} "
+        f"JOIN hotelportal_item i ON i.id = {FTS_TABLE}.rowid "
+        "JOIN hotelportal_category c ON c.id = i.category_id "
+        f"WHERE {FTS_TABLE} MATCH %s AND i.is_available AND c.is_active "
+        f"ORDER BY {RANK} LIMIT %s"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [expr, limit])
+        rows = cur.fetchall()
+    return [_result(*row) for row in rows]
+
+
+def _search_orm(hotel_id, text, limit):
+    items = (
+        Item.objects
+        .filter(hotel_id=hotel_id, is_available=True, category__is_active=True, name__icontains=text)
+        .values_list("id", "name", "price", "category__name", "category__kind")
+        .order_by("position", "name")[:limit]
+    )
+    return [_result(*row) for row in items]
+
+
+def _result(pk, name, price, category, kind):
+    # raw SQLite rows give the price back as int/float
+    return {"id": pk, "name": name, "price": f"{Decimal(str(price)):.2f}", "category": category, "kind": kind}
@@ -0,0 +1,56 @@
+# Model signal hooks (wired in apps.HotelportalConfig.ready)
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .images import delete_variants, needs_variants, schedule_variants
+from .models import Category, ImageAsset, Item
+from .search import index_category, index_item, unindex_item
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=ImageAsset)
+@receiver(post_delete, sender=ImageAsset)
+def catalog_changed(sender, instance, **kwargs):
+    # any menu edit → new catalog version → guest room page rebuilds its cache
+    if instance.hotel_id:
+        bump_catalog_version(instance.hotel_id)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, **kwargs):
+    # keep the guest search index in step (drops items that became unavailable)
+    index_item(instance.id)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    unindex_item(instance.id)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created=False, **kwargs):
+    # the category name is indexed with each item; a new category has none yet
+    if not created:
+        index_category(instance.id)
+
+
+@receiver(post_save, sender=ImageAsset)
+def image_uploaded(sender, instance, raw=False, **kwargs):
+    # new or replaced file → render srcset variants in the background
+    if not raw and needs_variants(instance):
+        schedule_variants(instance)
+
+
+@receiver(post_delete, sender=ImageAsset)
+def image_deleted(sender, instance, **kwargs):
+    # files are content-addressed and may be shared with another hotel's asset
+    def cleanup():
+        if not ImageAsset.objects.filter(file=instance.file.name).exists():
+            delete_variants(instance.variants)
+    transaction.on_commit(cleanup)
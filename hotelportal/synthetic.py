@@ -0,0 +1,261 @@
+# Synthetic data for scale testing — hotels with a production-sized catalog
+# and a long request history, so slow pages reproduce on a laptop.
+#
+# Catalog rows go in with bulk_create; the history with executemany, CHUNK
+# requests per transaction (see generate_history). History is generated chunk
+# by chunk from a seeded RNG, so memory stays flat however many rows are asked
+# for and the same --seed gives the same data. Times follow HOURLY_WEIGHTS
+# in the hotel's timezone (breakfast / lunch / dinner peaks for food, a
+# late-morning housekeeping peak for services).
+#
+# Nothing here goes through save(), so this module also does what signals and
+# views would have: the FTS menu index, and the DailyRequestCounter /
+# OpenRequestStats rollups.
+
+import hashlib
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from website.models import Hotel
+
+from . import search
+from .models import Category, DailyRequestCounter, ImageAsset, Item, OpenRequestStats, Request, RequestLine, Room
+
+CHUNK = 2000  # requests per transaction
+
+# share of the day's requests per local hour, 00..23
+HOURLY_WEIGHTS = {
+    "FOOD": [2, 1, 1, 0, 0, 1, 4, 10, 14, 11, 5, 4, 9, 13, 10, 4, 3, 4, 7, 13, 16, 14, 9, 5],
+    "SERVICE": [1, 0, 0, 0, 0, 0, 1, 3, 6, 9, 11, 10, 8, 6, 5, 5, 5, 6, 7, 7, 6, 5, 3, 2],
+}
+_HOUR_CUM = {kind: list(accumulate(w)) for kind, w in HOURLY_WEIGHTS.items()}
+SERVICE_SHARE = 0.35
+CANCELLED_SHARE = 0.05
+QTY_WEIGHTS = (70, 22, 8)  # qty 1, 2, 3
+
+FOOD_SECTIONS = ["Breakfast", "Starters", "Mains", "Breads", "Desserts", "Beverages", "Bar", "Kids"]
+SERVICE_SECTIONS = ["Housekeeping", "Laundry", "Concierge", "Maintenance", "Transport", "Wellness"]
+SUBSECTIONS = ["Classics", "Specials", "Regional", "Light", "Chef's picks", "Seasonal", "Combos", "Sides"]
+DISH_WORDS = ["Paneer", "Chicken", "Masala", "Dal", "Biryani", "Dosa", "Idli", "Tikka", "Korma", "Pulao",
+              "Sandwich", "Burger", "Pasta", "Salad", "Soup", "Omelette", "Pancakes", "Lassi", "Coffee", "Tea",
+              "Noodles", "Curry", "Kebab", "Wrap", "Pizza", "Fries", "Halwa", "Kulfi", "Juice", "Shake"]
+DISH_STYLES = ["Classic", "Spicy", "Butter", "Smoked", "Tandoori", "Grilled", "Crispy", "Home-style",
+               "Garlic", "Hyderabadi", "Kerala", "Punjabi", "Mini", "Double", "Cold", "Hot"]
+SERVICE_WORDS = ["Towels", "Room cleaning", "Turndown", "Laundry pickup", "Ironing", "Wake-up call",
+                 "Taxi", "Extra pillow", "Toiletries", "Water bottles", "AC repair", "Spa booking",
+                 "Luggage help", "Late checkout", "Baby cot", "Shoe shine"]
+
+
+@dataclass
+class Catalog:
+    hotel: Hotel
+    room_ids: list
+    food: list  # (id, name, price)
+    services: list  # (id, name, price)
+    counts: dict = field(default_factory=dict)
+
+
+def _unique(name, seen):
+    if name in seen:
+        name = f"{name} {len(seen) + 1}"
+    seen.add(name)
+    return name
+
+
+def _category_tree(hotel, kind, roots, depth, fanout):
+    """bulk_create `roots` top-level categories and `fanout` children per node down to `depth`; returns leaves."""
+    level = Category.objects.bulk_create(
+        [Category(hotel=hotel, kind=kind, name=name, position=i) for i, name in enumerate(roots)]
+    )
+    for _ in range(depth - 1):
+        level = Category.objects.bulk_create([
+            Category(hotel=hotel, kind=kind, parent=parent, position=i,
+                     name=f"{parent.name.split(' · ')[-1]} · {SUBSECTIONS[i % len(SUBSECTIONS)]}"
+                          + (f" {i // len(SUBSECTIONS) + 1}" if i >= len(SUBSECTIONS) else ""))
+            for parent in level for i in range(fanout)
+        ])
+    return level
+
+
+def generate_catalog(name, rnd, rooms=150, depth=3, fanout=3, items=2000, services=20, images=200):
+    """One hotel: rooms, FOOD and SERVICE category trees, items, photo library. Returns a Catalog."""
+    with transaction.atomic():
+        hotel = Hotel.objects.create(name=name, city="Synthetic")
+        floors = max(1, rooms // 40)
+        Room.objects.bulk_create(
+            [Room(hotel=hotel, number=f"{n % floors + 1}{n // floors + 1:02d}", floor=str(n % floors + 1))
+             for n in range(rooms)],
+            batch_size=500,
+        )
+
+        assets = ImageAsset.objects.bulk_create([
+            ImageAsset(
+                hotel=hotel, name=f"Photo {n + 1}", tags="synthetic",
+                # rows only, no bytes on disk; a distinct hash keeps dedupe/backfill off them
+                file=f"item_photos/synthetic/{hotel.id}/{n + 1}.jpg",
+                content_hash=hashlib.sha256(f"synthetic:{hotel.id}:{n}".encode()).hexdigest(),
+            )
+            for n in range(images)
+        ], batch_size=500)
+
+        food_leaves = _category_tree(hotel, "FOOD", FOOD_SECTIONS[:max(1, fanout + 1)], depth, fanout)
+        service_leaves = _category_tree(hotel, "SERVICE", SERVICE_SECTIONS[:max(1, fanout)], min(depth, 2), fanout)
+
+        rows, seen = [], {}
+        for n in range(items):
+            cat = rnd.choice(food_leaves)
+            rows.append(Item(
+                hotel=hotel, category=cat, position=n,
+                name=_unique(f"{rnd.choice(DISH_STYLES)} {rnd.choice(DISH_WORDS)}", seen.setdefault(cat.id, set())),
+                price=Decimal(rnd.randrange(40, 900, 5)), unit="plate",
+                description=f"{rnd.choice(DISH_STYLES)} {rnd.choice(DISH_WORDS).lower()} with house sides",
+                image=rnd.choice(assets) if assets and rnd.random() < 0.7 else None,
+                is_available=rnd.random() < 0.95,
+            ))
+        for n in range(services):
+            cat = rnd.choice(service_leaves)
+            rows.append(Item(
+                hotel=hotel, category=cat, position=n, unit="request",
+                name=_unique(SERVICE_WORDS[n % len(SERVICE_WORDS)], seen.setdefault(cat.id, set())),
+                price=Decimal(rnd.choice((0, 0, 0, 150, 300))),
+            ))
+        Item.objects.bulk_create(rows, batch_size=500)
+        search.index_hotel(hotel.id)
+
+    menu = Item.objects.filter(hotel=hotel).values_list("id", "name", "price", "category__kind")
+    return Catalog(
+        hotel=hotel,
+        room_ids=list(Room.objects.filter(hotel=hotel).values_list("id", flat=True)),
+        food=[(pk, n, p) for pk, n, p, kind in menu if kind == "FOOD"],
+        services=[(pk, n, p) for pk, n, p, kind in menu if kind == "SERVICE"],
+        counts={"rooms": rooms, "categories": Category.objects.filter(hotel=hotel).count(),
+                "items": len(rows), "images": len(assets)},
+    )
+
+
+REQUEST_COLUMNS = (
+    "id", "hotel_id", "room_id", "kind", "status", "service_item_id", "subtotal", "note",
+    "created_at", "updated_at", "accepted_at", "completed_at", "cancelled_at",
+)
+LINE_COLUMNS = ("request_id", "item_id", "name_snapshot", "price_snapshot", "qty", "line_total")
+
+
+def _one_request(catalog, rnd, days):
+    """
+    One closed request with a plausible lifecycle: REQUEST_COLUMNS values after
+    "id", its line rows (LINE_COLUMNS after "request_id"), and the
+    DailyRequestCounter cells it entered.
+    """
+    kind = "SERVICE" if not catalog.food or (catalog.services and rnd.random() < SERVICE_SHARE) else "FOOD"
+    day, midnight = rnd.choice(days)
+    # seconds after local midnight
+    created = rnd.choices(range(24), cum_weights=_HOUR_CUM[kind])[0] * 3600 + rnd.randrange(3600)
+    accepted = completed = cancelled = None
+    if rnd.random() < CANCELLED_SHARE / 2:  # cancelled before anyone picked it up
+        status, cancelled = "CANCELLED", created + rnd.randrange(60, 600)
+    else:
+        accepted = created + rnd.randrange(30, 480)
+        if rnd.random() < CANCELLED_SHARE / 2:
+            status, cancelled = "CANCELLED", accepted + rnd.randrange(60, 1200)
+        else:
+            status, completed = "COMPLETED", accepted + rnd.randrange(300, 2700 if kind == "FOOD" else 1800)
+    closed = completed or cancelled
+
+    lines = []
+    if kind == "SERVICE":
+        service_item, note, subtotal = rnd.choice(catalog.services)
+    else:
+        service_item, note, subtotal = None, "", Decimal("0.00")
+        k = rnd.choices((1, 2, 3, 4), (35, 35, 20, 10))[0]
+        for pk, name, price in rnd.sample(catalog.food, min(k, len(catalog.food))):
+            qty = rnd.choices((1, 2, 3), QTY_WEIGHTS)[0]
+            lines.append((pk, name, price, qty, price * qty))
+            subtotal += price * qty
+
+    def at(seconds):
+        return None if seconds is None else midnight + timedelta(seconds=seconds)
+
+    row = (catalog.hotel.id, rnd.choice(catalog.room_ids), kind, status, service_item, subtotal, note,
+           at(created), at(closed), at(accepted), at(completed), at(cancelled))
+    # counters key on the hotel-local date the status was entered, as live_action does
+    entered = [(day if t < 86400 else day + timedelta(days=1), kind, s)
+               for t, s in ((accepted, "ACCEPTED"), (closed, status)) if t is not None]
+    return row, lines, entered
+
+
+def _insert(model, columns, rows):
+    qn = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {qn(model._meta.db_table)} ({', '.join(map(qn, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    with connection.cursor() as cur:
+        cur.executemany(sql, rows)
+
+
+def generate_history(catalog, requests, days_back=365, rnd=None, chunk=CHUNK, now=None):
+    """
+    Create `requests` closed requests spread over the `days_back` days before today
+    (hotel-local), `chunk` per transaction. Yields (requests, lines) written so far
+    after each chunk; the rollups are written once the history is complete.
+
+    History rows skip bulk_create: at millions of rows its per-value field
+    preparation is most of the run time, while these tuples already hold what
+    the columns store. Request ids are assigned from MAX(id) inside each chunk's
+    transaction (so lines can point at them without RETURNING), the way loaddata
+    writes explicit keys; sequences are reset afterwards for backends that have
+    them. Don't run it next to live traffic on a non-SQLite database.
+    """
+    rnd = rnd or random.Random()
+    hotel = catalog.hotel
+    if not (catalog.food or catalog.services) or not catalog.room_ids:
+        return
+    # (hotel-local date, its midnight as the naive value the database stores);
+    # timestamps are offsets from it, so no per-value timezone conversion
+    tz = hotel.tzinfo()
+    today = hotel.localdate(now)
+    days = []
+    for d in range(1, max(1, days_back) + 1):
+        day = today - timedelta(days=d)
+        midnight = datetime.combine(day, time(), tzinfo=tz)
+        if settings.USE_TZ:
+            midnight = timezone.make_naive(midnight, connection.timezone)
+        days.append((day, midnight.replace(tzinfo=None)))
+
+    cells = Counter()
+    done = lines_done = 0
+    while done < requests:
+        size = min(chunk, requests - done)
+        with transaction.atomic():
+            # SQLite: BEGIN IMMEDIATE (settings) holds the write lock, so MAX(id) is ours
+            next_id = (Request.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+            request_rows, line_rows = [], []
+            for pk in range(next_id, next_id + size):
+                row, lines, entered = _one_request(catalog, rnd, days)
+                request_rows.append((pk, *row))
+                line_rows.extend((pk, *ln) for ln in lines)
+                cells.update(entered)
+            _insert(Request, REQUEST_COLUMNS, request_rows)
+            _insert(RequestLine, LINE_COLUMNS, line_rows)
+        done += size
+        lines_done += len(line_rows)
+        yield done, lines_done
+
+    with connection.cursor() as cur:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Request, RequestLine]):
+            cur.execute(sql)
+    with transaction.atomic():
+        # a few cells per day; bump() adds to what an earlier run left
+        for (day, kind, status), n in cells.items():
+            DailyRequestCounter.bump(hotel.id, day, kind, status, by=n)
+        OpenRequestStats.refresh(hotel.id)
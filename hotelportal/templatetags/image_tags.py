@@ -0,0 +1,22 @@
+# hotelportal/templatetags/image_tags.py
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+
+@register.filter
+def srcset(asset, fmt="jpeg"):
+    """
+    "url 320w, url 640w, ..." for an ImageAsset's variants in `fmt` ("webp"/"jpeg"),
+    or "" while they haven't been rendered yet.
+    Usage: <source type="image/webp" srcset="{{ it.image|srcset:'webp' }}">
+    """
+    manifest = getattr(asset, "variants", None) or {}
+    if asset is None or not asset.file or manifest.get("src") != asset.file.name:
+        return ""  # stale/missing manifest → let the original <img src> do the work
+    urls = manifest.get(fmt) or {}
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w"
+        for width, name in sorted(urls.items(), key=lambda kv: int(kv[0]))
+    )
@@ -1,3 +1,839 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from scan2service import metrics
+from scan2service.routers import PIN_COOKIE
+from website.models import Hotel, User
+from . import events, qr, search, views_history
+from .catalog_io import catalog_to_csv, export_catalog, import_catalog, parse_catalog
+from .cursors import decode_cursor
+from .events import EventBroker
+from .images import build_variants
+from .management.commands.sync_replica import Command as SyncReplicaCommand
+from .models import Room, Category, Item, ImageAsset, OpenRequestStats, Request, RequestLine, DailyRequestCounter
+from .templatetags.image_tags import srcset
+
+
+class LiveBoardTestMixin:
+    def setUp(self):
+        self.hotel = Hotel.objects.create(name="Test Hotel")
+        self.room = Room.objects.create(hotel=self.hotel, number="101")
+        self.food = Category.objects.create(hotel=self.hotel, name="Mains", kind="FOOD")
+        self.burger = Item.objects.create(hotel=self.hotel, category=self.food, name="Burger", price=100)
+        self.staff = User.objects.create_user("staff", password="pw", role="STAFF", hotel=self.hotel)
+        self.client.force_login(self.staff)
+
+
+class EventBrokerTests(TestCase):
+    def test_publish_fans_out_per_hotel(self):
+        broker = EventBroker()
+        mine, other = broker.subscribe(1), broker.subscribe(2)
+
+        broker.publish(1, {"type": "created"})
+
+        self.assertEqual(mine.get_nowait(), {"type": "created"})
+        self.assertTrue(other.queue.empty())
+
+        broker.unsubscribe(mine)
+        self.assertEqual(broker.subscriber_count(1), 0)
+
+
+class LiveActionPushTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.broker = EventBroker()
+        self._orig_broker, events.broker = events.broker, self.broker
+
+    def tearDown(self):
+        events.broker = self._orig_broker
+
+    def test_accept_pushes_status_event(self):
+        req = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        sub = self.broker.subscribe(self.hotel.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse("live_action", args=[req.id]), {"action": "accept"})
+
+        self.assertEqual(resp.status_code, 200)
+        event = sub.get_nowait()
+        self.assertEqual(event["type"], "status")
+        self.assertEqual(event["request"]["id"], req.id)
+        self.assertEqual(event["request"]["status"], "ACCEPTED")
+
+
+class LivePollDeltaTests(LiveBoardTestMixin, TestCase):
+    def test_delta_since_cursor_and_304(self):
+        first = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        full = self.client.get(reverse("live_poll"))
+        self.assertEqual(full.json()["mode"], "full")
+        self.assertEqual([r["id"] for r in full.json()["new"]], [first.id])
+        cursor, etag = full.json()["cursor"], full["ETag"]
+
+        # nothing changed → 304
+        resp = self.client.get(reverse("live_poll"), {"since": cursor}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        # one new request and one closed one → card + tombstone only
+        second = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        first.mark_cancelled()
+        first.save()
+        resp = self.client.get(reverse("live_poll"), {"since": cursor}, HTTP_IF_NONE_MATCH=etag)
+        data = resp.json()
+        self.assertEqual(data["mode"], "delta")
+        self.assertEqual([r["id"] for r in data["changed"]], [second.id])
+        self.assertEqual(data["removed"], [first.id])
+        self.assertEqual(data["counts"]["cancelled_today"], 1)
+        self.assertNotEqual(data["cursor"], cursor)
+
+    def test_late_commit_behind_the_cursor_is_delivered(self):
+        Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        full = self.client.get(reverse("live_poll"))
+        cursor, etag = full.json()["cursor"], full["ETag"]
+        head_ts, _ = decode_cursor(cursor)
+
+        # a writer stamped updated_at before the board's head but committed after the poll
+        late = Request.objects.create(hotel=self.hotel, room=self.room, kind="SERVICE")
+        Request.objects.filter(id=late.id).update(updated_at=head_ts - timedelta(seconds=1))
+
+        resp = self.client.get(reverse("live_poll"), {"since": cursor}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(late.id, [r["id"] for r in resp.json()["changed"]])
+        self.assertEqual(resp.json()["cursor"], cursor)
+
+        # once the board has it, the same window is a 304 again
+        resp = self.client.get(reverse("live_poll"), {"since": cursor}, HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(resp.status_code, 304)
+
+
+class LiveBoardQueryCountTests(LiveBoardTestMixin, TestCase):
+    """Regression benchmark: board cost must not grow with the number of open requests."""
+
+    SIZES = (10, 100, 1000)
+
+    def setUp(self):
+        super().setUp()
+        self.items = [self.burger] + [
+            Item.objects.create(hotel=self.hotel, category=self.food, name=f"Dish {i}", price=10)
+            for i in range(5)
+        ]
+
+    def _fill_board(self, total):
+        Request.objects.all().delete()
+        reqs = Request.objects.bulk_create(
+            Request(hotel=self.hotel, room=self.room, kind="FOOD",
+                    status="NEW" if i % 2 else "ACCEPTED", subtotal=60)
+            for i in range(total)
+        )
+        RequestLine.objects.bulk_create(
+            RequestLine(request=r, item=it, name_snapshot=it.name,
+                        price_snapshot=it.price, qty=1, line_total=it.price)
+            for r in reqs for it in self.items
+        )
+
+    def _queries_for(self, url_name):
+        counts = {}
+        for total in self.SIZES:
+            self._fill_board(total)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(reverse(url_name))
+            self.assertEqual(resp.status_code, 200)
+            counts[total] = len(ctx)
+        return counts
+
+    def test_live_board_constant_queries(self):
+        counts = self._queries_for("live_board")
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_live_poll_constant_queries(self):
+        counts = self._queries_for("live_poll")
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_card_preview_capped_at_four_lines(self):
+        self._fill_board(2)
+        data = self.client.get(reverse("live_poll")).json()
+        self.assertEqual(len(data["new"][0]["lines"]), 4)
+
+
+class DailyCounterTests(LiveBoardTestMixin, TestCase):
+    def test_transitions_bump_hotel_local_counters(self):
+        self.hotel.timezone = "Asia/Kolkata"
+        self.hotel.save()
+        req = Request.objects.create(hotel=self.hotel, room=self.room, kind="SERVICE")
+        for action in ("accept", "complete"):
+            self.client.post(reverse("live_action", args=[req.id]), {"action": action})
+
+        today = self.hotel.localdate()
+        self.assertEqual(
+            DailyRequestCounter.objects.get(hotel=self.hotel, day=today, kind="SERVICE", status="COMPLETED").count, 1
+        )
+        counts = self.client.get(reverse("live_poll")).json()["counts"]
+        self.assertEqual(counts, {"completed_today": 1, "cancelled_today": 0})
+
+    def test_status_saved_outside_live_action_is_counted_once(self):
+        req = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        req = Request.objects.get(pk=req.pk)  # as the admin loads it
+        req.mark_cancelled()
+        req.save()
+        req.note = "guest left"
+        req.save()
+        Request.objects.get(pk=req.pk).save(update_fields=["note"])
+
+        counts = self.client.get(reverse("live_poll")).json()["counts"]
+        self.assertEqual(counts, {"completed_today": 0, "cancelled_today": 1})
+
+    def test_recount_rebuilds_from_request_timestamps(self):
+        req = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        for action in ("accept", "complete"):
+            self.client.post(reverse("live_action", args=[req.id]), {"action": action})
+        yesterday = timezone.now() - timedelta(days=1)
+        # written without save(), so the counters never saw it
+        Request.objects.filter(pk=req.pk).update(completed_at=yesterday)
+        DailyRequestCounter.objects.filter(hotel=self.hotel, status="ACCEPTED").update(count=7)
+
+        DailyRequestCounter.recount(self.hotel.id)
+
+        cells = set(DailyRequestCounter.objects.filter(hotel=self.hotel).values_list("day", "status", "count"))
+        self.assertEqual(cells, {
+            (self.hotel.localdate(), "ACCEPTED", 1),
+            (self.hotel.localdate(yesterday), "COMPLETED", 1),
+        })
+
+    def test_close_duplicate_services_cancels_and_recounts(self):
+        towels = Item.objects.create(
+            hotel=self.hotel, name="Towels", price=0,
+            category=Category.objects.create(hotel=self.hotel, name="Housekeeping", kind="SERVICE"),
+        )
+        with connection.cursor() as cur:  # a database from before migration 0011
+            cur.execute("DROP INDEX uniq_open_service_request_per_room")
+        keep, dupe = (
+            Request.objects.create(hotel=self.hotel, room=self.room, kind="SERVICE", service_item=towels)
+            for _ in range(2)
+        )
+
+        out = StringIO()
+        call_command("close_duplicate_services", "--dry-run", stdout=out)
+        self.assertIn(f"request(s): {dupe.id}", out.getvalue())
+        self.assertEqual(Request.objects.filter(status="NEW").count(), 2)
+
+        call_command("close_duplicate_services", stdout=StringIO())
+        self.assertEqual(Request.objects.get(pk=keep.pk).status, "NEW")
+        self.assertEqual(Request.objects.get(pk=dupe.pk).status, "CANCELLED")
+        self.assertEqual(OpenRequestStats.objects.get(hotel=self.hotel).new_count, 1)
+        counts = self.client.get(reverse("live_poll")).json()["counts"]
+        self.assertEqual(counts, {"completed_today": 0, "cancelled_today": 1})
+
+
+class RequestHistoryTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.towels = Item.objects.create(
+            hotel=self.hotel, name="Towels", price=0,
+            category=Category.objects.create(hotel=self.hotel, name="Housekeeping", kind="SERVICE"),
+        )
+        now = timezone.now()
+        reqs = Request.objects.bulk_create(
+            Request(hotel=self.hotel, room=self.room, kind="FOOD" if i % 4 else "SERVICE",
+                    service_item=None if i % 4 else self.towels, status="COMPLETED", subtotal=100)
+            for i in range(130)
+        )
+        for i, r in enumerate(reqs):
+            r.created_at = now - timedelta(minutes=i // 3)  # ties every three rows
+        Request.objects.bulk_update(reqs, ["created_at"])
+        RequestLine.objects.bulk_create(
+            RequestLine(request=r, item=self.burger, name_snapshot="Burger",
+                        price_snapshot=100, qty=1, line_total=100)
+            for r in reqs if r.kind == "FOOD"
+        )
+        self.newest_first = list(Request.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def page(self, **params):
+        resp = self.client.get(reverse("portal_requests_history"), params)
+        self.assertEqual(resp.status_code, 200)
+        return [r.id for r in resp.context["rows"]], resp.context["older"], resp.context["newer"]
+
+    def test_cursor_pages_match_the_full_ordering(self):
+        size = views_history.PAGE_SIZE
+        rows, older, newer = self.page()
+        self.assertEqual(rows, self.newest_first[:size])
+        self.assertIsNone(newer)
+
+        pages = [rows]
+        while older:
+            rows, older, newer = self.page(after=older)
+            pages.append(rows)
+        self.assertEqual(pages, [self.newest_first[i:i + size] for i in range(0, 130, size)])
+
+        # and back: "newer" from page 3 is page 2 again
+        _, _, newer = self.page(after=self.page(after=self.page()[1])[1])
+        self.assertEqual(self.page(before=newer)[0], pages[1])
+
+    def test_filters_apply_to_page_and_export(self):
+        services = Request.objects.filter(kind="SERVICE").order_by("-created_at", "-id")
+        rows, _, _ = self.page(kind="SERVICE")
+        self.assertEqual(rows, list(services.values_list("id", flat=True)))
+        self.assertEqual(len(rows), 33)
+
+        resp = self.client.get(reverse("portal_requests_export"), {"format": "jsonl", "kind": "SERVICE"})
+        records = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+        self.assertEqual([r["request_id"] for r in records], rows)
+        self.assertTrue(all(r["kind"] == "SERVICE" and r["lines"] == [] for r in records))
+
+    def test_csv_export_has_one_row_per_food_line(self):
+        resp = self.client.get(reverse("portal_requests_export"), {"format": "csv", "kind": "FOOD"})
+        self.assertEqual(resp["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual(len(rows), 97)
+        newest_food = Request.objects.filter(kind="FOOD").order_by("-created_at", "-id").first()
+        self.assertEqual(rows[0]["request_id"], str(newest_food.id))
+        self.assertEqual((rows[0]["item"], rows[0]["qty"], rows[0]["line_total"]), ("Burger", "1", "100.00"))
+
+    def test_invalid_filter_shows_errors_and_no_rows(self):
+        params = {"date_from": "2026-10-10", "date_to": "2026-10-01"}
+        resp = self.client.get(reverse("portal_requests_history"), params)
+        self.assertEqual(list(resp.context["rows"]), [])
+        self.assertIn("date_to", resp.context["form"].errors)
+
+        resp = self.client.get(reverse("portal_requests_export"), {**params, "format": "csv"})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(reverse("portal_requests_export"), {"kind": "PIZZA"})
+        self.assertEqual(resp.status_code, 400)
+
+
+class TempMediaMixin:
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.hotel = Hotel.objects.create(name="Test Hotel")
+
+    @staticmethod
+    def _png(size, color=(200, 30, 30, 128)):
+        buf = BytesIO()
+        Image.new("RGBA", size, color).save(buf, "PNG")
+        return buf.getvalue()
+
+    def _upload(self, size):
+        return ImageAsset.objects.create(
+            hotel=self.hotel, name="Photo", file=SimpleUploadedFile("photo.png", self._png(size))
+        )
+
+
+class ImageVariantTests(TempMediaMixin, TestCase):
+    def test_variants_are_scheduled_after_commit_and_never_upscale(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            asset = self._upload((800, 600))
+        self.assertEqual(len(callbacks), 1)  # rendering is queued, not done inline
+        self.assertEqual(srcset(asset, "webp"), "")
+
+        manifest = build_variants(asset)
+
+        self.assertEqual(sorted(manifest["webp"], key=int), ["320", "640", "800"])
+        self.assertEqual(
+            srcset(asset, "webp"),
+            ", ".join(f"/media/item_photos/variants/{asset.content_hash}-png-{w}w.webp {w}w"
+                      for w in (320, 640, 800)),
+        )
+        with Image.open(f"{self.media}/{manifest['jpeg']['320']}") as img:
+            self.assertEqual(img.size, (320, 240))
+
+
+class PhotoDedupeTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.mains = Category.objects.create(hotel=self.hotel, name="Mains", kind="FOOD")
+        admin = User.objects.create_user("owner", password="pw", role="HOTEL_ADMIN", hotel=self.hotel)
+        self.client.force_login(admin)
+
+    def _create_item(self, name, photo):
+        return self.client.post(reverse("item_create"), {
+            "category": self.mains.id, "name": name, "price": "10", "position": 0, "is_available": "on",
+            "image_upload": SimpleUploadedFile("upload.png", photo, content_type="image/png"),
+        })
+
+    def test_identical_upload_reuses_hotel_asset(self):
+        photo = self._png((40, 30))
+        self.assertEqual(self._create_item("Burger", photo).status_code, 302)
+        self.assertEqual(self._create_item("Double burger", photo).status_code, 302)
+
+        asset = ImageAsset.objects.get()
+        self.assertEqual(asset.file.name, f"item_photos/{asset.content_hash[:2]}/{asset.content_hash}.png")
+        self.assertEqual(set(Item.objects.values_list("image_id", flat=True)), {asset.id})
+
+    def test_command_merges_legacy_duplicates(self):
+        a = self._upload((40, 30))
+        b = ImageAsset.objects.create(hotel=self.hotel, name="Copy")
+        ImageAsset.objects.filter(id=b.id).update(file="item_photos/copy.png")  # pre-hashing row
+        with open(f"{self.media}/item_photos/copy.png", "wb") as fh:
+            fh.write(self._png((40, 30)))
+        item = Item.objects.create(hotel=self.hotel, category=self.mains, name="Fries", image=b)
+
+        out = StringIO()
+        call_command("dedupe_image_assets", stdout=out)
+
+        item.refresh_from_db()
+        self.assertEqual(item.image_id, a.id)
+        self.assertFalse(ImageAsset.objects.filter(id=b.id).exists())
+        self.assertIn(f"reclaimed {len(self._png((40, 30)))} bytes", out.getvalue())
+
+
+class RoomQrTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_sheet_is_rendered_server_side_and_cached(self):
+        first = self.client.get(reverse("rooms_qr_sheet"))
+        self.assertContains(first, "<svg")
+        self.assertNotContains(first, "qrcode.min.js")
+
+        with mock.patch("hotelportal.qr.render_qr_svg", side_effect=AssertionError("cache miss")):
+            again = self.client.get(reverse("rooms_qr_sheet"))
+        self.assertEqual(again.content, first.content)
+
+    def test_cache_key_follows_site_url(self):
+        self.client.get(reverse("room_qr", args=[self.room.id, "svg"]))
+        with self.settings(SITE_URL="https://scan.example.com"), \
+                mock.patch("hotelportal.qr.render_qr_svg", return_value="<svg/>") as render:
+            self.client.get(reverse("room_qr", args=[self.room.id, "svg"]))
+        render.assert_called_once_with(f"https://scan.example.com/q/{self.room.short_code}", None)
+
+    def test_bulk_downloads(self):
+        pdf = self.client.get(reverse("rooms_qr_download", args=["pdf"]))
+        self.assertEqual(pdf["Content-Type"], "application/pdf")
+        self.assertTrue(pdf.content.startswith(b"%PDF"))
+
+        zipped = self.client.get(reverse("rooms_qr_download", args=["zip"]))
+        with zipfile.ZipFile(BytesIO(zipped.content)) as zf:
+            self.assertEqual(zf.namelist(), ["room-101.png"])
+
+    def test_platform_admin_without_hotel_gets_empty_outputs(self):
+        admin = User.objects.create_user("platform", password="pw", role="PLATFORM_ADMIN")
+        self.client.force_login(admin)
+
+        sheet = self.client.get(reverse("rooms_qr_sheet"))
+        self.assertEqual(sheet.status_code, 200)
+        self.assertNotContains(sheet, "<svg")
+        pdf = self.client.get(reverse("rooms_qr_download", args=["pdf"]))
+        self.assertTrue(pdf.content.startswith(b"%PDF"))
+        zipped = self.client.get(reverse("rooms_qr_download", args=["zip"]))
+        with zipfile.ZipFile(BytesIO(zipped.content)) as zf:
+            self.assertEqual(zf.namelist(), [])
+
+    def test_bulk_renders_share_one_pool(self):
+        for n in range(2, 5):
+            Room.objects.create(hotel=self.hotel, number=f"10{n}")
+        rooms = list(Room.objects.filter(hotel=self.hotel))
+        self.addCleanup(setattr, qr, "_pool", None)
+        qr._pool = None
+        with mock.patch.object(qr, "QR_POOL_THRESHOLD", 2), \
+                mock.patch.object(qr, "ProcessPoolExecutor") as executor:
+            executor.return_value.map.side_effect = lambda fn, jobs, chunksize: map(fn, jobs)
+            qr.room_qrs(self.hotel, rooms, "svg")
+            cache.clear()
+            codes = qr.room_qrs(self.hotel, rooms, "svg")
+        executor.assert_called_once()
+        self.assertEqual(executor.return_value.map.call_count, 2)
+        self.assertEqual(sorted(codes), sorted(r.id for r in rooms))
+
+
+class RoomProvisioningTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff.role = "HOTEL_ADMIN"
+        self.staff.save()
+        Room.objects.filter(id=self.room.id).update(floor="1")
+
+    def test_pattern_preview_then_apply(self):
+        data = {"floors": "1-2", "rooms": "01-03", "number_format": "{floor}{room}", "is_active": "on"}
+        preview = self.client.post(reverse("rooms_bulk"), data)
+        self.assertEqual(preview.context["result"].summary(), "5 to create, 1 skipped, 0 conflicts")  # 101 exists as-is
+        self.assertEqual(Room.objects.count(), 1)
+
+        with self.assertNumQueries(7):  # session, user, hotel, existing numbers, one INSERT in a savepoint
+            applied = self.client.post(reverse("rooms_bulk"), {**data, "apply": "1"})
+        self.assertTrue(applied.context["result"].applied)
+        self.assertEqual(
+            sorted(Room.objects.values_list("number", flat=True)), ["101", "102", "103", "201", "202", "203"]
+        )
+
+    def test_csv_command_reports_conflicts(self):
+        path = f"{tempfile.mkdtemp()}/rooms.csv"
+        self.addCleanup(shutil.rmtree, path.rsplit("/", 1)[0])
+        with open(path, "w") as fh:
+            fh.write("number,floor,is_active\n101,2,yes\n301,3,yes\n301,3,no\n302,3,maybe\n")
+
+        out = StringIO()
+        call_command("provision_rooms", self.hotel.id, csv=path, stdout=out)
+
+        self.assertIn("1 created, 0 skipped, 3 conflicts", out.getvalue())
+        self.assertTrue(Room.objects.filter(number="301").exists())
+
+
+class CatalogImportExportTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sides = Category.objects.create(hotel=self.hotel, name="Sides", kind="FOOD", parent=self.food)
+        for n in range(50):
+            Item.objects.create(hotel=self.hotel, category=self.sides, name=f"Side {n}", price=n, position=n)
+
+    def test_export_round_trips_into_another_hotel_in_constant_queries(self):
+        doc = export_catalog(self.hotel)
+        other = Hotel.objects.create(name="Sister Hotel")
+
+        # reads: categories, photos, items; writes (in a savepoint): one INSERT per
+        # category level, one for all items, one catalog version bump, search reindex
+        with self.assertNumQueries(11):
+            diff = import_catalog(other, doc)
+
+        self.assertEqual(diff.summary(), "categories: 2 new, 0 changed, 0 unchanged; items: 51 new, 0 changed, 0 unchanged")
+        self.assertEqual(Item.objects.get(hotel=other, name="Side 7").category.parent.name, "Mains")
+        self.assertEqual(export_catalog(other), doc)
+
+    def test_slash_in_category_name_round_trips(self):
+        drinks = Category.objects.create(hotel=self.hotel, name="Tea/Coffee", kind="FOOD", parent=self.food)
+        Item.objects.create(hotel=self.hotel, category=drinks, name="Masala chai", price=30)
+        other = Hotel.objects.create(name="Sister Hotel")
+
+        for doc in (export_catalog(self.hotel), parse_catalog(catalog_to_csv(export_catalog(self.hotel)), "csv")):
+            import_catalog(other, doc)
+
+        chai = Item.objects.get(hotel=other, name="Masala chai")
+        self.assertEqual((chai.category.name, chai.category.parent.name), ("Tea/Coffee", "Mains"))
+        self.assertFalse(Category.objects.filter(hotel=other, name="Tea").exists())
+        self.assertEqual(export_catalog(other), export_catalog(self.hotel))
+
+    def test_csv_dry_run_reports_changes_and_writes_nothing(self):
+        text = catalog_to_csv(export_catalog(self.hotel)).replace("item,Mains / Sides,Side 3,FOOD,3.00", "item,Mains / Sides,Side 3,FOOD,4.50")
+        text += "item,Mains / Sides,Chips,,60,,,0,yes,\n"  # no kind: "Mains / Sides" is only FOOD
+        version = Hotel.objects.get(id=self.hotel.id).catalog_version
+
+        diff = import_catalog(self.hotel, parse_catalog(text, "csv"), dry_run=True)
+
+        self.assertEqual(diff.items_created, ["Mains / Sides / Chips"])
+        self.assertEqual(diff.items_updated, ["Mains / Sides / Side 3"])
+        self.assertFalse(Item.objects.filter(name="Chips").exists())
+        self.assertEqual(Hotel.objects.get(id=self.hotel.id).catalog_version, version)
+
+    def test_invalid_row_aborts_whole_import(self):
+        doc = {"categories": [{"path": "Drinks", "kind": "FOOD"}],
+               "items": [{"category": "Drinks", "name": "Tea", "price": "20"},
+                         {"category": "Nowhere", "name": "Ghost", "price": "1"}]}
+
+        diff = import_catalog(self.hotel, doc)
+
+        self.assertFalse(diff.applied)
+        self.assertEqual(diff.errors, ["item #2: category Nowhere not found"])
+        self.assertFalse(Category.objects.filter(name="Drinks").exists())
+
+    def test_food_and_service_categories_may_share_a_name(self):
+        extras = Category.objects.create(hotel=self.hotel, name="Extras", kind="FOOD")
+        Item.objects.create(hotel=self.hotel, category=extras, name="Cheese", price=20)
+        extras_svc = Category.objects.create(hotel=self.hotel, name="Extras", kind="SERVICE")
+        Item.objects.create(hotel=self.hotel, category=extras_svc, name="Late checkout", price=0)
+        other = Hotel.objects.create(name="Sister Hotel")
+
+        for doc in (export_catalog(self.hotel), parse_catalog(catalog_to_csv(export_catalog(self.hotel)), "csv")):
+            self.assertEqual(import_catalog(other, doc).errors, [])
+
+        self.assertEqual(Item.objects.get(hotel=other, name="Cheese").category.kind, "FOOD")
+        self.assertEqual(Item.objects.get(hotel=other, name="Late checkout").category.kind, "SERVICE")
+        self.assertEqual(export_catalog(other), export_catalog(self.hotel))
+        diff = import_catalog(other, {"categories": [], "items": [{"category": "Extras", "name": "Soap"}]})
+        self.assertEqual(diff.errors, ["item #1: Extras exists as FOOD and SERVICE; give a kind"])
+
+    def test_export_needs_a_hotel(self):
+        platform = User.objects.create_user("platform", password="pw", role="PLATFORM_ADMIN")
+        self.client.force_login(platform)
+
+        self.assertEqual(self.client.get(reverse("catalog_export")).status_code, 403)
+        self.assertEqual(self.client.get(reverse("catalog_import")).status_code, 403)
+
+
+class ReorderTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user("admin", password="pw", role="HOTEL_ADMIN", hotel=self.hotel)
+        self.client.force_login(self.admin)
+        self.items = [self.burger] + [
+            Item.objects.create(hotel=self.hotel, category=self.food, name=f"Dish {n}", price=n, position=n + 1)
+            for n in range(59)
+        ]
+
+    def post(self, name, body):
+        return self.client.post(reverse(name), data=body, content_type="application/json")
+
+    def test_items_reordered_in_one_update_and_catalog_bumped(self):
+        ids = [it.id for it in reversed(self.items)]
+        version = Hotel.objects.get(id=self.hotel.id).catalog_version
+
+        # session, user, hotel; one sibling read; savepoint, one UPDATE … CASE, version bump, release
+        with self.assertNumQueries(8):
+            resp = self.post("items_reorder", {"category": self.food.id, "ids": ids})
+
+        self.assertEqual(resp.json(), {"ok": True, "updated": 60})
+        self.assertEqual(list(Item.objects.filter(category=self.food).values_list("id", flat=True)), ids)
+        self.assertEqual(Hotel.objects.get(id=self.hotel.id).catalog_version, version + 1)
+
+    def test_other_hotels_ids_and_stale_lists_are_rejected(self):
+        other = Hotel.objects.create(name="Other Hotel")
+        cat = Category.objects.create(hotel=other, name="Mains", kind="FOOD")
+        stranger = Item.objects.create(hotel=other, category=cat, name="Steak", price=1)
+        ids = [it.id for it in self.items]
+
+        resp = self.post("items_reorder", {"category": self.food.id, "ids": ids + [stranger.id]})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.post("items_reorder", {"category": self.food.id, "ids": ids[1:]})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.post("items_reorder", {"category": cat.id, "ids": [stranger.id]})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Item.objects.get(id=stranger.id).position, 0)
+
+    def test_staff_cannot_reorder(self):
+        self.client.force_login(self.staff)
+        ids = [it.id for it in reversed(self.items)]
+
+        resp = self.post("items_reorder", {"category": self.food.id, "ids": ids})
+        self.assertEqual(resp.status_code, 403)
+        resp = self.post("categories_reorder", {"parent": None, "kind": "FOOD", "ids": [self.food.id]})
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(Item.objects.get(id=self.burger.id).position, 0)
+
+    def test_top_level_categories_grouped_by_kind(self):
+        drinks = Category.objects.create(hotel=self.hotel, name="Drinks", kind="FOOD", position=1)
+        Category.objects.create(hotel=self.hotel, name="Laundry", kind="SERVICE")
+
+        resp = self.post("categories_reorder", {"parent": None, "kind": "FOOD", "ids": [drinks.id, self.food.id]})
+
+        self.assertEqual(resp.json(), {"ok": True, "updated": 2})
+        self.assertEqual(
+            list(Category.objects.filter(kind="FOOD").values_list("name", flat=True)), ["Drinks", "Mains"]
+        )
+        resp = self.post("categories_reorder", {"parent": None, "ids": [drinks.id, self.food.id]})
+        self.assertEqual(resp.status_code, 400)
+
+
+class PlatformOverviewTests(LiveBoardTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Hotel.objects.create(name="Other Hotel")
+        self.other_room = Room.objects.create(hotel=self.other, number="1")
+        self.platform = User.objects.create_user("platform", password="pw", role="PLATFORM_ADMIN")
+
+    def open_request(self, hotel, room, minutes_ago=0):
+        req = Request.objects.create(hotel=hotel, room=room, kind="FOOD")
+        if minutes_ago:
+            Request.objects.filter(id=req.id).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+            req.refresh_from_db()
+            OpenRequestStats.refresh(hotel.id)  # .update() bypasses save()
+        return req
+
+    def test_rollup_follows_transitions(self):
+        oldest = self.open_request(self.hotel, self.room, minutes_ago=30)
+        newer = self.open_request(self.hotel, self.room, minutes_ago=5)
+
+        self.client.post(reverse("live_action", args=[oldest.id]), {"action": "accept"})
+        stats = OpenRequestStats.objects.get(hotel=self.hotel)
+        self.assertEqual((stats.new_count, stats.accepted_count, stats.oldest_open_at), (1, 1, oldest.created_at))
+
+        self.client.post(reverse("live_action", args=[oldest.id]), {"action": "complete"})
+        stats.refresh_from_db()
+        self.assertEqual((stats.new_count, stats.accepted_count, stats.oldest_open_at), (1, 0, newer.created_at))
+
+    @override_settings(REQUEST_SLA_MINUTES=15)
+    def test_overview_reads_rollup_not_requests(self):
+        for minutes in (40, 20, 1):
+            self.open_request(self.hotel, self.room, minutes_ago=minutes)
+        self.open_request(self.other, self.other_room, minutes_ago=2)
+        self.client.force_login(self.platform)
+
+        # session, user, one row per hotel, breach count for the one late hotel
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse("live_overview"), {"format": "json"}).json()
+
+        self.assertEqual(data["sla_minutes"], 15)
+        self.assertEqual(
+            [(h["hotel"], h["new"], h["breaches"]) for h in data["hotels"]],
+            [("Test Hotel", 3, 2), ("Other Hotel", 1, 0)],
+        )
+        self.assertGreaterEqual(data["hotels"][0]["oldest_wait_seconds"], 40 * 60)
+
+    def test_saves_outside_the_views_keep_the_rollup(self):
+        first = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        second = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        first = Request.objects.get(pk=first.pk)  # as the admin loads it
+        first.mark_accepted()
+        first.save()
+        second.mark_cancelled()
+        second.save()
+        Request.objects.only("id", "note").get(pk=first.pk).save(update_fields=["note"])
+
+        stats = OpenRequestStats.objects.get(hotel=self.hotel)
+        self.assertEqual((stats.new_count, stats.accepted_count, stats.oldest_open_at), (0, 1, first.created_at))
+        Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD", status="COMPLETED")
+        stats.refresh_from_db()
+        self.assertEqual((stats.new_count, stats.accepted_count), (0, 1))
+
+    def test_platform_admin_board_needs_a_hotel(self):
+        self.client.force_login(self.platform)
+        self.assertRedirects(self.client.get(reverse("live_board")), reverse("live_overview"))
+        self.assertEqual(self.client.get(reverse("live_poll")).status_code, 403)
+        self.assertEqual(self.client.get(reverse("live_stream")).status_code, 403)
+        # the test client is WSGI: no endless stream, the board falls back to polling
+        self.assertEqual(self.client.get(reverse("live_stream"), {"hotel": self.other.id}).status_code, 204)
+
+        req = self.open_request(self.other, self.other_room)
+        data = self.client.get(reverse("live_poll"), {"hotel": self.other.id}).json()
+        self.assertEqual([r["id"] for r in data["new"]], [req.id])
+        self.assertContains(self.client.get(reverse("live_board"), {"hotel": self.other.id}), "Other Hotel")
+        self.assertEqual(self.client.get(reverse("live_overview")).status_code, 200)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse("live_overview")).status_code, 403)
+
+
+# the command swaps in (and afterwards drops) its own scratch database, which
+# can't happen inside a TestCase transaction
+class BenchRushTests(TransactionTestCase):
+    @override_settings(DEBUG=False)  # the command flips settings for its run
+    def test_tiny_rush_runs_and_saves_results(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        test_db = connection.settings_dict["NAME"]
+
+        call_command("bench_rush", guests=1, staff=1, seconds=0.5, rooms=3, items=3, services=1,
+                     out=f"{tmp}/rush.json", stdout=StringIO())
+
+        with open(f"{tmp}/rush.json", encoding="utf-8") as fh:
+            result = json.load(fh)
+        self.assertEqual(result["config"]["rooms"], 3)
+        self.assertGreater(result["endpoints"]["room_view"]["requests"], 0)
+        self.assertIn("live_poll", result["endpoints"])
+        self.assertFalse(any(e["server_errors"] for e in result["endpoints"].values()))
+        # back on the suite's database afterwards
+        self.assertEqual(connection.settings_dict["NAME"], test_db)
+        self.assertFalse(Hotel.objects.filter(name="Rush Hotel").exists())
+
+
+# the test "replica" mirrors the in-memory default, which routing treats as "no
+# replica"; force it on. It is a second connection, so no TestCase transaction
+# (that would hold table locks against it).
+@mock.patch("scan2service.routers.replica_alias", lambda: "replica")
+class ReadReplicaRoutingTests(LiveBoardTestMixin, TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def poll_queries(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            self.client.get(reverse("live_poll"))
+        return len(replica)
+
+    def test_reads_go_to_replica_until_the_client_writes(self):
+        req = Request.objects.create(hotel=self.hotel, room=self.room, kind="FOOD")
+        self.assertGreater(self.poll_queries(), 0)
+
+        resp = self.client.post(reverse("live_action", args=[req.id]), {"action": "accept"})
+        self.assertIn(PIN_COOKIE, resp.cookies)  # read-your-writes: pinned to the primary
+        self.assertEqual(self.poll_queries(), 0)
+
+        self.client.cookies.pop(PIN_COOKIE)
+        self.assertGreater(self.poll_queries(), 0)
+
+    def test_guest_room_page_stays_on_the_primary(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            resp = self.client.get(reverse("guest_room", args=[self.hotel.id, self.room.id]))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(replica), 0)
+
+    def test_sync_replica_copies_primary_file(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        primary, replica = f"{tmp}/primary.sqlite3", f"{tmp}/replica.sqlite3"
+        with sqlite3.connect(primary) as db:
+            db.execute("CREATE TABLE t (v)")
+            db.execute("INSERT INTO t VALUES (1)")
+
+        SyncReplicaCommand.copy(primary, replica)
+
+        with sqlite3.connect(replica) as db:
+            self.assertEqual(db.execute("SELECT v FROM t").fetchall(), [(1,)])
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_generates_catalog_history_and_rollups(self):
+        out = StringIO()
+        call_command(
+            "generate_dataset", hotels=2, rooms=12, depth=3, fanout=2, items=40, services=4, images=5,
+            requests=250, days=30, chunk=100, stdout=out,
+        )
+        self.assertIn("500 requests", out.getvalue())
+        hotel = Hotel.objects.order_by("id").first()
+
+        self.assertEqual(Room.objects.filter(hotel=hotel).count(), 12)
+        self.assertTrue(Category.objects.filter(hotel=hotel, parent__parent__isnull=False).exists())
+        self.assertTrue(Item.objects.filter(hotel=hotel, image__isnull=False).exists())
+        self.assertTrue(search.search_items(hotel.id, Item.objects.filter(hotel=hotel, is_available=True)[0].name))
+
+        reqs = Request.objects.filter(hotel=hotel)
+        self.assertEqual(reqs.count(), 250)
+        now = timezone.now()
+        self.assertFalse(reqs.filter(created_at__gte=now).exists())
+        self.assertFalse(reqs.filter(created_at__lt=now - timedelta(days=32)).exists())
+        food = reqs.filter(kind="FOOD").first()
+        self.assertEqual(food.subtotal, sum(ln.line_total for ln in food.lines.all()))
+        self.assertTrue(reqs.filter(kind="SERVICE", service_item__isnull=False).exists())
+
+        completed = DailyRequestCounter.objects.filter(hotel=hotel, status="COMPLETED").aggregate(n=Sum("count"))["n"]
+        self.assertEqual(completed, reqs.filter(status="COMPLETED").count())
+        self.assertEqual(hotel.open_stats.open_count, 0)
+
+        # explicit ids left the sequence usable for normal inserts
+        room = Room.objects.filter(hotel=hotel).first()
+        fresh = Request.objects.create(hotel=hotel, room=room, kind="FOOD")
+        self.assertGreater(fresh.id, Request.objects.exclude(id=fresh.id).order_by("-id")[0].id)
+
+
+class MetricsTests(LiveBoardTestMixin, TestCase):
+    def test_records_per_view_and_serves_prometheus_text(self):
+        before = metrics.snapshot()
+        self.client.get(reverse("live_board"))
+        self.client.get(reverse("live_poll"))
+        after = metrics.snapshot()
+
+        board, previous = after["live_board"], before.get("live_board", [0] * len(after["live_board"]))
+        self.assertEqual(board[metrics.COUNT] - previous[metrics.COUNT], 1)
+        self.assertGreater(board[metrics.QUERIES], previous[metrics.QUERIES])
+        self.assertGreater(board[metrics.TEMPLATE_SECONDS], previous[metrics.TEMPLATE_SECONDS])
+        self.assertGreater(after["live_poll"][metrics.DB_SECONDS], 0)
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)  # hotel staff
+
+        admin = User.objects.create_user("ops", password="pw", role="PLATFORM_ADMIN")
+        self.client.force_login(admin)
+        resp = self.client.get(reverse("metrics"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = resp.content.decode()
+        self.assertIn('scan2service_view_requests_total{view="live_poll"}', body)
+        self.assertIn('scan2service_view_duration_seconds_bucket{view="live_board",le="+Inf"}', body)
+        self.assertIn("# TYPE scan2service_view_db_queries_total counter", body)
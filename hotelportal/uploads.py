@@ -0,0 +1,81 @@
+# Content-addressed item photos.
+#
+# Every photo is stored as item_photos/<aa>/<sha256><ext>, so identical bytes
+# land on the same file no matter how often (or by which hotel) they're
+# uploaded. Within a hotel an identical upload reuses the existing ImageAsset
+# instead of creating another row.
+#
+# HashingUploadHandler sits first in FILE_UPLOAD_HANDLERS and hashes each file
+# as its chunks stream in, so the form never re-reads the upload to hash it.
+
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+
+HASH_CHUNK = 64 * 1024
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Pass-through handler: hashes each uploaded file chunk by chunk and leaves
+    the digests on request.upload_digests[field_name]. The following handlers
+    (memory/temp file) still build the UploadedFile as usual.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, "upload_digests"):
+            self.request.upload_digests = {}
+        self.request.upload_digests[self.field_name] = self._hasher.hexdigest()
+        return None  # let the next handler return the file
+
+
+def sha256_of(fileobj):
+    """Hash a file (uploaded or stored) without loading it all into memory."""
+    hasher = hashlib.sha256()
+    if hasattr(fileobj, "chunks"):
+        for chunk in fileobj.chunks(HASH_CHUNK):
+            hasher.update(chunk)
+    else:
+        for chunk in iter(lambda: fileobj.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    return hasher.hexdigest()
+
+
+def content_path(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return f"item_photos/{digest[:2]}/{digest}{ext}"
+
+
+def asset_for_upload(hotel, name, upload, digest=None):
+    """
+    Return the hotel's ImageAsset for these bytes, creating it if needed.
+    `digest` is the streamed hash from HashingUploadHandler when available.
+    """
+    from .models import ImageAsset
+
+    digest = digest or sha256_of(upload)
+    existing = ImageAsset.objects.filter(hotel=hotel, content_hash=digest).order_by("id").first()
+    if existing is not None:
+        return existing
+
+    asset = ImageAsset(hotel=hotel, name=name, content_hash=digest)
+    path = content_path(digest, upload.name)
+    if default_storage.exists(path):
+        asset.file.name = path  # same bytes already on disk (another hotel) → share the file
+    else:
+        upload.content_hash = digest  # picked up by ImageAsset.save, no second read
+        asset.file = upload
+    asset.save()
+    return asset
@@ -2,6 +2,7 @@ from django.urls import path
 from . import views
 from django.urls import path
 from . import views_live  # NEW file below
+from . import views_history
 
 
 
@@ -15,17 +16,24 @@ urlpatterns = [
      # rooms (Day 3.1)
     path("rooms/", views.rooms_list, name="rooms_list"),
     path("rooms/add/", views.room_create, name="room_create"),
+    path("rooms/bulk/", views.rooms_bulk, name="rooms_bulk"),
     path("rooms/<int:pk>/edit/", views.room_edit, name="room_edit"),
     path("rooms/<int:pk>/delete/", views.room_delete, name="room_delete"),
     path("rooms/qr/print/", views.rooms_qr_sheet, name="rooms_qr_sheet"),
+    path("rooms/qr/download.<str:fmt>", views.rooms_qr_download, name="rooms_qr_download"),
+    path("rooms/<int:pk>/qr.<str:fmt>", views.room_qr, name="room_qr"),
     # 3.3C — Settings route
     path("settings/", views.portal_settings, name="portal_settings"),
     # 4.2C — Catalog routes
     path("settings/categories/", views.categories_list, name="categories_list"),
     path("settings/categories/add/", views.category_create, name="category_create"),
+    path("settings/categories/reorder/", views.categories_reorder, name="categories_reorder"),
     path("settings/categories/<int:pk>/edit/", views.category_edit, name="category_edit"),
     path("settings/categories/<int:pk>/delete/", views.category_delete, name="category_delete"),
     path("settings/items/", views.items_list, name="items_list"),
+    path("settings/menu/export/", views.catalog_export, name="catalog_export"),
+    path("settings/menu/import/", views.catalog_import, name="catalog_import"),
+    path("settings/items/reorder/", views.items_reorder, name="items_reorder"),
     path("settings/items/add/", views.item_create, name="item_create"),
     path("settings/items/<int:pk>/edit/", views.item_edit, name="item_edit"),
     path("settings/items/<int:pk>/delete/", views.item_delete, name="item_delete"),
@@ -33,12 +41,16 @@ urlpatterns = [
 
     # --- Live Board (relative paths; project urls.py prefixes with 'portal/') ---
     path("live/", views_live.live_board, name="live_board"),
+    path("live/overview/", views_live.live_overview, name="live_overview"),
+    path("metrics/", views_live.metrics, name="metrics"),
     path("live/poll/", views_live.live_poll, name="live_poll"),
+    path("live/stream/", views_live.live_stream, name="live_stream"),
     path("live/<int:request_id>/action/", views_live.live_action, name="live_action"),
     path("live/<int:request_id>/detail/", views_live.live_detail, name="live_detail"),
 
-    # History page (stub for now)
-    path("requests/history/", views_live.history_stub, name="portal_requests_history"),
+    # History page + streaming export
+    path("requests/history/", views_history.requests_history, name="portal_requests_history"),
+    path("requests/history/export/", views_history.requests_export, name="portal_requests_export"),
 
 ]
 
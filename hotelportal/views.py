@@ -6,13 +6,22 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from website.forms import StaffCreateForm
 from .models import Room
-from .forms import RoomForm
+from .forms import RoomBulkForm, RoomForm
+from .provisioning import PatternError, expand_pattern, parse_csv, provision_rooms
 from django.views.decorators.http import require_POST
 from django.conf import settings
 from django.db.models import Prefetch
-from .forms import CategoryForm, ItemForm
+from .forms import CatalogImportForm, CategoryForm, ItemForm
+from .catalog_io import CatalogFormatError, catalog_to_csv, export_catalog, import_catalog, parse_catalog
+from .ordering import ReorderError, reorder_categories, reorder_items
+import json
 from .models import Category, Item, ImageAsset
 from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from io import BytesIO
+import zipfile
+from . import qr
+from .qr import room_qrs
 
 
 
@@ -91,6 +100,36 @@ def room_create(request):
     return render(request, "hotelportal/room_form.html", {"form": form, "mode": "create"})
 
 
+@login_required
+def rooms_bulk(request):
+    """Add many rooms at once from a floor × room pattern or a CSV; preview, then apply."""
+    if not _is_portal_user(request.user):
+        return HttpResponseForbidden("Only hotel admins can add rooms.")
+    hotel = request.user.hotel
+    result = None
+    if request.method == "POST":
+        form = RoomBulkForm(request.POST, request.FILES)
+        if form.is_valid():
+            cd = form.cleaned_data
+            try:
+                if cd["csv_text"]:
+                    specs, bad = parse_csv(cd["csv_text"])
+                else:
+                    specs, bad = expand_pattern(cd["floors"], cd["rooms"], cd["number_format"], cd["is_active"]), []
+                result = provision_rooms(hotel, specs, dry_run="apply" not in request.POST, extra_conflicts=bad)
+            except PatternError as exc:
+                form.add_error(None, str(exc))
+            except IntegrityError:
+                form.add_error(None, "Rooms changed while importing — nothing was saved, please preview again.")
+            if result is not None and result.applied:
+                messages.success(request, f"Rooms: {result.summary()}.")
+            # keep the CSV for the apply step without re-uploading
+            form = RoomBulkForm(initial={**cd, "csv_file": None}) if result is not None else form
+    else:
+        form = RoomBulkForm()
+    return render(request, "hotelportal/rooms_bulk.html", {"form": form, "result": result})
+
+
 @login_required
 def room_edit(request, pk):
     if not _is_portal_user(request.user):
@@ -123,13 +162,21 @@ def room_delete(request, pk):
     return redirect("rooms_list")
 
 
+def _can_print_qr(user):
+    # allow HOTEL_ADMIN, STAFF, PLATFORM_ADMIN to print
+    return getattr(user, "role", None) in ("HOTEL_ADMIN", "STAFF", "PLATFORM_ADMIN")
+
+
 @login_required
 def rooms_qr_sheet(request):
-    # allow HOTEL_ADMIN, STAFF, PLATFORM_ADMIN to print
-    if getattr(request.user, "role", None) not in ("HOTEL_ADMIN", "STAFF", "PLATFORM_ADMIN"):
+    if not _can_print_qr(request.user):
         return HttpResponseForbidden("Not allowed.")
     hotel = request.user.hotel
-    rooms = Room.objects.filter(hotel=hotel, is_active=True).order_by("floor", "number")
+    rooms = list(Room.objects.filter(hotel=hotel, is_active=True).order_by("floor", "number"))
+    # codes are rendered here (cached per URL + logo), no client-side QR library
+    svgs = room_qrs(hotel, rooms, "svg")
+    for r in rooms:
+        r.qr_svg = svgs[r.id]
     context = {
         "hotel": hotel,
         "rooms": rooms,
@@ -138,6 +185,47 @@ def rooms_qr_sheet(request):
     return render(request, "hotelportal/rooms_qr_sheet.html", context)
 
 
+@login_required
+def room_qr(request, pk, fmt):
+    """One room's code as SVG or PNG (download / embed)."""
+    if not _can_print_qr(request.user):
+        return HttpResponseForbidden("Not allowed.")
+    if fmt not in qr.CONTENT_TYPES:
+        raise Http404
+    hotel = request.user.hotel
+    room = get_object_or_404(Room, pk=pk, hotel=hotel)
+    code = room_qrs(hotel, [room], fmt)[room.id]
+    resp = HttpResponse(code, content_type=qr.CONTENT_TYPES[fmt])
+    resp["Cache-Control"] = "private, max-age=3600"
+    if request.GET.get("download"):
+        resp["Content-Disposition"] = f'attachment; filename="room-{room.number}.{fmt}"'
+    return resp
+
+
+@login_required
+def rooms_qr_download(request, fmt):
+    """Every active room's code at once: a ZIP of PNGs or a print-ready A4 PDF."""
+    if not _can_print_qr(request.user):
+        return HttpResponseForbidden("Not allowed.")
+    if fmt not in ("zip", "pdf"):
+        raise Http404
+    hotel = request.user.hotel
+    rooms = list(Room.objects.filter(hotel=hotel, is_active=True).order_by("floor", "number"))
+    pngs = room_qrs(hotel, rooms, "png")
+    if fmt == "pdf":
+        body, content_type = qr.qr_sheet_pdf(hotel, rooms, pngs), "application/pdf"
+    else:
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:  # PNGs are already compressed
+            for r in rooms:
+                zf.writestr(f"room-{r.number}.png", pngs[r.id])
+        body, content_type = buf.getvalue(), "application/zip"
+    resp = HttpResponse(body, content_type=content_type)
+    name = f"room-qr-codes-{hotel.id}" if hotel else "room-qr-codes"
+    resp["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return resp
+
+
 
 
 
@@ -207,7 +295,103 @@ def category_delete(request, pk):
     messages.success(request, "Category deleted.")
     return redirect("categories_list")
 
+def _json_body(request):
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ReorderError("Body must be JSON.")
+    if not isinstance(body, dict):
+        raise ReorderError("Body must be a JSON object.")
+    return body
+
+
+def _optional_id(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ReorderError(f"Bad id {value!r}.")
+
+
+@login_required
+@require_POST
+def categories_reorder(request):
+    """
+    JSON {"parent": id | null, "kind": "FOOD" | "SERVICE", "ids": [...]}:
+    the full new order of one sibling group (kind only for top level).
+    """
+    if not _is_admin(request.user):
+        return HttpResponseForbidden("Only admins can reorder categories.")
+    try:
+        body = _json_body(request)
+        updated = reorder_categories(
+            request.user.hotel, body.get("ids"), parent_id=_optional_id(body.get("parent")), kind=body.get("kind"),
+        )
+    except ReorderError as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    return JsonResponse({"ok": True, "updated": updated})
+
+
+@login_required
+@require_POST
+def items_reorder(request):
+    """JSON {"category": id, "ids": [...]}: the full new order of one category's items."""
+    if not _is_admin(request.user):
+        return HttpResponseForbidden("Only admins can reorder items.")
+    try:
+        body = _json_body(request)
+        category_id = _optional_id(body.get("category"))
+        if category_id is None:
+            raise ReorderError("category is required.")
+        updated = reorder_items(request.user.hotel, category_id, body.get("ids"))
+    except ReorderError as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    return JsonResponse({"ok": True, "updated": updated})
+
 # Items
+@login_required
+def catalog_export(request):
+    if not (_is_admin(request.user) or request.user.role == "STAFF"):
+        return HttpResponseForbidden("Not allowed.")
+    if request.user.hotel is None:  # a platform admin not attached to a hotel
+        return HttpResponseForbidden("No hotel to export.")
+    fmt = "csv" if request.GET.get("format") == "csv" else "json"
+    doc = export_catalog(request.user.hotel)
+    if fmt == "csv":
+        resp = HttpResponse(catalog_to_csv(doc), content_type="text/csv; charset=utf-8")
+    else:
+        resp = HttpResponse(json.dumps(doc, indent=2, ensure_ascii=False), content_type="application/json")
+    resp["Content-Disposition"] = f'attachment; filename="menu-{request.user.hotel.id}.{fmt}"'
+    return resp
+
+
+@login_required
+def catalog_import(request):
+    """Upload a menu file, preview the diff, then apply it in one transaction."""
+    if not _is_admin(request.user):
+        return HttpResponseForbidden("Only admins can import the menu.")
+    if request.user.hotel is None:
+        return HttpResponseForbidden("No hotel to import into.")
+    diff = None
+    if request.method == "POST":
+        form = CatalogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            cd = form.cleaned_data
+            try:
+                doc = parse_catalog(cd["text"], cd["fmt"])
+            except CatalogFormatError as exc:
+                form.add_error(None, str(exc))
+            else:
+                diff = import_catalog(request.user.hotel, doc, dry_run="apply" not in request.POST)
+                if diff.applied:
+                    messages.success(request, f"Menu imported — {diff.summary()}.")
+                form = CatalogImportForm(initial={"text": cd["text"], "fmt": cd["fmt"]})
+    else:
+        form = CatalogImportForm()
+    return render(request, "hotelportal/catalog_import.html", {"form": form, "diff": diff})
+
+
 @login_required
 def items_list(request):
     if not (_is_admin(request.user) or request.user.role == "STAFF"):
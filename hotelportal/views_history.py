@@ -0,0 +1,222 @@
+# Day 6 — Request history: filtered browse with keyset pagination + streaming export.
+#
+# Pages walk the (hotel, created_at) index with a (created_at, id) cursor instead
+# of OFFSET, so page 500 costs the same as page 1. Exports reuse the same keyset
+# walk in batches and stream rows out as they are produced.
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from scan2service.routers import read_replica
+from .forms import HistoryFilterForm
+from .models import Request
+from .cursors import after_cursor, before_cursor, decode_cursor, encode_cursor
+from .views_live import _allow_portal, _hotel_or_403
+
+PAGE_SIZE = 50
+EXPORT_BATCH = 500
+
+EXPORT_COLUMNS = [
+    "request_id", "created_at", "room", "kind", "status", "item", "qty", "price",
+    "line_total", "request_subtotal", "note", "accepted_at", "completed_at", "cancelled_at",
+]
+
+
+def _history_queryset(hotel, form):
+    qs = Request.objects.all()
+    if hotel:
+        qs = qs.filter(hotel=hotel)
+    if not form.is_bound:
+        return qs
+    if not form.is_valid():
+        return qs.none()  # a bad filter shows its errors, never every request
+    f = form.cleaned_data
+    if f["kind"]:
+        qs = qs.filter(kind=f["kind"])
+    if f["status"]:
+        qs = qs.filter(status=f["status"])
+    if f["room"]:
+        qs = qs.filter(room__number=f["room"].strip())
+    # dates are hotel-local days → [local midnight, next local midnight)
+    tz = hotel.tzinfo() if hotel else timezone.get_current_timezone()
+    if f["date_from"]:
+        qs = qs.filter(created_at__gte=datetime.combine(f["date_from"], time.min, tzinfo=tz))
+    if f["date_to"]:
+        qs = qs.filter(created_at__lt=datetime.combine(f["date_to"] + timedelta(days=1), time.min, tzinfo=tz))
+    return qs
+
+
+def _keyset_page(qs, after=None, before=None, size=PAGE_SIZE):
+    """
+    One page, newest first.
+    after  = cursor of the last row already shown → next (older) page
+    before = cursor of the first row already shown → previous (newer) page
+    Returns (rows, older_cursor_or_None, newer_cursor_or_None).
+    """
+    if before:
+        rows = list(
+            qs.filter(after_cursor("created_at", before))
+            .order_by("created_at", "id")[:size + 1]
+        )
+        has_newer = len(rows) > size
+        rows = rows[:size][::-1]
+        has_older = True
+    else:
+        if after:
+            qs = qs.filter(before_cursor("created_at", after))
+        rows = list(qs.order_by("-created_at", "-id")[:size + 1])
+        has_older = len(rows) > size
+        rows = rows[:size]
+        has_newer = after is not None
+
+    older = encode_cursor(rows[-1].created_at, rows[-1].id) if rows and has_older else None
+    newer = encode_cursor(rows[0].created_at, rows[0].id) if rows and has_newer else None
+    return rows, older, newer
+
+
+def _filter_querystring(request):
+    params = request.GET.copy()
+    for key in ("after", "before", "format"):
+        params.pop(key, None)
+    return params.urlencode()
+
+
+@login_required
+@user_passes_test(_allow_portal)
+@read_replica
+def requests_history(request):
+    hotel = _hotel_or_403(request)
+    if not hotel and request.user.role != "PLATFORM_ADMIN":
+        return HttpResponseForbidden("No hotel set")
+
+    form = HistoryFilterForm(request.GET or None)
+    qs = _history_queryset(hotel, form).select_related("room")
+    rows, older, newer = _keyset_page(
+        qs,
+        after=decode_cursor(request.GET.get("after")),
+        before=decode_cursor(request.GET.get("before")),
+    )
+    prefetch_related_objects(rows, "lines")  # one query for the whole page
+
+    ctx = {
+        "form": form,
+        "rows": rows,
+        "older": older,
+        "newer": newer,
+        "filter_qs": _filter_querystring(request),
+        "tz": hotel.tzinfo() if hotel else timezone.get_current_timezone(),  # show hotel time
+    }
+    return render(request, "hotelportal/requests_history.html", ctx)
+
+
+# ---------- export ----------
+
+def _iter_history(qs):
+    """Yield (request, lines) over the whole filtered set, EXPORT_BATCH rows per query."""
+    after = None
+    while True:
+        batch, after, _ = _keyset_page(qs, after=after, size=EXPORT_BATCH)
+        prefetch_related_objects([r for r in batch if r.kind == "FOOD"], "lines")
+        for r in batch:
+            yield r, (list(r.lines.all()) if r.kind == "FOOD" else [])
+        if after is None:
+            return
+        after = decode_cursor(after)
+
+
+def _iso(ts, tz):
+    return timezone.localtime(ts, tz).isoformat() if ts else ""
+
+
+def _export_rows(qs, tz):
+    """Flat rows: one per FOOD line, one per SERVICE request."""
+    for r, lines in _iter_history(qs):
+        base = {
+            "request_id": r.id,
+            "created_at": _iso(r.created_at, tz),
+            "room": r.room.number,
+            "kind": r.kind,
+            "status": r.status,
+            "request_subtotal": r.subtotal,
+            "note": r.note,
+            "accepted_at": _iso(r.accepted_at, tz),
+            "completed_at": _iso(r.completed_at, tz),
+            "cancelled_at": _iso(r.cancelled_at, tz),
+        }
+        if r.kind == "FOOD":
+            for ln in lines:
+                yield {**base, "item": ln.name_snapshot, "qty": ln.qty,
+                       "price": ln.price_snapshot, "line_total": ln.line_total}
+        else:
+            yield {**base, "item": r.note or "Service", "qty": 1,
+                   "price": r.subtotal, "line_total": r.subtotal}
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line straight back."""
+    def write(self, value):
+        return value
+
+
+def _stream_csv(qs, tz):
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_COLUMNS)
+    yield writer.writeheader()
+    for row in _export_rows(qs, tz):
+        yield writer.writerow(row)
+
+
+def _stream_jsonl(qs, tz):
+    for r, lines in _iter_history(qs):
+        yield json.dumps({
+            "request_id": r.id,
+            "created_at": _iso(r.created_at, tz),
+            "room": r.room.number,
+            "kind": r.kind,
+            "status": r.status,
+            "subtotal": str(r.subtotal),
+            "note": r.note,
+            "accepted_at": _iso(r.accepted_at, tz) or None,
+            "completed_at": _iso(r.completed_at, tz) or None,
+            "cancelled_at": _iso(r.cancelled_at, tz) or None,
+            "lines": [
+                {"item": ln.name_snapshot, "qty": ln.qty,
+                 "price": str(ln.price_snapshot), "line_total": str(ln.line_total)}
+                for ln in lines
+            ],
+        }) + "\n"
+
+
+@login_required
+@user_passes_test(_allow_portal)
+@read_replica
+def requests_export(request):
+    """
+    GET ?format=csv|jsonl + the same filters as the history page.
+    Streams the whole filtered set without loading it into memory.
+    """
+    hotel = _hotel_or_403(request)
+    if not hotel and request.user.role != "PLATFORM_ADMIN":
+        return HttpResponseForbidden("No hotel set")
+
+    fmt = request.GET.get("format", "csv")
+    form = HistoryFilterForm(request.GET or None)
+    if form.errors:
+        return HttpResponseBadRequest(form.errors.as_text(), content_type="text/plain")
+    qs = _history_queryset(hotel, form).select_related("room")
+    tz = hotel.tzinfo() if hotel else timezone.get_current_timezone()
+
+    if fmt == "jsonl":
+        resp = StreamingHttpResponse(_stream_jsonl(qs, tz), content_type="application/x-ndjson")
+    else:
+        fmt = "csv"
+        resp = StreamingHttpResponse(_stream_csv(qs, tz), content_type="text/csv")
+    stamp = timezone.localdate(timezone=tz).isoformat()
+    resp["Content-Disposition"] = f'attachment; filename="requests-{stamp}.{fmt}"'
+    return resp
@@ -1,14 +1,31 @@
 # Day 5.3 — Staff Live Board (polling), with detail popup and today counters.
 
+import asyncio
+import hashlib
 import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponse
-from django.shortcuts import render, get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render, get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
 
-from .models import Request
+from .cursors import decode_cursor, encode_cursor
+from .events import broker, publish_request_event
+from scan2service.metrics import render_prometheus
+from scan2service.retry import retry_on_locked
+from scan2service.routers import read_replica
+from website.models import Hotel
+from .models import OPEN_STATUSES, DailyRequestCounter, OpenRequestStats, Request, RequestLine
+
+STREAM_HEARTBEAT_SECONDS = 15
 
 def _allow_portal(user):
     return getattr(user, "role", None) in ("HOTEL_ADMIN", "STAFF", "PLATFORM_ADMIN")
@@ -17,20 +34,42 @@ def _hotel_or_403(request):
     hotel = getattr(request.user, "hotel", None)
     if not hotel and getattr(request.user, "role", None) != "PLATFORM_ADMIN":
         return None
+    if not hotel and request.GET.get("hotel", "").isdigit():
+        # platform admin drilling down from the overview
+        hotel = get_object_or_404(Hotel, pk=int(request.GET["hotel"]))
     return hotel
 
+CARD_LINES = 4  # lines previewed on a FOOD card; detail view shows all
+
+def _line_previews(request_ids):
+    """
+    First CARD_LINES lines of every given request in ONE query
+    (ROW_NUMBER() window per request) → {request_id: [{"name", "qty"}, ...]}.
+    """
+    previews = defaultdict(list)
+    if not request_ids:
+        return previews
+    rows = (
+        RequestLine.objects
+        .filter(request_id__in=request_ids)
+        .annotate(rn=Window(RowNumber(), partition_by=F("request_id"), order_by=F("id").asc()))
+        .filter(rn__lte=CARD_LINES)
+        .order_by("request_id", "id")
+        .values_list("request_id", "name_snapshot", "qty")
+    )
+    for request_id, name, qty in rows:
+        previews[request_id].append({"name": name, "qty": qty})
+    return previews
+
 def _serialize_requests(qs):
     """
     Convert Requests to JSON-serializable dicts for the board.
+    Card line previews come from one batched query, not one per card.
     """
+    reqs = list(qs)
+    previews = _line_previews([r.id for r in reqs if r.kind == "FOOD"])
     data = []
-    # Prefetch lines only when needed to reduce queries.
-    for r in qs:
-        lines = []
-        if r.kind == "FOOD":
-            # show only a few lines for card; detail view shows all
-            for ln in r.lines.all()[:4]:
-                lines.append({"name": ln.name_snapshot, "qty": ln.qty})
+    for r in reqs:
         data.append({
             "id": r.id,
             "room": getattr(r.room, "number", ""),
@@ -39,11 +78,144 @@ def _serialize_requests(qs):
             "subtotal": float(r.subtotal or 0),
             "created_at": r.created_at.isoformat(),
             "accepted_at": r.accepted_at.isoformat() if r.accepted_at else None,
-            "lines": lines,                           # [] for service
+            "lines": previews.get(r.id, []),          # [] for service
             "note": r.note or "",
         })
     return data
 
+# ---------- delta sync cursor ----------
+# The cursor (see cursors.py) is (updated_at, id) of the newest change the
+# client has seen; "changed since" is a range scan on (hotel, status, updated_at).
+#
+# updated_at is stamped before the row commits, so a slow writer can commit a
+# change that sorts behind a cursor the board already holds. Every delta
+# therefore re-scans POLL_OVERLAP behind the cursor and resends that window
+# (the board upserts by id, so repeats are harmless). The ETag carries a digest
+# of the window, so a late commit inside it breaks the 304.
+
+BOARD_LIMIT = 100
+DELTA_LIMIT = 200          # more changes than this → send a full snapshot instead
+POLL_OVERLAP = timedelta(seconds=5)
+ALL_STATUSES = [s for s, _ in Request.STATUS_CHOICES]
+
+def _head(qs):
+    return qs.order_by("-updated_at", "-id").values_list("updated_at", "id").first()
+
+def _head_cursor(qs):
+    head = _head(qs)
+    return encode_cursor(*head) if head else "0-0"
+
+def _window_digest(rows, head_ts):
+    """Digest of the (id, updated_at) pairs inside the overlap window behind head_ts."""
+    floor = head_ts - POLL_OVERLAP
+    digest = hashlib.blake2b(digest_size=6)
+    for pk, updated_at in sorted(rows, key=lambda row: (row[1], row[0])):
+        if updated_at > floor:
+            digest.update(encode_cursor(updated_at, pk).encode() + b";")
+    return digest.hexdigest()
+
+def _board_etag(cursor, today, digest):
+    # the date is part of the tag so the first poll after midnight refreshes counters
+    return f'"{today.isoformat()}.{cursor}.{digest}"'
+
+def _cursor_from_etag(etag):
+    if not etag:
+        return None
+    parts = etag.strip().removeprefix("W/").strip('"').split(".")
+    return parts[1] if len(parts) == 3 else None
+
+def _board_today(hotel):
+    # hotel-local "today"; platform admins without a hotel use the site time zone
+    return hotel.localdate() if hotel else timezone.localdate()
+
+def _today_counts(hotel, today):
+    """
+    Completed/cancelled today from the DailyRequestCounter rollup —
+    one unique-index lookup instead of COUNT over Request.
+    """
+    qs = DailyRequestCounter.objects.filter(day=today, status__in=("COMPLETED", "CANCELLED"))
+    if hotel:
+        qs = qs.filter(hotel=hotel)
+    totals = {"COMPLETED": 0, "CANCELLED": 0}
+    for status, count in qs.values_list("status", "count"):
+        totals[status] += count
+    return {
+        "completed_today": totals["COMPLETED"],
+        "cancelled_today": totals["CANCELLED"],
+    }
+
+def _board_snapshot(qs):
+    new_qs = qs.filter(status="NEW").select_related("room").order_by("-created_at")[:BOARD_LIMIT]
+    acc_qs = qs.filter(status="ACCEPTED").select_related("room").order_by("-updated_at")[:BOARD_LIMIT]
+    return _serialize_requests(new_qs), _serialize_requests(acc_qs)
+
+# ---------- platform overview ----------
+# One OpenRequestStats row per hotel (maintained on every create/transition),
+# so the overview is O(hotels). Only hotels whose oldest open request is past
+# the SLA get a breach count — an index range over just their open requests.
+
+REQUEST_SLA_MINUTES = 15
+
+
+def _overview(now):
+    sla = timedelta(minutes=getattr(settings, "REQUEST_SLA_MINUTES", REQUEST_SLA_MINUTES))
+    cutoff = now - sla
+    stats = list(
+        OpenRequestStats.objects
+        .filter(Q(new_count__gt=0) | Q(accepted_count__gt=0))
+        .select_related("hotel")
+        .order_by(F("oldest_open_at").asc(nulls_last=True))
+    )
+    late = [s.hotel_id for s in stats if s.oldest_open_at and s.oldest_open_at < cutoff]
+    breaches = {}
+    if late:
+        breaches = dict(
+            Request.objects
+            .filter(hotel_id__in=late, status__in=OPEN_STATUSES, created_at__lt=cutoff)
+            .values_list("hotel_id")
+            .annotate(n=Count("id"))
+        )
+    rows = [
+        {
+            "hotel_id": s.hotel_id,
+            "hotel": s.hotel.name,
+            "new": s.new_count,
+            "accepted": s.accepted_count,
+            "oldest_open_at": s.oldest_open_at.isoformat() if s.oldest_open_at else None,
+            "oldest_wait_seconds": int((now - s.oldest_open_at).total_seconds()) if s.oldest_open_at else 0,
+            "breaches": breaches.get(s.hotel_id, 0),
+        }
+        for s in stats
+    ]
+    return {"sla_minutes": int(sla.total_seconds() // 60), "hotels": rows}
+
+
+@login_required
+@read_replica
+def live_overview(request):
+    """
+    Platform admins: open requests per hotel, oldest wait and SLA breaches.
+    ?format=json is what the page polls. Drill-down goes to live_board?hotel=<id>.
+    """
+    if request.user.role != "PLATFORM_ADMIN":
+        return HttpResponseForbidden("Platform admins only.")
+    data = _overview(timezone.now())
+    if request.GET.get("format") == "json":
+        return JsonResponse(data)
+    return render(request, "hotelportal/live_overview.html", {"overview": data})
+
+
+@login_required
+def metrics(request):
+    """
+    Prometheus scrape target: per-view request counts, latency histogram, SQL
+    and template time for this process (scan2service/metrics.py).
+    """
+    if not (request.user.is_staff or request.user.role == "PLATFORM_ADMIN"):
+        return HttpResponseForbidden("Staff only.")
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @login_required
 @user_passes_test(_allow_portal)
 def live_board(request):
@@ -52,62 +224,103 @@ def live_board(request):
     Only NEW and ACCEPTED are shown on the board; COMPLETED/CANCELLED are counted for today.
     """
     hotel = _hotel_or_403(request)
-    if not hotel and request.user.role != "PLATFORM_ADMIN":
+    if not hotel and request.user.role == "PLATFORM_ADMIN":
+        return redirect("live_overview")
+    if not hotel:
         return HttpResponseForbidden("No hotel set")
 
-    qs = Request.objects.all()
-    if hotel:
-        qs = qs.filter(hotel=hotel)
-
-    new_qs = qs.filter(status="NEW").select_related("room").order_by("-created_at")[:100]
-    acc_qs = qs.filter(status="ACCEPTED").select_related("room").order_by("-updated_at")[:100]
+    qs = Request.objects.filter(hotel=hotel)
 
-    today = timezone.localdate()
-    completed_today = qs.filter(status="COMPLETED", completed_at__date=today).count()
-    cancelled_today = qs.filter(status="CANCELLED", cancelled_at__date=today).count()
+    # cursor first: anything that changes while we render is picked up by the next poll
+    cursor = _head_cursor(qs)
+    new_list, acc_list = _board_snapshot(qs)
+    counts = _today_counts(hotel, _board_today(hotel))
 
     # IMPORTANT: dump to JSON strings so the template injects valid JS
-    new_initial_json = json.dumps(_serialize_requests(new_qs))
-    acc_initial_json = json.dumps(_serialize_requests(acc_qs))
-
     ctx = {
-        "new_initial_json": new_initial_json,
-        "accepted_initial_json": acc_initial_json,
-        "completed_today": completed_today,
-        "cancelled_today": cancelled_today,
+        "new_initial_json": json.dumps(new_list),
+        "accepted_initial_json": json.dumps(acc_list),
+        "completed_today": counts["completed_today"],
+        "cancelled_today": counts["cancelled_today"],
+        "cursor": cursor,
+        "hotel": hotel,
+        # platform admins see a hotel via ?hotel=<id>; poll/stream must carry it along
+        "hotel_param": "" if request.user.hotel_id else f"hotel={hotel.id}",
     }
     return render(request, "hotelportal/live_board.html", ctx)
 
 @login_required
 @user_passes_test(_allow_portal)
+@read_replica
 def live_poll(request):
     """
-    Return full snapshots of NEW and ACCEPTED every 8s + today's counters.
+    Board sync. Without a cursor: full snapshots of NEW and ACCEPTED.
+    With ?since=<cursor> (or If-None-Match): only requests changed since then —
+    open ones as cards, closed ones as tombstone ids — and 304 when nothing moved.
     """
     hotel = _hotel_or_403(request)
-    if not hotel and request.user.role != "PLATFORM_ADMIN":
+    if not hotel:
+        # platform admins poll one hotel (?hotel=<id>); the overview covers all of them
         return JsonResponse({"error": "no_hotel"}, status=403)
 
-    qs = Request.objects.all()
-    if hotel:
-        qs = qs.filter(hotel=hotel)
+    qs = Request.objects.filter(hotel=hotel)
 
-    new_qs = qs.filter(status="NEW").select_related("room").order_by("-created_at")[:100]
-    acc_qs = qs.filter(status="ACCEPTED").select_related("room").order_by("-updated_at")[:100]
+    today = _board_today(hotel)
+    if_none_match = request.headers.get("If-None-Match")
+    since = decode_cursor(request.GET.get("since") or _cursor_from_etag(if_none_match))
 
-    today = timezone.localdate()
+    if since:
+        since_ts, _ = since
+        changed = list(
+            qs.filter(status__in=ALL_STATUSES)  # every status → index range per status
+            .filter(updated_at__gt=since_ts - POLL_OVERLAP)
+            .select_related("room")
+            .order_by("updated_at", "id")[:DELTA_LIMIT + 1]
+        )
+        if len(changed) <= DELTA_LIMIT:
+            head = max([since, *((r.updated_at, r.id) for r in changed)])
+            cursor = encode_cursor(*head)
+            etag = _board_etag(cursor, today, _window_digest([(r.id, r.updated_at) for r in changed], head[0]))
+            if if_none_match == etag:
+                resp = HttpResponse(status=304)
+                resp["ETag"] = etag
+                return resp
+
+            open_reqs = [r for r in changed if r.status in ("NEW", "ACCEPTED")]
+            data = {
+                "mode": "delta",
+                "changed": _serialize_requests(open_reqs),
+                "removed": [r.id for r in changed if r.status not in ("NEW", "ACCEPTED")],
+                "counts": _today_counts(hotel, today),
+                "cursor": cursor,
+            }
+            resp = JsonResponse(data)
+            resp["ETag"] = etag
+            return resp
+
+    # no (usable) cursor, or too far behind → full snapshot
+    head = _head(qs)
+    if head:
+        cursor = encode_cursor(*head)
+        window = qs.filter(updated_at__gt=head[0] - POLL_OVERLAP).values_list("id", "updated_at")
+        digest = _window_digest(window, head[0])
+    else:
+        cursor, digest = "0-0", _window_digest([], timezone.now())
+    new_list, acc_list = _board_snapshot(qs)
     data = {
-        "new": _serialize_requests(new_qs),
-        "accepted": _serialize_requests(acc_qs),
-        "counts": {
-            "completed_today": qs.filter(status="COMPLETED", completed_at__date=today).count(),
-            "cancelled_today": qs.filter(status="CANCELLED", cancelled_at__date=today).count(),
-        }
+        "mode": "full",
+        "new": new_list,
+        "accepted": acc_list,
+        "counts": _today_counts(hotel, today),
+        "cursor": cursor,
     }
-    return JsonResponse(data)
+    resp = JsonResponse(data)
+    resp["ETag"] = _board_etag(cursor, today, digest)
+    return resp
 
 @login_required
 @user_passes_test(_allow_portal)
+@retry_on_locked
 def live_action(request, request_id):
     """
     POST: accept | complete | cancel
@@ -123,34 +336,87 @@ def live_action(request, request_id):
     if action not in ("accept", "complete", "cancel"):
         return HttpResponseBadRequest("Invalid action")
 
-    # lock the row to avoid race conditions
-    qs = Request.objects.select_for_update()
-    if hotel:
-        qs = qs.filter(hotel=hotel)
-    req = get_object_or_404(qs, id=request_id)
-
-    now = timezone.now()
-    if action == "accept":
-        if req.status != "NEW":
-            return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
-        req.status = "ACCEPTED"
-        req.accepted_at = now
-        req.save(update_fields=["status", "accepted_at", "updated_at"])
-    elif action == "complete":
-        if req.status != "ACCEPTED":
-            return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
-        req.status = "COMPLETED"
-        req.completed_at = now
-        req.save(update_fields=["status", "completed_at", "updated_at"])
-    else:  # cancel
-        if req.status not in ("NEW", "ACCEPTED"):
-            return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
-        req.status = "CANCELLED"
-        req.cancelled_at = now
-        req.save(update_fields=["status", "cancelled_at", "updated_at"])
+    with transaction.atomic():
+        # lock the row to avoid race conditions
+        qs = Request.objects.select_for_update().select_related("hotel")
+        if hotel:
+            qs = qs.filter(hotel=hotel)
+        req = get_object_or_404(qs, id=request_id)
+
+        now = timezone.now()
+        if action == "accept":
+            if req.status != "NEW":
+                return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
+            req.status = "ACCEPTED"
+            req.accepted_at = now
+            req.save(update_fields=["status", "accepted_at", "updated_at"])
+        elif action == "complete":
+            if req.status != "ACCEPTED":
+                return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
+            req.status = "COMPLETED"
+            req.completed_at = now
+            req.save(update_fields=["status", "completed_at", "updated_at"])
+        else:  # cancel
+            if req.status not in ("NEW", "ACCEPTED"):
+                return JsonResponse({"ok": False, "error": "bad_state"}, status=409)
+            req.status = "CANCELLED"
+            req.cancelled_at = now
+            req.save(update_fields=["status", "cancelled_at", "updated_at"])
 
+        # save() updates OpenRequestStats and DailyRequestCounter in this transaction
+
+    publish_request_event(req, "status")
     return JsonResponse({"ok": True})
 
+
+def _sse(event_name, payload):
+    return f"event: {event_name}\ndata: {json.dumps(payload)}\n\n"
+
+async def live_stream(request):
+    """
+    Server-Sent Events for the Live Board (needs ASGI — see scan2service/asgi.py).
+    Pushes `request` events (created / status changed) for the user's hotel;
+    the page keeps a slow poll as fallback and re-syncs on `resync`.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not _allow_portal(user):
+        return HttpResponseForbidden("Not allowed.")
+    if not user.hotel_id and user.role != "PLATFORM_ADMIN":
+        return HttpResponseForbidden("No hotel set")
+
+    hotel_id = user.hotel_id
+    if not hotel_id and request.GET.get("hotel", "").isdigit():
+        hotel_id = int(request.GET["hotel"])  # platform admin drill-down
+    if not hotel_id:
+        # like live_poll: one hotel per stream; the overview covers all of them
+        return JsonResponse({"error": "no_hotel"}, status=403)
+    if not isinstance(request, ASGIRequest):
+        # under WSGI (runserver) the endless stream would pin a worker thread for
+        # good; 204 tells EventSource not to reconnect, and the page keeps polling
+        return HttpResponse(status=204)
+    sub = broker.subscribe(hotel_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if sub.overflowed:
+                    sub.overflowed = False
+                    yield _sse("resync", {})
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # keep proxies from closing idle connections
+                    continue
+                yield _sse("request", event)
+        finally:
+            broker.unsubscribe(sub)
+
+    resp = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return resp
+
 @login_required
 @user_passes_test(_allow_portal)
 def live_detail(request, request_id):
@@ -166,8 +432,3 @@ def live_detail(request, request_id):
     r = get_object_or_404(qs, id=request_id)
     html = render_to_string("hotelportal/_request_detail.html", {"r": r})
     return JsonResponse({"ok": True, "html": html})
-
-@login_required
-@user_passes_test(_allow_portal)
-def history_stub(request):
-    return HttpResponse("History page coming soon…")
@@ -3,6 +3,11 @@ ASGI config for scan2service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. `uvicorn scan2service.asgi:application`) so
+the Live Board event stream (`portal/live/stream/`) can hold connections open
+without tying up a worker thread per tab. Board events fan out in process
+(hotelportal/events.py), so run a single worker process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
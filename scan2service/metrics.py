@@ -0,0 +1,208 @@
+# Per-view performance metrics, exposed in Prometheus text format.
+#
+# MetricsMiddleware times every request and files it under the resolved URL
+# name (guest_room, cart_add, live_poll, …): request count, a wall-time
+# histogram, SQL query count and SQL time (an execute_wrapper installed on the
+# thread's connections), and template render time (TimedDjangoTemplates, the
+# TEMPLATES backend in settings).
+#
+# Aggregates are per process and lock-free: each thread only ever writes its
+# own shard (a dict of view → list of numbers), so recording a request is a
+# few list additions with no lock or contention. render_prometheus() sums
+# the shards when the endpoint is scraped. Counters only grow; a restarted
+# process starts from zero, which Prometheus' rate() handles.
+#
+# Wall time ends when the view returns its response, so for streaming views
+# (live_stream) it covers setup, not the stream.
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+PREFIX = "scan2service_view"
+# wall-time histogram upper bounds, seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "unmatched"  # 404s that resolved no URL pattern
+
+# row layout: count, seconds, queries, db seconds, template seconds, then one
+# (non-cumulative) slot per bucket plus +Inf
+COUNT, SECONDS, QUERIES, DB_SECONDS, TEMPLATE_SECONDS = range(5)
+_FIRST_BUCKET = 5
+_ROW = _FIRST_BUCKET + len(BUCKETS) + 1
+
+_local = threading.local()
+_current = ContextVar("metrics_request", default=None)
+# the lock guards shard bookkeeping (a thread's first request, scrapes), never recording
+_lock = threading.Lock()
+_shards = {}  # thread → its shard
+_retired = {}  # totals of shards whose thread has exited
+
+
+class _Request:
+    __slots__ = ("queries", "db", "template", "rendering")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.rendering = False
+
+
+def _merge(into, shard):
+    for view, row in list(shard.items()):
+        total = into.get(view)
+        if total is None:
+            into[view] = list(row)
+        else:
+            for i, value in enumerate(row):
+                total[i] += value
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        pass
+    shard = _local.shard = {}
+    with _lock:
+        # runserver starts a thread per request; fold finished ones away
+        for thread in [t for t in _shards if not t.is_alive()]:
+            _merge(_retired, _shards.pop(thread))
+        _shards[threading.current_thread()] = shard
+    return shard
+
+
+def record(view, seconds, queries=0, db_seconds=0.0, template_seconds=0.0):
+    shard = _shard()
+    row = shard.get(view)
+    if row is None:
+        row = shard[view] = [0] * _ROW
+        row[SECONDS] = row[DB_SECONDS] = row[TEMPLATE_SECONDS] = 0.0
+    row[COUNT] += 1
+    row[SECONDS] += seconds
+    row[QUERIES] += queries
+    row[DB_SECONDS] += db_seconds
+    row[TEMPLATE_SECONDS] += template_seconds
+    row[_FIRST_BUCKET + bisect_left(BUCKETS, seconds)] += 1
+
+
+def snapshot():
+    """view → summed row across all threads' shards."""
+    totals = {}
+    with _lock:
+        _merge(totals, _retired)
+        for shard in _shards.values():
+            _merge(totals, shard)
+    return totals
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Prometheus text exposition (format 0.0.4) of snapshot()."""
+    totals = sorted(snapshot().items())
+    out = [
+        f"# HELP {PREFIX}_duration_seconds Wall time per request, by URL name.",
+        f"# TYPE {PREFIX}_duration_seconds histogram",
+    ]
+    for view, row in totals:
+        v = _label(view)
+        cumulative = 0
+        for i, bound in enumerate(BUCKETS):
+            cumulative += row[_FIRST_BUCKET + i]
+            out.append(f'{PREFIX}_duration_seconds_bucket{{view="{v}",le="{bound}"}} {cumulative}')
+        out.append(f'{PREFIX}_duration_seconds_bucket{{view="{v}",le="+Inf"}} {row[COUNT]}')
+        out.append(f'{PREFIX}_duration_seconds_sum{{view="{v}"}} {_number(row[SECONDS])}')
+        out.append(f'{PREFIX}_duration_seconds_count{{view="{v}"}} {row[COUNT]}')
+    for name, index, help_text in (
+        ("requests_total", COUNT, "Requests handled"),
+        ("db_queries_total", QUERIES, "SQL queries run"),
+        ("db_seconds_total", DB_SECONDS, "Time spent in SQL"),
+        ("template_seconds_total", TEMPLATE_SECONDS, "Time spent rendering templates"),
+    ):
+        out.append(f"# HELP {PREFIX}_{name} {help_text}, by URL name.")
+        out.append(f"# TYPE {PREFIX}_{name} counter")
+        for view, row in totals:
+            out.append(f'{PREFIX}_{name}{{view="{_label(view)}"}} {_number(row[index])}')
+    return "\n".join(out) + "\n"
+
+
+def _time_query(execute, sql, params, many, context):
+    current = _current.get()
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if current is not None:
+            current.queries += 1
+            current.db += perf_counter() - started
+
+
+def _instrument_connections():
+    # Connections are per thread and keep their execute_wrappers across
+    # reconnects, so _time_query is installed once per thread rather than
+    # entered per request (connections[alias] alone costs microseconds).
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if _time_query not in wrappers:
+            wrappers.insert(0, _time_query)
+    _local.instrumented = True
+
+
+class MetricsMiddleware:
+    """Outermost middleware: times the whole request, session and auth included."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(_local, "instrumented", False):
+            _instrument_connections()
+        current = _Request()
+        token = _current.set(current)
+        started = perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            elapsed = perf_counter() - started
+            _current.reset(token)
+            match = getattr(request, "resolver_match", None)
+            record(match.view_name if match else UNMATCHED, elapsed, current.queries, current.db, current.template)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        current = _current.get()
+        if current is None or current.rendering:  # outside a request, or nested render_to_string
+            return super().render(context, request)
+        current.rendering = True
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            current.template += perf_counter() - started
+            current.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, with render time added to the request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
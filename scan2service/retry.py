@@ -0,0 +1,49 @@
+# Bounded retry for write views when SQLite reports the database as locked.
+#
+# WAL + BEGIN IMMEDIATE + busy_timeout (settings.DATABASES) make writers queue
+# on the write lock instead of failing, but a writer can still give up after
+# the timeout when a burst (dinner-rush cart clicks + staff board actions)
+# outlasts it. The view's own transaction has rolled back by then, so it is
+# safe to run it again: a few attempts with jittered exponential backoff
+# spread the retries out instead of stampeding the lock together.
+
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+log = logging.getLogger(__name__)
+
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.05  # seconds; doubles per attempt, full jitter
+
+
+def is_lock_error(exc):
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def retry_on_locked(view):
+    """
+    Re-run `view` when it fails with "database is locked". Only wrap views whose
+    writes happen inside transaction.atomic() blocks, so a failed attempt has
+    left nothing behind.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        attempts = getattr(settings, "DB_LOCK_RETRY_ATTEMPTS", RETRY_ATTEMPTS)
+        base = getattr(settings, "DB_LOCK_RETRY_BASE_DELAY", RETRY_BASE_DELAY)
+        for attempt in range(1, attempts + 1):
+            try:
+                return view(request, *args, **kwargs)
+            except OperationalError as exc:
+                # inside an outer transaction the rollback isn't ours to redo
+                if attempt == attempts or not is_lock_error(exc) or connection.in_atomic_block:
+                    raise
+                delay = random.uniform(0, base * 2 ** (attempt - 1))
+                log.warning("%s: %s, retry %d/%d in %.0f ms", view.__name__, exc, attempt, attempts - 1, delay * 1000)
+                time.sleep(delay)
+    return wrapper
@@ -0,0 +1,112 @@
+# Read replica routing.
+#
+# Views decorated with @read_replica run their reads on READ_REPLICA_ALIAS;
+# everything else, and every write, goes to "default". A replica lags the
+# primary, so a client that just wrote is pinned to the primary:
+#
+#   - within the request: once anything is written, later reads go to "default";
+#   - across requests: ReplicaPinMiddleware sets a short-lived cookie after any
+#     INSERT/UPDATE/DELETE, and @read_replica skips the replica while it is set.
+#
+# Guests have no Django session (room token cookie only), so the pin is a
+# cookie of its own rather than a session key. Without DB_REPLICA_PATH the
+# alias points at the primary file and routing is off (settings.py).
+
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+PIN_COOKIE = "dbpin"
+PIN_SECONDS = 10  # comfortably above the replica sync interval
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_read_alias = ContextVar("read_alias", default=None)
+_wrote = ContextVar("wrote", default=False)
+
+
+def replica_alias():
+    """The replica alias, or None when there isn't a separate copy to read from."""
+    alias = getattr(settings, "READ_REPLICA_ALIAS", None)
+    if alias not in connections.settings:
+        return None
+    if str(connections[alias].settings_dict["NAME"]) == str(connections["default"].settings_dict["NAME"]):
+        return None  # same file (no DB_REPLICA_PATH, or a test mirror): nothing to route
+    return alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _wrote.get():
+            return "default"
+        return _read_alias.get()  # None → Django's default choice
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both sides; objects read from the replica may be saved
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is a copy of the primary (sync_replica), never migrated itself
+        return db == "default"
+
+
+def _on_replica(alias, fn, *args, **kwargs):
+    token = _read_alias.set(alias)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _read_alias.reset(token)
+
+
+def _stream_on_replica(alias, chunks):
+    # StreamingHttpResponse bodies run after the view returns
+    token = _read_alias.set(alias)
+    try:
+        yield from chunks
+    finally:
+        _read_alias.reset(token)
+
+
+def read_replica(view):
+    """Run a read-only GET view's queries on the replica unless the client is pinned."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if not alias or request.method not in ("GET", "HEAD") or request.COOKIES.get(PIN_COOKIE):
+            return view(request, *args, **kwargs)
+        response = _on_replica(alias, view, request, *args, **kwargs)
+        if getattr(response, "streaming", False) and not getattr(response, "is_async", False):
+            response.streaming_content = _stream_on_replica(alias, response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Notice writes to the primary and pin the client to it for PIN_SECONDS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _watch(self, execute, sql, params, many, context):
+        if sql.lstrip()[:7].upper().startswith(WRITE_VERBS):
+            _wrote.set(True)
+        return execute(sql, params, many, context)
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            with connections["default"].execute_wrapper(self._watch):
+                response = self.get_response(request)
+            if _wrote.get() and replica_alias():
+                response.set_cookie(
+                    PIN_COOKIE, "1",
+                    max_age=getattr(settings, "READ_REPLICA_PIN_SECONDS", PIN_SECONDS),
+                    httponly=True, samesite="Lax", secure=request.is_secure(),
+                )
+            return response
+        finally:
+            _wrote.reset(token)
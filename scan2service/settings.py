@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,7 +52,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "website.User"
 
 MIDDLEWARE = [
+    'scan2service.metrics.MetricsMiddleware',  # first, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
+    'scan2service.routers.ReplicaPinMiddleware',  # before sessions: sees session writes too
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +67,7 @@ ROOT_URLCONF = 'scan2service.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'scan2service.metrics.TimedDjangoTemplates',  # DjangoTemplates + render timing
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,10 +86,52 @@ WSGI_APPLICATION = 'scan2service.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent writers (cart clicks overlapping board actions):
+#   WAL             readers never block the writer and vice versa
+#   synchronous     NORMAL is durable across app crashes in WAL mode, fsyncs only at checkpoints
+#   IMMEDIATE       atomic() takes the write lock at BEGIN, so two transactions can't
+#                   both read and then deadlock upgrading (instant "database is locked")
+#   timeout         seconds a writer waits for the lock (busy handler) before giving up;
+#                   write views then retry with jitter (scan2service/retry.py)
+# journal_mode=WAL is persistent, so it is set once by migration
+# hotelportal 0017 rather than here; synchronous is per connection.
+SQLITE_OPTIONS = {
+    'init_command': 'PRAGMA synchronous=NORMAL',
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        # a file, not the in-memory default: tests then lock (WAL, busy_timeout)
+        # the way production does — shared-cache memory DBs fail on table locks
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    # Read replica for @read_replica views (scan2service/routers.py). Point
+    # DB_REPLICA_PATH at a copy kept fresh by `manage.py sync_replica`; unset,
+    # it names the primary file and every read stays on "default".
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_REPLICA_PATH') or BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': SQLITE_OPTIONS['timeout']},
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['scan2service.routers.ReplicaRouter']
+READ_REPLICA_ALIAS = 'replica'
+READ_REPLICA_PIN_SECONDS = 10  # read-your-writes window after a client writes
+
+# 🔸 not in basic Django, but needed for Scan2Service
+# Guest menu catalog + room token state versions live here. Per-process memory
+# is fine for a single worker; point this at Redis/Memcached when scaling out.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'scan2service',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
     }
 }
 
@@ -133,6 +178,14 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Hash uploads while they stream in (item photos are stored by content hash);
+# the Django defaults below it still build the UploadedFile.
+FILE_UPLOAD_HANDLERS = [
+    "hotelportal.uploads.HashingUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
 LOGIN_REDIRECT_URL = "/portal/"
 LOGOUT_REDIRECT_URL = "/login"
 
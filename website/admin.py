@@ -17,7 +17,7 @@ class HotelAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at",)
     fieldsets = (
         ("Identity", {"fields": ("name","hotel_code","logo")}),
-        ("Contact",  {"fields": ("city","address","phone","email","owner_name")}),
+        ("Contact",  {"fields": ("city","address","phone","email","owner_name","timezone")}),
         ("Compliance & Notes", {"fields": ("gst_number","notes")}),
         ("Subscription & Status", {"fields": ("subscription_expires_on","status")}),
         ("Timestamps", {"fields": ("created_at",)}),
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_alter_user_hotel_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='catalog_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
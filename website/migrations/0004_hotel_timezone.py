@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:29
+
+import website.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_hotel_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=64, validators=[website.models.validate_timezone]),
+        ),
+    ]
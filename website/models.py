@@ -1,5 +1,17 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+
+
+def validate_timezone(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown time zone: {value}")
 
 
 class Hotel(models.Model):
@@ -20,10 +32,21 @@ class Hotel(models.Model):
         default="ACTIVE",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped whenever Category / Item / ImageAsset change → guest menu cache key
+    catalog_version = models.PositiveIntegerField(default=0, editable=False)
+    # IANA name, e.g. "Asia/Kolkata"; blank → settings.TIME_ZONE. Defines the hotel's "today".
+    timezone = models.CharField(max_length=64, blank=True, validators=[validate_timezone])
 
     def __str__(self) -> str:
         return f"{self.name} ({self.city})" if self.city else self.name
 
+    def tzinfo(self):
+        return ZoneInfo(self.timezone or settings.TIME_ZONE)
+
+    def localdate(self, value=None):
+        """Hotel-local date of `value` (default: now)."""
+        return timezone.localdate(value, timezone=self.tzinfo())
+
 
 class User(AbstractUser):
     class Roles(models.TextChoices):